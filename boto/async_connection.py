@@ -0,0 +1,435 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+"""
+An asyncio transport for boto connections.
+
+The transport wraps an existing connection object, such as an
+S3Connection, SQSConnection or DynamoDBConnection, and sends its
+requests over non-blocking sockets, so that many requests can be in
+flight on a single event loop::
+
+    >>> conn = boto.dynamodb2.connect_to_region('us-east-1')
+    >>> transport = AsyncTransport(conn)
+    >>> response = await transport.make_request('GetItem', body)
+
+``make_request`` accepts the same arguments as the wrapped connection's
+own ``make_request`` and builds, signs and retries the request exactly
+as the blocking code path does, but returns the raw response without
+any service-specific parsing.  Requirements: Python 3.5 or later.
+"""
+import asyncio
+import collections
+import socket
+import ssl
+
+import boto
+from boto import UserAgent
+from boto.compat import BytesIO
+from boto.connection import PORTS_BY_SECURITY
+from boto.connection import DONE, GIVE_UP, REDIRECT, RETRY_NOW
+from boto.exception import BotoClientError
+from boto.exception import PleaseRetryException
+
+
+class _RequestCaptured(Exception):
+    # Raised from a connection's _mexe to hand the built request back
+    # to the transport instead of sending it.
+    def __init__(self, request, sender, override_num_retries, retry_handler):
+        self.request = request
+        self.sender = sender
+        self.override_num_retries = override_num_retries
+        self.retry_handler = retry_handler
+
+
+class AsyncHTTPResponse(object):
+    """
+    A fully read HTTP response, with the subset of the
+    ``http_client.HTTPResponse`` interface boto relies on.
+    """
+    def __init__(self, status, reason, headers, body, version=11):
+        self.status = status
+        self.reason = reason
+        self.version = version
+        self._headers = headers
+        self._body = body
+        self._fp = BytesIO(body)
+
+    def getheader(self, name, default=None):
+        values = [v for (k, v) in self._headers if k.lower() == name.lower()]
+        if not values:
+            return default
+        return ', '.join(values)
+
+    def getheaders(self):
+        return list(self._headers)
+
+    def read(self, amt=None):
+        """
+        Reads the response body.  As with ``boto.connection.HTTPResponse``,
+        calling this with no ``amt`` always returns the whole body.
+        """
+        if amt is None:
+            return self._body
+        return self._fp.read(amt)
+
+    def isclosed(self):
+        return True
+
+    def close(self):
+        pass
+
+
+class _HTTPStream(object):
+    # A single HTTP/1.1 connection over asyncio streams.
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.reusable = True
+
+    def close(self):
+        self.reusable = False
+        self.writer.close()
+
+    async def request(self, method, path, body, headers, host_header):
+        lines = ['%s %s HTTP/1.1' % (method, path)]
+        names = set(name.lower() for name in headers)
+        if 'host' not in names:
+            lines.append('Host: %s' % host_header)
+        if 'accept-encoding' not in names:
+            lines.append('Accept-Encoding: identity')
+        for name, value in headers.items():
+            lines.append('%s: %s' % (name, value))
+        head = ('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8')
+        self.writer.write(head + (body or b''))
+        await self.writer.drain()
+        return await self._read_response(method)
+
+    async def _read_response(self, method):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError('Connection closed by server')
+        parts = status_line.decode('iso-8859-1').rstrip('\r\n').split(' ', 2)
+        version = 10 if parts[0] == 'HTTP/1.0' else 11
+        status = int(parts[1])
+        reason = parts[2] if len(parts) > 2 else ''
+        headers = []
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, value = line.decode('iso-8859-1').split(':', 1)
+            headers.append((name.strip(), value.strip()))
+        response = AsyncHTTPResponse(status, reason, headers, b'', version)
+
+        connection_header = (response.getheader('connection') or '').lower()
+        if version == 10 or connection_header == 'close':
+            self.reusable = False
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            body = b''
+        elif 'chunked' in (response.getheader('transfer-encoding') or ''):
+            body = await self._read_chunked()
+        elif response.getheader('content-length') is not None:
+            body = await self.reader.readexactly(
+                int(response.getheader('content-length')))
+        else:
+            body = await self.reader.read()
+            self.reusable = False
+        return AsyncHTTPResponse(status, reason, headers, body, version)
+
+    async def _read_chunked(self):
+        chunks = []
+        while True:
+            size_line = await self.reader.readline()
+            size = int(size_line.split(b';', 1)[0].strip(), 16)
+            if size == 0:
+                # Skip any trailers up to the final blank line.
+                while (await self.reader.readline()) not in (b'\r\n', b'\n',
+                                                              b''):
+                    pass
+                return b''.join(chunks)
+            chunks.append(await self.reader.readexactly(size))
+            await self.reader.readexactly(2)
+
+
+class AsyncTransport(object):
+    """
+    Sends the requests of a boto connection over asyncio streams.
+
+    Idle connections are kept per (host, port, is_secure) and reused
+    newest first, up to ``max_pool_connections`` per host (the
+    connection pool's ``maxsize``, or 10 if that is unbounded).
+    """
+
+    DefaultPoolSize = 10
+
+    # Errors from sending a request that are retried, on top of the
+    # wrapped connection's ``http_exceptions``...
+    RetryableExceptions = (OSError, EOFError, ValueError,
+                           asyncio.TimeoutError)
+    # ...unless they are one of these, or of the connection's
+    # ``http_unretryable_exceptions``.
+    UnretryableExceptions = (ssl.CertificateError,)
+
+    def __init__(self, connection, max_pool_connections=None):
+        """
+        :type connection: :class:`boto.connection.AWSAuthConnection`
+        :param connection: The connection whose requests are sent.
+
+        :type max_pool_connections: int
+        :param max_pool_connections: The number of idle connections to
+            keep per host.
+        """
+        self.connection = connection
+        if max_pool_connections is None:
+            max_pool_connections = (connection._pool.maxsize or
+                                    self.DefaultPoolSize)
+        self.max_pool_connections = max_pool_connections
+        self._idle = collections.defaultdict(list)
+        self._ssl_context = None
+
+    def build_request(self, *args, **kwargs):
+        """
+        Runs the wrapped connection's ``make_request`` up to the point
+        where it would send the request and returns the captured
+        request details, so that each service's own path, host and
+        header handling is reused.
+        """
+        shadow = _CapturingConnection.wrap(self.connection)
+        try:
+            shadow.make_request(*args, **kwargs)
+        except _RequestCaptured as captured:
+            # Retry handlers bound to the copy should update the
+            # original connection's state, e.g. throttling counters.
+            handler = captured.retry_handler
+            if getattr(handler, '__self__', None) is shadow:
+                captured.retry_handler = getattr(self.connection,
+                                                 handler.__name__)
+            return captured
+        raise BotoClientError('make_request did not send a request')
+
+    async def make_request(self, *args, **kwargs):
+        """
+        Builds a request with the wrapped connection's ``make_request``
+        arguments, then sends it with the usual retry and redirect
+        handling.  Returns an :class:`AsyncHTTPResponse`.
+        """
+        captured = self.build_request(*args, **kwargs)
+        if captured.sender is not None:
+            raise BotoClientError('Custom senders are not supported by '
+                                  'AsyncTransport')
+        return await self.mexe(captured.request,
+                               captured.override_num_retries,
+                               captured.retry_handler)
+
+    async def mexe(self, request, override_num_retries=None,
+                   retry_handler=None):
+        """
+        The asyncio counterpart of ``AWSAuthConnection._mexe``.  The
+        wrapped connection decides how each response and error is
+        handled, so both retry, redirect and give up alike.
+        """
+        conn = self.connection
+        response = None
+        body = None
+        ex = None
+        policy = conn.retry_policy
+        num_retries = conn._get_num_retries(override_num_retries)
+        is_secure = conn.is_secure
+        i = 0
+        next_sleep = None
+        policy.before_request('to %s' % request.host)
+
+        if not isinstance(request.body, bytes) and hasattr(request.body,
+                                                           'encode'):
+            request.body = request.body.encode('utf-8')
+
+        while i <= num_retries:
+            # Use jittered backoff to desynchronize client requests.
+            next_sleep = policy.next_delay(next_sleep)
+            try:
+                conn.prepare_request(request)
+                response = await self._send(request, is_secure)
+                action, i, next_sleep, body = conn._check_response(
+                    request, response, i, next_sleep, retry_handler)
+                if action == RETRY_NOW:
+                    await asyncio.sleep(next_sleep)
+                    continue
+                elif action == GIVE_UP:
+                    break
+                elif action == DONE:
+                    return response
+                elif action == REDIRECT:
+                    scheme = conn._follow_redirect(request, response)
+                    is_secure = scheme == 'https'
+                    response = None
+                    continue
+            except BaseException as e:
+                # Cancellation included, so the outcome is always
+                # recorded with the retry policy.
+                retryable = conn.http_exceptions + self.RetryableExceptions
+                if not conn._is_retryable_error(e, retryable,
+                                                self.UnretryableExceptions):
+                    raise
+                if isinstance(e, PleaseRetryException):
+                    response = e.response
+                ex = e
+            i += 1
+            if i > num_retries:
+                break
+            if not policy.allow_retry():
+                boto.log.debug('Retry budget exhausted, giving up')
+                break
+            await asyncio.sleep(next_sleep)
+        conn._raise_request_error(request, response, body, ex)
+
+    async def _send(self, request, is_secure):
+        host = request.host.split(':', 1)[0]
+        port = int(request.port or PORTS_BY_SECURITY[is_secure])
+        key = (host, port, is_secure)
+        stream = await self._get_stream(key)
+        if port == PORTS_BY_SECURITY[is_secure]:
+            host_header = host
+        else:
+            host_header = '%s:%d' % (host, port)
+        timeout = self.connection.http_connection_kwargs.get('timeout')
+        try:
+            response = await asyncio.wait_for(
+                stream.request(request.method, request.path, request.body,
+                               request.headers, host_header),
+                timeout)
+        except BaseException:
+            stream.close()
+            raise
+        if stream.reusable:
+            idle = self._idle[key]
+            idle.append(stream)
+            if len(idle) > self.max_pool_connections:
+                idle.pop(0).close()
+        else:
+            stream.close()
+        return response
+
+    async def _get_stream(self, key):
+        idle = self._idle[key]
+        while idle:
+            stream = idle.pop()
+            if not stream.reader.at_eof():
+                return stream
+            stream.close()
+        (host, port, is_secure) = key
+        conn = self.connection
+        connect_kwargs = {'host': host, 'port': port}
+        if conn.use_proxy and not conn.skip_proxy(host):
+            if is_secure:
+                # As with proxy_ssl, tunnel through the proxy and
+                # negotiate SSL with the endpoint over the tunnel.
+                loop = asyncio.get_event_loop()
+                sock = await loop.run_in_executor(None, self._open_tunnel,
+                                                  host, port)
+                connect_kwargs = {'sock': sock}
+            else:
+                connect_kwargs = {'host': conn.proxy,
+                                  'port': int(conn.proxy_port)}
+        if is_secure:
+            connect_kwargs['ssl'] = self._get_ssl_context()
+            connect_kwargs['server_hostname'] = host
+        timeout = conn.http_connection_kwargs.get('timeout')
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(**connect_kwargs), timeout)
+        return _HTTPStream(reader, writer)
+
+    def _open_tunnel(self, host, port):
+        # Connects to the proxy and asks it for a tunnel to host:port,
+        # returning the connected socket.  This blocks, so it is run
+        # in an executor.
+        conn = self.connection
+        timeout = conn.http_connection_kwargs.get('timeout')
+        sock = socket.create_connection((conn.proxy, int(conn.proxy_port)),
+                                        timeout)
+        try:
+            lines = ['CONNECT %s:%d HTTP/1.0' % (host, port),
+                     'User-Agent: %s' % UserAgent]
+            if conn.proxy_user and conn.proxy_pass:
+                for name, value in conn.get_proxy_auth_header().items():
+                    lines.append('%s: %s' % (name, value))
+            sock.sendall(('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8'))
+            # The endpoint doesn't send anything until the SSL handshake
+            # starts, so everything read here is the proxy's response.
+            head = b''
+            while b'\r\n\r\n' not in head:
+                data = sock.recv(1024)
+                if not data:
+                    break
+                head += data
+            status_line = head.split(b'\r\n', 1)[0].decode('iso-8859-1')
+            parts = status_line.split(' ', 2)
+            if len(parts) < 2 or parts[1] != '200':
+                # Fake a socket error, as proxy_ssl does, so that the
+                # request is retried.
+                raise socket.error(-71,
+                                   'Error talking to HTTP proxy %s:%s: %s' %
+                                   (conn.proxy, conn.proxy_port,
+                                    status_line))
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+
+    def _get_ssl_context(self):
+        if self._ssl_context is None:
+            conn = self.connection
+            if conn.https_validate_certificates:
+                context = ssl.create_default_context(
+                    cafile=conn.ca_certificates_file)
+            else:
+                context = ssl.create_default_context()
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+            self._ssl_context = context
+        return self._ssl_context
+
+    def close(self):
+        """
+        Closes all idle connections.
+        """
+        for idle in self._idle.values():
+            for stream in idle:
+                stream.close()
+        self._idle.clear()
+
+
+class _CapturingConnection(object):
+    # Builds a shallow copy of a connection whose _mexe captures the
+    # request instead of sending it.
+
+    @staticmethod
+    def wrap(connection):
+        shadow = object.__new__(connection.__class__)
+        shadow.__dict__.update(connection.__dict__)
+
+        def capture(request, sender=None, override_num_retries=None,
+                    retry_handler=None):
+            raise _RequestCaptured(request, sender, override_num_retries,
+                                   retry_handler)
+        shadow._mexe = capture
+        return shadow
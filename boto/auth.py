@@ -38,6 +38,7 @@ from email.utils import formatdate
 import hmac
 import os
 import posixpath
+import re
 
 from boto.compat import urllib, encodebytes
 from boto.auth_handler import AuthHandler
@@ -61,6 +62,21 @@ SIGV4_DETECT = [
 ]
 
 
+# Characters SigV4 leaves unescaped; anything made only of these can skip
+# the comparatively slow call to ``quote``.
+_SIGV4_UNRESERVED = re.compile(r'\A[A-Za-z0-9_.~-]*\Z')
+_SIGV4_UNRESERVED_BYTES = re.compile(br'\A[A-Za-z0-9_.~-]*\Z')
+
+
+def _sigv4_quote(value):
+    if isinstance(value, bytes):
+        if _SIGV4_UNRESERVED_BYTES.match(value):
+            return value.decode('ascii')
+    elif _SIGV4_UNRESERVED.match(value):
+        return value
+    return urllib.parse.quote(value, safe='-_.~')
+
+
 class HmacKeys(object):
     """Key based Auth handler helper."""
 
@@ -294,6 +310,7 @@ class HmacAuthV4Handler(AuthHandler, HmacKeys):
     """
 
     capability = ['hmac-v4']
+    SigningKeyCacheSize = 32
 
     def __init__(self, host, config, provider,
                  service_name=None, region_name=None):
@@ -305,6 +322,16 @@ class HmacAuthV4Handler(AuthHandler, HmacKeys):
         self.service_name = service_name
         self.region_name = region_name
 
+    def update_provider(self, provider):
+        super(HmacAuthV4Handler, self).update_provider(provider)
+        # Maps (date, region, service) to (secret_key, signing_key).
+        self._signing_keys = {}
+
+    def __getstate__(self):
+        pickled_dict = super(HmacAuthV4Handler, self).__getstate__()
+        del pickled_dict['_signing_keys']
+        return pickled_dict
+
     def _sign(self, key, msg, hex=False):
         if not isinstance(key, bytes):
             key = key.encode('utf-8')
@@ -354,8 +381,7 @@ class HmacAuthV4Handler(AuthHandler, HmacKeys):
         l = []
         for param in sorted(http_request.params):
             value = boto.utils.get_utf8_value(http_request.params[param])
-            l.append('%s=%s' % (urllib.parse.quote(param, safe='-_.~'),
-                                urllib.parse.quote(value, safe='-_.~')))
+            l.append('%s=%s' % (_sigv4_quote(param), _sigv4_quote(value)))
         return '&'.join(l)
 
     def canonical_headers(self, headers_to_sign):
@@ -394,13 +420,17 @@ class HmacAuthV4Handler(AuthHandler, HmacKeys):
         return encoded
 
     def payload(self, http_request):
+        # Services such as Glacier have the caller send the payload's
+        # hash, which saves hashing a large body a second time.
+        if http_request.headers.get('x-amz-content-sha256'):
+            return http_request.headers['x-amz-content-sha256']
         body = http_request.body
         # If the body is a file like object, we can use
         # boto.utils.compute_hash, which will avoid reading
         # the entire body into memory.
         if hasattr(body, 'seek') and hasattr(body, 'read'):
             return boto.utils.compute_hash(body, hash_algorithm=sha256)[0]
-        elif not isinstance(body, bytes):
+        elif not isinstance(body, (bytes, bytearray, memoryview)):
             body = body.encode('utf-8')
         return sha256(body).hexdigest()
 
@@ -479,14 +509,36 @@ class HmacAuthV4Handler(AuthHandler, HmacKeys):
         sts.append(sha256(canonical_request.encode('utf-8')).hexdigest())
         return '\n'.join(sts)
 
-    def signature(self, http_request, string_to_sign):
+    def signing_key(self, http_request):
+        """
+        Return the key derived from the secret key for the request's
+        date, region and service.
+
+        The derivation takes four HMAC operations but only changes once
+        a day, so derived keys are cached.  Each entry remembers the
+        secret it was derived from, which means credentials refreshed by
+        the provider (for example from instance metadata) are picked up
+        on the next request.
+        """
         key = self._provider.secret_key
+        scope = (http_request.timestamp, http_request.region_name,
+                 http_request.service_name)
+        cached = self._signing_keys.get(scope)
+        if cached is not None and cached[0] == key:
+            return cached[1]
         k_date = self._sign(('AWS4' + key).encode('utf-8'),
                             http_request.timestamp)
         k_region = self._sign(k_date, http_request.region_name)
         k_service = self._sign(k_region, http_request.service_name)
         k_signing = self._sign(k_service, 'aws4_request')
-        return self._sign(k_signing, string_to_sign, hex=True)
+        if len(self._signing_keys) >= self.SigningKeyCacheSize:
+            self._signing_keys = {}
+        self._signing_keys[scope] = (key, k_signing)
+        return k_signing
+
+    def signature(self, http_request, string_to_sign):
+        return self._sign(self.signing_key(http_request), string_to_sign,
+                          hex=True)
 
     def add_auth(self, req, **kwargs):
         """
@@ -581,8 +633,7 @@ class S3HmacAuthV4Handler(HmacAuthV4Handler, AuthHandler):
         l = []
         for param in sorted(http_request.params):
             value = boto.utils.get_utf8_value(http_request.params[param])
-            l.append('%s=%s' % (urllib.parse.quote(param, safe='-_.~'),
-                                urllib.parse.quote(value, safe='-_.~')))
+            l.append('%s=%s' % (_sigv4_quote(param), _sigv4_quote(value)))
         return '&'.join(l)
 
     def host_header(self, host, http_request):
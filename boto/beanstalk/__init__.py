@@ -20,7 +20,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 # IN THE SOFTWARE.
 #
-from boto.regioninfo import RegionInfo, get_regions
+from boto.regioninfo import RegionInfo, get_regions, connect
 
 
 def regions():
@@ -38,7 +38,7 @@ def regions():
 
 
 def connect_to_region(region_name, **kw_params):
-    for region in regions():
-        if region.name == region_name:
-            return region.connect(**kw_params)
-    return None
+    import boto.beanstalk.layer1
+    return connect('elasticbeanstalk', region_name,
+                   connection_cls=boto.beanstalk.layer1.Layer1,
+                   **kw_params)
@@ -18,7 +18,7 @@
 # WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 # IN THE SOFTWARE.
-from boto.regioninfo import get_regions
+from boto.regioninfo import get_regions, connect
 
 
 def regions():
@@ -36,7 +36,7 @@ def regions():
 
 
 def connect_to_region(region_name, **kw_params):
-    for region in regions():
-        if region.name == region_name:
-            return region.connect(**kw_params)
-    return None
+    import boto.cloudsearch2.layer1
+    return connect('cloudsearch', region_name,
+                   connection_cls=boto.cloudsearch2.layer1.CloudSearchConnection,
+                   **kw_params)
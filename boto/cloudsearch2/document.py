@@ -21,11 +21,18 @@
 # IN THE SOFTWARE.
 #
 
+import threading
+
 import boto.exception
 from boto.compat import json
-import requests
 import boto
+from boto.cloudsearch2.sessions import get_session
 from boto.cloudsearchdomain.layer1 import CloudSearchDomainConnection
+from boto.pool import WorkerPool
+
+
+# The most a single upload batch may hold.
+MAX_BATCH_SIZE = 5 * 1024 * 1024
 
 
 class SearchServiceException(Exception):
@@ -59,6 +66,77 @@ class ContentTooLongError(Exception):
     pass
 
 
+def _encode_document(document, max_size):
+    # JSON is encoded as ASCII, so characters are bytes.
+    encoded = json.dumps(document)
+    if len(encoded) + 2 > max_size:
+        raise ContentTooLongError(
+            'Document %s encodes to %d bytes, more than the %d allowed '
+            'per batch' % (document.get('id'), len(encoded), max_size))
+    return encoded
+
+
+class _SDFBatch(object):
+    """
+    A batch being built up from encoded documents, which tracks the size
+    the whole batch will encode to.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.parts = []
+        self.documents = []
+        self.size = 2
+
+    def fits(self, encoded):
+        return not self.parts or \
+            self.size + len(encoded) + 2 <= self.max_size
+
+    def append(self, document, encoded):
+        if self.parts:
+            self.size += 2
+        self.size += len(encoded)
+        self.parts.append(encoded)
+        self.documents.append(document)
+
+    def encode(self):
+        return '[%s]' % ', '.join(self.parts)
+
+
+def encode_sdf_batches(documents, max_size=MAX_BATCH_SIZE):
+    """
+    Serializes ``documents`` to SDF one document at a time, splitting them
+    into consecutive batches that each encode to at most ``max_size``
+    bytes.  A batch is encoded exactly as ``json.dumps`` would encode its
+    list of documents.
+
+    :type documents: iterable
+    :param documents: The add and delete commands, as built by
+        :func:`DocumentServiceConnection.add` and
+        :func:`DocumentServiceConnection.delete`.
+
+    :type max_size: int
+    :param max_size: The largest batch to produce, in bytes.
+
+    :rtype: generator
+    :returns: ``(sdf, documents)`` for each batch.  An empty batch is
+        produced if there are no documents.
+
+    :raises: :class:`boto.cloudsearch2.document.ContentTooLongError` if a
+        single document is larger than ``max_size``.
+    """
+    batch = _SDFBatch(max_size)
+    produced = False
+    for document in documents:
+        encoded = _encode_document(document, max_size)
+        if not batch.fits(encoded):
+            yield batch.encode(), batch.documents
+            produced = True
+            batch = _SDFBatch(max_size)
+        batch.append(document, encoded)
+    if batch.documents or not produced:
+        yield batch.encode(), batch.documents
+
+
 class DocumentServiceConnection(object):
     """
     A CloudSearch document service.
@@ -84,15 +162,22 @@ class DocumentServiceConnection(object):
     you will need to :func:`clear_sdf` first to stop the previous batch of
     commands from being uploaded again.
 
+    Documents that add up to more than the 5MB upload limit are split into
+    several batches by :func:`commit`, which can upload them concurrently.
+    All connections to an endpoint share a pool of keep-alive connections
+    of up to ``pool_maxsize`` connections.
+
     """
+    MaxBatchSize = MAX_BATCH_SIZE
 
-    def __init__(self, domain=None, endpoint=None):
+    def __init__(self, domain=None, endpoint=None, pool_maxsize=None):
         self.domain = domain
         self.endpoint = endpoint
         if not self.endpoint:
             self.endpoint = domain.doc_service_endpoint
         self.documents_batch = []
         self._sdf = None
+        self.pool_maxsize = pool_maxsize
 
         # Copy proxy settings from connection and check if request should be signed
         self.proxy = {}
@@ -186,32 +271,43 @@ class DocumentServiceConnection(object):
         url = "http://%s/%s/documents/batch" % (self.endpoint, api_version)
 
         # Keep-alive is automatic in a post-1.0 requests world.
-        session = requests.Session()
-        session.proxies = self.proxy
-        adapter = requests.adapters.HTTPAdapter(
-            pool_connections=20,
-            pool_maxsize=50,
-            max_retries=5
-        )
-        session.mount('http://', adapter)
-        session.mount('https://', adapter)
-
+        session = get_session(self.endpoint, self.proxy, self.pool_maxsize)
         resp = session.post(url, data=sdf, headers={'Content-Type': 'application/json'})
         return resp
 
-    def commit(self):
+    def commit(self, num_threads=1):
         """
         Actually send an SDF to CloudSearch for processing
 
         If an SDF file has been explicitly loaded it will be used. Otherwise,
-        documents added through :func:`add` and :func:`delete` will be used.
+        documents added through :func:`add` and :func:`delete` will be used,
+        split into as many batches as the 5MB upload limit requires.
 
-        :rtype: :class:`CommitResponse`
-        :returns: A summary of documents added and deleted
-        """
-
-        sdf = self.get_sdf()
+        :type num_threads: int
+        :param num_threads: How many batches to upload at once.  Batches
+            are encoded while earlier ones are being uploaded.
 
+        :rtype: :class:`CommitResponse` or :class:`MultiCommitResponse`
+        :returns: A summary of documents added and deleted.  If the
+            documents had to be split, the summary covers every batch.
+        """
+        if self._sdf:
+            return self._commit_batch(self._sdf, self.documents_batch)
+
+        batches = encode_sdf_batches(self.documents_batch, self.MaxBatchSize)
+        first = next(batches)
+        second = next(batches, None)
+        if second is None:
+            return self._commit_batch(*first)
+
+        def all_batches():
+            yield first
+            yield second
+            for batch in batches:
+                yield batch
+        return self._commit_batches(all_batches(), num_threads)
+
+    def _commit_batch(self, sdf, documents):
         if ': null' in sdf:
             boto.log.error('null value in sdf detected. This will probably '
                            'raise 500 error.')
@@ -227,7 +323,24 @@ class DocumentServiceConnection(object):
         else:
             r = self._commit_without_auth(sdf, api_version)
 
-        return CommitResponse(r, self, sdf, signed_request=self.sign_request)
+        return CommitResponse(r, self, sdf, signed_request=self.sign_request,
+                              documents=documents)
+
+    def _commit_batches(self, batches, num_threads):
+        """
+        Uploads ``(sdf, documents)`` batches on ``num_threads`` threads and
+        returns the totals, with the responses in batch order.  At most
+        ``num_threads`` encoded batches wait to be uploaded at any time.
+        """
+        if num_threads <= 1:
+            return MultiCommitResponse(self._commit_batch(*batch)
+                                       for batch in batches)
+
+        with DocumentBatcher(self, self.MaxBatchSize, num_threads,
+                             keep_responses=True) as batcher:
+            for sdf, documents in batches:
+                batcher._submit(sdf, documents)
+        return batcher.result
 
 
 class CommitResponse(object):
@@ -240,16 +353,24 @@ class CommitResponse(object):
     :param doc_service: Object containing the documents posted and methods to
         retry
 
+    :type documents: list
+    :param documents: The documents posted, if they weren't all of those in
+        ``doc_service``
+
     :raises: :class:`boto.exception.BotoServerError`
     :raises: :class:`boto.cloudsearch2.document.SearchServiceException`
     :raises: :class:`boto.cloudsearch2.document.EncodingError`
     :raises: :class:`boto.cloudsearch2.document.ContentTooLongError`
     """
-    def __init__(self, response, doc_service, sdf, signed_request=False):
+    def __init__(self, response, doc_service, sdf, signed_request=False,
+                 documents=None):
         self.response = response
         self.doc_service = doc_service
         self.sdf = sdf
         self.signed_request = signed_request
+        self.documents = documents
+        if documents is None:
+            self.documents = doc_service.documents_batch
 
         if self.signed_request:
             self.content = response
@@ -292,7 +413,7 @@ class CommitResponse(object):
 
         :raises: :class:`boto.cloudsearch2.document.CommitMismatchError`
         """
-        commit_num = len([d for d in self.doc_service.documents_batch
+        commit_num = len([d for d in self.documents
                           if d['type'] == type_])
 
         if response_num != commit_num:
@@ -313,3 +434,194 @@ class CommitResponse(object):
             )
             exc.errors = self.errors
             raise exc
+
+
+class MultiCommitResponse(object):
+    """
+    The combined result of a commit that was uploaded in several batches.
+
+    :ivar responses: The :class:`CommitResponse` for each batch, in order,
+        unless ``keep_responses`` was false.
+    :ivar status: ``'success'`` if every batch succeeded, else ``'error'``.
+    :ivar adds: The number of documents added by all the batches.
+    :ivar deletes: The number of documents deleted by all the batches.
+    :ivar errors: The error messages reported for all the batches.
+    """
+    def __init__(self, responses=(), keep_responses=True):
+        self.keep_responses = keep_responses
+        self.responses = []
+        self.status = 'success'
+        self.adds = 0
+        self.deletes = 0
+        self.errors = []
+        for response in responses:
+            self.add(response)
+
+    def add(self, response):
+        """
+        Includes the result of another batch.
+
+        :type response: :class:`CommitResponse`
+        :param response: The response to the batch.
+        """
+        if self.keep_responses:
+            self.responses.append(response)
+        if response.status != 'success':
+            self.status = 'error'
+        self.adds += response.adds
+        self.deletes += response.deletes
+        self.errors.extend(response.errors)
+
+
+class DocumentBatcher(object):
+    """
+    Uploads add and delete commands in batches as they are made.
+
+    The size the pending batch will encode to is tracked as documents are
+    added, and the batch is handed to one of ``num_threads`` background
+    threads as soon as the next document would take it over ``max_size``.
+    At most ``num_threads`` batches wait to be uploaded; adding documents
+    blocks until one of them has been taken.  Memory use therefore stays
+    the same however many documents are sent.
+
+    The adds, deletes and errors of every batch are summed up in
+    :attr:`result`, which :func:`close` returns.  The batcher can be used
+    as a context manager, which closes it::
+
+        with DocumentBatcher(domain.get_document_service()) as batcher:
+            for row in rows:
+                batcher.add(row['id'], row)
+
+    :ivar result: A :class:`MultiCommitResponse` for the batches uploaded
+        so far.  It doesn't keep the individual responses.
+    """
+
+    def __init__(self, doc_service, max_size=MAX_BATCH_SIZE, num_threads=4,
+                 batch_callback=None, keep_responses=False):
+        """
+        :type doc_service: :class:`DocumentServiceConnection`
+        :param doc_service: The connection to upload batches with.
+
+        :type max_size: int
+        :param max_size: The largest batch to upload, in bytes.
+
+        :type num_threads: int
+        :param num_threads: How many batches to upload at once.
+
+        :type batch_callback: callable
+        :param batch_callback: Called from the uploading thread with the
+            :class:`CommitResponse` for each batch.
+
+        :type keep_responses: bool
+        :param keep_responses: Whether :attr:`result` keeps the response
+            to each batch, in the order the batches were made.
+        """
+        self.doc_service = doc_service
+        self.max_size = max_size
+        self.num_threads = max(num_threads, 1)
+        self.batch_callback = batch_callback
+        self.result = MultiCommitResponse(keep_responses=keep_responses)
+        self._batch = _SDFBatch(max_size)
+        self._pool = None
+        self._lock = threading.Lock()
+        self._num_batches = 0
+        self._batch_numbers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        elif self._pool is not None:
+            # Don't send a partial batch after a failure.
+            self._pool.stop()
+            self._pool.join()
+
+    def add(self, _id, fields):
+        """
+        Add a document, uploading the pending batch first if the document
+        doesn't fit in it.
+
+        :type _id: string
+        :param _id: A unique ID used to refer to this document.
+
+        :type fields: dict
+        :param fields: A dictionary of key-value pairs to be uploaded .
+        """
+        self._append({'type': 'add', 'id': _id, 'fields': fields})
+
+    def delete(self, _id):
+        """
+        Remove a document, uploading the pending batch first if the
+        command doesn't fit in it.
+
+        :type _id: string
+        :param _id: The unique ID of this document.
+        """
+        self._append({'type': 'delete', 'id': _id})
+
+    def _append(self, document):
+        self._check()
+        encoded = _encode_document(document, self.max_size)
+        if not self._batch.fits(encoded):
+            self.flush()
+        self._batch.append(document, encoded)
+
+    def flush(self):
+        """
+        Hands the documents added so far to the uploading threads.
+        """
+        self._check()
+        if not self._batch.documents:
+            return
+        batch, self._batch = self._batch, _SDFBatch(self.max_size)
+        self._submit(batch.encode(), batch.documents)
+
+    def _submit(self, sdf, documents):
+        if self._pool is None:
+            self._pool = WorkerPool(self.num_threads)
+            self._pool.start(self.num_threads, self._worker)
+        if not self._pool.put((self._num_batches, sdf, documents)):
+            self._check()
+        self._num_batches += 1
+
+    def close(self):
+        """
+        Uploads the pending batch and waits for every upload to finish.
+
+        :rtype: :class:`MultiCommitResponse`
+        :returns: The totals for every batch uploaded.
+
+        :raises: The first error raised by an upload.
+        """
+        try:
+            self.flush()
+        finally:
+            pool, self._pool = self._pool, None
+            if pool is not None:
+                pool.close()
+                pool.join()
+        if pool is not None:
+            pool.check()
+        if self.result.keep_responses:
+            # Uploads finish in any order.
+            pairs = sorted(zip(self._batch_numbers, self.result.responses),
+                           key=lambda pair: pair[0])
+            self.result.responses = [response for i, response in pairs]
+            self._batch_numbers = sorted(self._batch_numbers)
+        return self.result
+
+    def _check(self):
+        if self._pool is not None:
+            self._pool.check()
+
+    def _worker(self):
+        for number, sdf, documents in self._pool.work():
+            response = self.doc_service._commit_batch(sdf, documents)
+            with self._lock:
+                self.result.add(response)
+                if self.result.keep_responses:
+                    self._batch_numbers.append(number)
+            if self.batch_callback is not None:
+                self.batch_callback(response)
@@ -22,7 +22,7 @@
 #
 from math import ceil
 from boto.compat import json, map, six
-import requests
+from boto.cloudsearch2.sessions import get_session
 from boto.cloudsearchdomain.layer1 import CloudSearchDomainConnection
 
 SIMPLE = 'simple'
@@ -204,20 +204,20 @@ class Query(object):
 
 class SearchConnection(object):
 
-    def __init__(self, domain=None, endpoint=None):
+    def __init__(self, domain=None, endpoint=None, pool_maxsize=None):
         self.domain = domain
         self.endpoint = endpoint
-        self.session = requests.Session()
 
         # Endpoint needs to be set before initializing CloudSearchDomainConnection
         if not endpoint:
             self.endpoint = domain.search_service_endpoint
 
         # Copy proxy settings from connection and check if request should be signed
+        proxies = {}
         self.sign_request = False
         if self.domain and self.domain.layer1:
             if self.domain.layer1.use_proxy:
-                self.session.proxies['http'] = self.domain.layer1.get_proxy_url_with_auth()
+                proxies['http'] = self.domain.layer1.get_proxy_url_with_auth()
 
             self.sign_request = getattr(self.domain.layer1, 'sign_request', False)
 
@@ -231,6 +231,9 @@ class SearchConnection(object):
                     provider=layer1.provider
                 )
 
+        # Searches of the same endpoint share pooled connections.
+        self.session = get_session(self.endpoint, proxies, pool_maxsize)
+
     def build_query(self, q=None, parser=None, fq=None, rank=None, return_fields=None,
                     size=10, start=0, facet=None, highlight=None, sort=None,
                     partial=None, options=None):
@@ -0,0 +1,87 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+"""
+Long-lived HTTP sessions for the unsigned document and search endpoints.
+Every connection to an endpoint shares one session, so requests reuse
+its pooled keep-alive connections instead of opening new ones.
+"""
+import threading
+
+import requests
+
+import boto
+
+DefaultPoolSize = boto.config.getint('Boto', 'cs_pool_maxsize', 50)
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(endpoint, proxies=None, pool_maxsize=None):
+    """
+    Returns the session shared by connections to ``endpoint`` that use
+    the same proxies and pool size, creating it on first use.
+
+    :type endpoint: string
+    :param endpoint: The document or search service endpoint.
+
+    :type proxies: dict
+    :param proxies: Proxy URLs by scheme, as taken by ``requests``.
+
+    :type pool_maxsize: int
+    :param pool_maxsize: The most connections kept open to the endpoint.
+        This should be at least the number of threads sending requests.
+        Defaults to the ``cs_pool_maxsize`` option in the ``Boto``
+        section of the config, or 50.
+
+    :rtype: :class:`requests.Session`
+    """
+    if pool_maxsize is None:
+        pool_maxsize = DefaultPoolSize
+    proxies = dict(proxies or {})
+    key = (endpoint, tuple(sorted(proxies.items())), pool_maxsize)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            session.proxies = proxies
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=20,
+                pool_maxsize=pool_maxsize,
+                max_retries=5
+            )
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _sessions[key] = session
+    return session
+
+
+def clear_sessions():
+    """
+    Closes every shared session, so that later requests open new
+    connections.  A process should call this after forking, since the
+    pooled connections can't be shared with its parent.
+    """
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
@@ -19,7 +19,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 # IN THE SOFTWARE.
 #
-from boto.regioninfo import RegionInfo, get_regions
+from boto.regioninfo import RegionInfo, get_regions, connect
 
 
 def regions():
@@ -35,7 +35,7 @@ def regions():
 
 
 def connect_to_region(region_name, **kw_params):
-    for region in regions():
-        if region.name == region_name:
-            return region.connect(**kw_params)
-    return None
+    from boto.cloudsearchdomain.layer1 import CloudSearchDomainConnection
+    return connect('cloudsearchdomain', region_name,
+                   connection_cls=CloudSearchDomainConnection,
+                   **kw_params)
@@ -43,14 +43,14 @@
 Handles basic connections to AWS
 """
 from datetime import datetime
+import collections
 import errno
 import os
-import random
 import re
 import socket
 import sys
 import time
-import xml.sax
+import weakref
 import copy
 
 from boto import auth
@@ -65,8 +65,10 @@ from boto.compat import six, http_client, urlparse, quote, encodebytes
 from boto.exception import AWSConnectionError
 from boto.exception import BotoClientError
 from boto.exception import BotoServerError
+from boto.exception import ConnectionPoolTimeoutError
 from boto.exception import PleaseRetryException
 from boto.provider import Provider
+from boto.retry import RetryPolicy
 from boto.resultset import ResultSet
 
 HAVE_HTTPS_CONNECTION = False
@@ -90,6 +92,14 @@ ON_APP_ENGINE = all(key in os.environ for key in (
 PORTS_BY_SECURITY = {True: 443,
                      False: 80}
 
+# What a request loop does with a response, see
+# AWSAuthConnection._check_response.
+RETRY_NOW = 'retry-now'
+RETRY = 'retry'
+GIVE_UP = 'give-up'
+REDIRECT = 'redirect'
+DONE = 'done'
+
 DEFAULT_CA_CERTS_FILE = os.path.join(os.path.dirname(os.path.abspath(boto.cacerts.__file__)), "cacerts.txt")
 
 
@@ -98,29 +108,50 @@ class HostConnectionPool(object):
     """
     A pool of connections for one remote (host,port,is_secure).
 
-    When connections are added to the pool, they are put into a
-    pending queue.  The _mexe method returns connections to the pool
-    before the response body has been read, so they connections aren't
-    ready to send another request yet.  They stay in the pending queue
-    until they are ready for another request, at which point they are
-    returned to the pool of ready connections.
-
-    The pool of ready connections is an ordered list of
-    (connection,time) pairs, where the time is the time the connection
-    was returned from _mexe.  After a certain period of time,
-    connections are considered stale, and discarded rather than being
-    reused.  This saves having to wait for the connection to time out
-    if AWS has decided to close it on the other end because of
-    inactivity.
+    When connections are added to the pool, they may not be ready to
+    send another request yet: the _mexe method returns connections to
+    the pool before the response body has been read.  A connection
+    that is found to be busy when fetched is set aside in a pending
+    list until its response has been consumed.
+
+    The pool of ready connections is a deque of (connection,time)
+    pairs, ordered by the time the connection was returned from _mexe.
+    Connections are handed out newest first (LIFO), so a small set of
+    warm connections is reused and the rest age out.  After a certain
+    period of time, connections are considered stale, and closed
+    rather than being reused.  This saves having to wait for the
+    connection to time out if AWS has decided to close it on the other
+    end because of inactivity.
+
+    If ``maxsize`` is set, at most that many idle connections are kept
+    and the oldest ones are evicted when more are returned.  If
+    ``block`` is also set, ``maxsize`` bounds every connection handed
+    out for this host, idle or in use, and callers of the pool wait
+    for a connection to be returned instead of opening a new one.
 
     Thread Safety:
 
-        This class is used only from ConnectionPool while it's mutex
-        is held.
+        Each host pool has its own mutex, which ConnectionPool holds
+        around every call into this class.  Once ``removed`` is set
+        the pool has been dropped from its ConnectionPool and must
+        not be used any more.
     """
 
-    def __init__(self):
-        self.queue = []
+    def __init__(self, maxsize=None, block=False):
+        self.queue = collections.deque()
+        self.pending = []
+        self.maxsize = maxsize
+        self.block = block
+        self.mutex = threading.Lock()
+        self.condition = threading.Condition(self.mutex)
+        self.removed = False
+        # Number of connections handed out and not yet returned.  Only
+        # tracked for blocking pools, where it bounds new connections.
+        self.in_use = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.wait_time = 0.0
 
     def size(self):
         """
@@ -128,14 +159,43 @@ class HostConnectionPool(object):
         Some of the connections may still be in use, and may not be
         ready to be returned by get().
         """
-        return len(self.queue)
+        return len(self.queue) + len(self.pending)
+
+    def has_capacity(self):
+        """
+        Returns true if a new connection may be opened for this host.
+        """
+        if not self.block or self.maxsize is None:
+            return True
+        return self.in_use + self.size() < self.maxsize
+
+    def reserve(self):
+        """
+        Accounts for a new connection the caller is about to open.
+        """
+        if self.block:
+            self.in_use += 1
+
+    def release(self):
+        """
+        Accounts for a connection that was handed out and will not be
+        returned to the pool.
+        """
+        if self.block and self.in_use > 0:
+            self.in_use -= 1
 
     def put(self, conn):
         """
         Adds a connection to the pool, along with the time it was
-        added.
+        added.  If the pool is full, the oldest idle connection is
+        evicted.
         """
+        self.release()
         self.queue.append((conn, time.time()))
+        if self.maxsize is not None:
+            while self.queue and self.size() > self.maxsize:
+                (old_conn, _) = self.queue.popleft()
+                self._evict(old_conn)
 
     def get(self):
         """
@@ -145,18 +205,34 @@ class HostConnectionPool(object):
         # Discard ready connections that are too old.
         self.clean()
 
-        # Return the first connection that is ready, and remove it
-        # from the queue.  Connections that aren't ready are returned
-        # to the end of the queue with an updated time, on the
-        # assumption that somebody is actively reading the response.
-        for _ in range(len(self.queue)):
-            (conn, _) = self.queue.pop(0)
+        # Return the most recently returned connection that is ready.
+        # Connections that aren't ready are moved to the pending list
+        # with an updated time, on the assumption that somebody is
+        # actively reading the response.
+        while self.queue:
+            (conn, _) = self.queue.pop()
             if self._conn_ready(conn):
-                return conn
-            else:
-                self.put(conn)
+                return self._checkout(conn)
+            self.pending.append((conn, time.time()))
+
+        for i in range(len(self.pending) - 1, -1, -1):
+            conn = self.pending[i][0]
+            if self._conn_ready(conn):
+                del self.pending[i]
+                return self._checkout(conn)
         return None
 
+    def _checkout(self, conn):
+        self.reserve()
+        return conn
+
+    def _evict(self, conn):
+        # Only close connections that nobody is reading from; the
+        # others are dropped and closed by whoever holds the response.
+        if self._conn_ready(conn):
+            conn.close()
+        self.evictions += 1
+
     def _conn_ready(self, conn):
         """
         There is a nice state diagram at the top of http_client.py.  It
@@ -182,12 +258,20 @@ class HostConnectionPool(object):
 
     def clean(self):
         """
-        Get rid of stale connections.
+        Get rid of stale connections, closing the ones that are not
+        in the middle of a response.
         """
-        # Note that we do not close the connection here -- somebody
-        # may still be reading from it.
         while len(self.queue) > 0 and self._pair_stale(self.queue[0]):
-            self.queue.pop(0)
+            (conn, _) = self.queue.popleft()
+            self._evict(conn)
+        if self.pending:
+            fresh = []
+            for pair in self.pending:
+                if self._pair_stale(pair):
+                    self._evict(pair[0])
+                else:
+                    fresh.append(pair)
+            self.pending = fresh
 
     def _pair_stale(self, pair):
         """
@@ -199,6 +283,68 @@ class HostConnectionPool(object):
         return return_time + ConnectionPool.STALE_DURATION < now
 
 
+class ConnectionReaper(object):
+
+    """
+    A daemon thread that periodically cleans registered ConnectionPools,
+    so that stale connections are closed off the request path.
+
+    Pools are held through weak references, and the thread is started
+    the first time a pool is registered.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.pools = weakref.WeakValueDictionary()
+        self.mutex = threading.Lock()
+        self.thread = None
+
+    def register(self, pool):
+        with self.mutex:
+            self.pools[id(pool)] = pool
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run,
+                                               name='boto-connection-reaper')
+                self.thread.daemon = True
+                self.thread.start()
+
+    def unregister(self, pool):
+        with self.mutex:
+            self.pools.pop(id(pool), None)
+
+    def reap(self):
+        """
+        Cleans every registered pool once.
+        """
+        with self.mutex:
+            pools = list(self.pools.values())
+        for pool in pools:
+            try:
+                pool.clean(force=True)
+            except Exception:
+                boto.log.exception('Error cleaning connection pool')
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.reap()
+
+
+_reaper = None
+_reaper_lock = threading.Lock()
+
+
+def get_connection_reaper():
+    """
+    Returns the process-wide ConnectionReaper, creating it if needed.
+    """
+    global _reaper
+    with _reaper_lock:
+        if _reaper is None:
+            _reaper = ConnectionReaper(ConnectionPool.CLEAN_INTERVAL)
+        return _reaper
+
+
 class ConnectionPool(object):
 
     """
@@ -206,7 +352,20 @@ class ConnectionPool(object):
     time.  This saves time spent waiting for a connection that AWS has
     timed out on the other end.
 
-    This class is thread-safe.
+    The number of connections kept per host can be capped with the
+    ``max_pool_connections`` option in the Boto config section.  When
+    ``pool_block`` is also enabled, the cap applies to every
+    connection opened for a host, and requests wait up to
+    ``pool_timeout`` seconds for a connection to be returned before
+    raising ConnectionPoolTimeoutError.
+
+    Stale connections are cleaned up every CLEAN_INTERVAL seconds,
+    either inline on the request path or, if ``reaper`` is True (the
+    ``connection_reaper`` config option), by a background thread.
+
+    This class is thread-safe.  The pool-wide mutex only guards the
+    mapping of hosts to pools; requests for different hosts only
+    contend on their own HostConnectionPool's mutex.
     """
 
     #
@@ -228,7 +387,14 @@ class ConnectionPool(object):
 
     STALE_DURATION = 60.0
 
-    def __init__(self):
+    #
+    # How often a thread waiting on a full blocking pool re-checks
+    # for connections whose responses have been read in the meantime.
+    #
+
+    WAIT_INTERVAL = 0.1
+
+    def __init__(self, maxsize=None, block=None, timeout=None, reaper=None):
         # Mapping from (host,port,is_secure) to HostConnectionPool.
         # If a pool becomes empty, it is removed.
         self.host_to_pool = {}
@@ -238,6 +404,24 @@ class ConnectionPool(object):
         ConnectionPool.STALE_DURATION = \
             config.getfloat('Boto', 'connection_stale_duration',
                             ConnectionPool.STALE_DURATION)
+        if maxsize is None and config.has_option('Boto',
+                                                 'max_pool_connections'):
+            maxsize = config.getint('Boto', 'max_pool_connections')
+        if block is None:
+            block = config.getbool('Boto', 'pool_block', False)
+        if timeout is None and config.has_option('Boto', 'pool_timeout'):
+            timeout = config.getfloat('Boto', 'pool_timeout')
+        if reaper is None:
+            reaper = config.getbool('Boto', 'connection_reaper', False)
+        self.maxsize = maxsize
+        self.block = block and maxsize is not None
+        self.timeout = timeout
+        self.reaper = reaper
+        # Counters of host pools that have been removed.
+        self.retired_stats = {'hits': 0, 'misses': 0, 'evictions': 0,
+                              'wait_time': 0.0}
+        if self.reaper:
+            get_connection_reaper().register(self)
 
     def __getstate__(self):
         pickled_dict = copy.copy(self.__dict__)
@@ -246,13 +430,36 @@ class ConnectionPool(object):
         return pickled_dict
 
     def __setstate__(self, dct):
-        self.__init__()
+        self.__init__(dct.get('maxsize'), dct.get('block'),
+                      dct.get('timeout'), dct.get('reaper'))
 
     def size(self):
         """
         Returns the number of connections in the pool.
         """
-        return sum(pool.size() for pool in self.host_to_pool.values())
+        return sum(pool.size() for pool in list(self.host_to_pool.values()))
+
+    def stats(self):
+        """
+        Returns a dict of counters describing how the pool has been
+        used: ``hits`` and ``misses`` count requests for a connection
+        that were or were not served from the pool, ``evictions``
+        counts connections dropped for being stale or over the size
+        limit and ``wait_time`` is the total number of seconds spent
+        waiting on a full blocking pool.
+        """
+        with self.mutex:
+            stats = dict(self.retired_stats)
+            pools = list(self.host_to_pool.values())
+        stats['size'] = 0
+        for pool in pools:
+            with pool.mutex:
+                stats['hits'] += pool.hits
+                stats['misses'] += pool.misses
+                stats['evictions'] += pool.evictions
+                stats['wait_time'] += pool.wait_time
+                stats['size'] += pool.size()
+        return stats
 
     def get_http_connection(self, host, port, is_secure):
         """
@@ -260,44 +467,136 @@ class ConnectionPool(object):
         None if there is no connection that can be reused. It's the caller's
         responsibility to call close() on the connection when it's no longer
         needed.
+
+        When the pool is blocking and every connection for the host is
+        in use, this waits for one to be returned, raising
+        ConnectionPoolTimeoutError if none is available in time.
         """
-        self.clean()
-        with self.mutex:
-            key = (host, port, is_secure)
-            if key not in self.host_to_pool:
-                return None
-            return self.host_to_pool[key].get()
+        if not self.reaper:
+            self.clean()
+        key = (host, port, is_secure)
+        while True:
+            pool = self._get_pool(key)
+            with pool.mutex:
+                if pool.removed:
+                    continue
+                conn = self._get_or_reserve(pool)
+                if conn is not False:
+                    return conn
+                return self._wait_for_connection(pool, key)
+
+    def _get_pool(self, key):
+        pool = self.host_to_pool.get(key)
+        if pool is None:
+            with self.mutex:
+                pool = self.host_to_pool.get(key)
+                if pool is None:
+                    pool = HostConnectionPool(self.maxsize, self.block)
+                    self.host_to_pool[key] = pool
+        return pool
+
+    def _get_or_reserve(self, pool):
+        # Returns a pooled connection, None if the caller should open a
+        # new one, or False if it has to wait for one.  The caller must
+        # hold pool.mutex.
+        conn = pool.get()
+        if conn is not None:
+            pool.hits += 1
+            return conn
+        if pool.has_capacity():
+            pool.reserve()
+            pool.misses += 1
+            return None
+        return False
+
+    def _wait_for_connection(self, pool, key):
+        # Waits on a full blocking host pool; the caller holds
+        # pool.mutex.  The pool cannot be removed meanwhile since it
+        # has connections in use.
+        start = time.time()
+        try:
+            while True:
+                remaining = self.WAIT_INTERVAL
+                if self.timeout is not None:
+                    remaining = min(remaining,
+                                    start + self.timeout - time.time())
+                    if remaining <= 0:
+                        raise ConnectionPoolTimeoutError(
+                            'Timed out waiting for a connection to '
+                            '%s:%s' % key[:2])
+                pool.condition.wait(remaining)
+                conn = self._get_or_reserve(pool)
+                if conn is not False:
+                    return conn
+        finally:
+            pool.wait_time += time.time() - start
 
     def put_http_connection(self, host, port, is_secure, conn):
         """
         Adds a connection to the pool of connections that can be
         reused for the named host.
         """
-        with self.mutex:
-            key = (host, port, is_secure)
-            if key not in self.host_to_pool:
-                self.host_to_pool[key] = HostConnectionPool()
-            self.host_to_pool[key].put(conn)
+        key = (host, port, is_secure)
+        while True:
+            pool = self._get_pool(key)
+            with pool.mutex:
+                if pool.removed:
+                    continue
+                pool.put(conn)
+                if self.block:
+                    pool.condition.notify()
+                return
 
-    def clean(self):
+    def release_http_connection(self, host, port, is_secure, conn=None):
+        """
+        Gives up a connection that was handed out for the named host
+        and will not be put back, closing it if given.
+        """
+        if conn is not None:
+            conn.close()
+        if not self.block:
+            return
+        pool = self.host_to_pool.get((host, port, is_secure))
+        if pool is not None:
+            with pool.mutex:
+                pool.release()
+                pool.condition.notify()
+
+    def clean(self, force=False):
         """
         Clean up the stale connections in all of the pools, and then
         get rid of empty pools.  Pools clean themselves every time a
         connection is fetched; this cleaning takes care of pools that
         aren't being used any more, so nothing is being gotten from
         them.
+
+        Unless ``force`` is True, this does nothing if the pools were
+        cleaned less than CLEAN_INTERVAL seconds ago.
         """
+        now = time.time()
+        if not force and self.last_clean_time + self.CLEAN_INTERVAL >= now:
+            return
+        self.last_clean_time = now
         with self.mutex:
-            now = time.time()
-            if self.last_clean_time + self.CLEAN_INTERVAL < now:
-                to_remove = []
-                for (host, pool) in self.host_to_pool.items():
-                    pool.clean()
-                    if pool.size() == 0:
-                        to_remove.append(host)
-                for host in to_remove:
-                    del self.host_to_pool[host]
-                self.last_clean_time = now
+            items = list(self.host_to_pool.items())
+        to_remove = []
+        for (key, pool) in items:
+            with pool.mutex:
+                pool.clean()
+                if pool.size() == 0 and pool.in_use == 0:
+                    to_remove.append((key, pool))
+        if not to_remove:
+            return
+        with self.mutex:
+            for (key, pool) in to_remove:
+                with pool.mutex:
+                    if (self.host_to_pool.get(key) is not pool or
+                            pool.size() != 0 or pool.in_use != 0):
+                        continue
+                    pool.removed = True
+                    del self.host_to_pool[key]
+                    for name in self.retired_stats:
+                        self.retired_stats[name] += getattr(pool, name)
 
 
 class HTTPRequest(object):
@@ -570,6 +869,11 @@ class AWSAuthConnection(object):
         if getattr(self, 'AuthServiceName', None) is not None:
             self.auth_service_name = self.AuthServiceName
         self.request_hook = None
+        self.retry_policy = RetryPolicy.from_config(
+            '%s:%s' % (self.host, self.port))
+        prewarm_connections = config.getint('Boto', 'prewarm_connections', 0)
+        if prewarm_connections > 0:
+            self.prewarm(prewarm_connections)
 
     def __repr__(self):
         return '%s:%s' % (self.__class__.__name__, self.host)
@@ -780,6 +1084,85 @@ class AWSAuthConnection(object):
     def put_http_connection(self, host, port, is_secure, connection):
         self._pool.put_http_connection(host, port, is_secure, connection)
 
+    def prewarm(self, num_connections, host=None, port=None, is_secure=None,
+                hosts=None):
+        """
+        Opens connections in parallel and adds them to the connection
+        pool, so that the first requests don't have to wait for TCP and
+        SSL handshakes.  Secure connections through a proxy are
+        tunnelled with ``proxy_ssl`` as usual.
+
+        Every connection is connected before it is pooled.  Those that
+        can't be established are logged, closed and left out of the pool.
+
+        Pooled connections are only used by requests to the same host,
+        so connections to the service endpoint don't help requests that
+        are sent somewhere else.  For example, S3 sends requests for
+        virtual-hosted buckets to ``<bucket>.s3.amazonaws.com``; pass
+        those names as ``hosts`` to warm them.
+
+        :type num_connections: int
+        :param num_connections: The number of connections to open to
+            each host.  It is capped to the pool's
+            ``max_pool_connections``, if set.
+
+        :type host: str
+        :param host: The host to connect to.  Defaults to the
+            connection's host.
+
+        :type port: int
+        :param port: The port to connect to.  Defaults to the
+            connection's port.
+
+        :type is_secure: bool
+        :param is_secure: Whether to use SSL.  Defaults to the
+            connection's ``is_secure``.
+
+        :type hosts: list
+        :param hosts: The hosts to connect to, instead of ``host``.
+
+        :rtype: int
+        :return: The number of connections added to the pool.
+        """
+        if hosts is None:
+            hosts = [host or self.host]
+        port = port or self.port
+        if is_secure is None:
+            is_secure = self.is_secure
+        if self._pool.maxsize is not None:
+            num_connections = min(num_connections, self._pool.maxsize)
+        opened = []
+
+        def open_connection(host):
+            connection = None
+            try:
+                connection = self.new_http_connection(host, port, is_secure)
+                # Tunnelled connections already have a connected socket.
+                if getattr(connection, 'sock', None) is None:
+                    connection.connect()
+            except Exception as e:
+                boto.log.warning('Unable to pre-warm connection to %s:%s: %s',
+                                 host, port, e)
+                if connection is not None:
+                    connection.close()
+            else:
+                opened.append((host, connection))
+
+        threads = [threading.Thread(target=open_connection, args=(name,))
+                   for name in hosts for i in range(num_connections)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for host, connection in opened:
+            self.put_http_connection(host, port, is_secure, connection)
+        boto.log.debug('Pre-warmed %d connections to %s on port %s',
+                       len(opened), ', '.join(hosts), port)
+        return len(opened)
+
+    def release_http_connection(self, host, port, is_secure, connection):
+        self._pool.release_http_connection(host, port, is_secure, connection)
+
     def proxy_ssl(self, host=None, port=None):
         if host and port:
             host = '%s:%d' % (host, port)
@@ -883,6 +1266,22 @@ class AWSAuthConnection(object):
     def set_request_hook(self, hook):
         self.request_hook = hook
 
+    def prepare_request(self, request):
+        """
+        Authorizes ``request`` and sets its final headers, ready to be
+        sent.  This is done again before every retry.
+        """
+        boto.log.debug('Token: %s' % self.provider.security_token)
+        request.authorize(connection=self)
+        # Only force header for non-s3 connections, because s3 uses
+        # an older signing method + bucket resource URLs that include
+        # the port info. All others should be now be up to date and
+        # not include the port.
+        if 's3' not in self._required_auth_capability():
+            if not getattr(self, 'anon', False):
+                self.set_host_header(request)
+        boto.log.debug('Final headers: %s' % request.headers)
+
     def _mexe(self, request, sender=None, override_num_retries=None,
               retry_handler=None):
         """
@@ -904,11 +1303,11 @@ class AWSAuthConnection(object):
         response = None
         body = None
         ex = None
-        if override_num_retries is None:
-            num_retries = config.getint('Boto', 'num_retries', self.num_retries)
-        else:
-            num_retries = override_num_retries
+        policy = self.retry_policy
+        num_retries = self._get_num_retries(override_num_retries)
         i = 0
+        next_sleep = None
+        policy.before_request('to %s' % request.host)
         connection = self.get_http_connection(request.host, request.port,
                                               self.is_secure)
 
@@ -918,21 +1317,11 @@ class AWSAuthConnection(object):
             request.body = request.body.encode('utf-8')
 
         while i <= num_retries:
-            # Use binary exponential backoff to desynchronize client requests.
-            next_sleep = min(random.random() * (2 ** i),
-                             boto.config.get('Boto', 'max_retry_delay', 60))
+            # Use jittered backoff to desynchronize client requests.
+            next_sleep = policy.next_delay(next_sleep)
             try:
                 # we now re-sign each request before it is retried
-                boto.log.debug('Token: %s' % self.provider.security_token)
-                request.authorize(connection=self)
-                # Only force header for non-s3 connections, because s3 uses
-                # an older signing method + bucket resource URLs that include
-                # the port info. All others should be now be up to date and
-                # not include the port.
-                if 's3' not in self._required_auth_capability():
-                    if not getattr(self, 'anon', False):
-                        self.set_host_header(request)
-                boto.log.debug('Final headers: %s' % request.headers)
+                self.prepare_request(request)
                 request.start_time = datetime.now()
                 if callable(sender):
                     response = sender(connection, request.method, request.path,
@@ -942,30 +1331,20 @@ class AWSAuthConnection(object):
                                        request.body, request.headers)
                     response = connection.getresponse()
                 boto.log.debug('Response headers: %s' % response.getheaders())
-                location = response.getheader('location')
                 # -- gross hack --
                 # http_client gets confused with chunked responses to HEAD requests
                 # so I have to fake it out
                 if request.method == 'HEAD' and getattr(response,
                                                         'chunked', False):
                     response.chunked = 0
-                if callable(retry_handler):
-                    status = retry_handler(response, i, next_sleep)
-                    if status:
-                        msg, i, next_sleep = status
-                        if msg:
-                            boto.log.debug(msg)
-                        time.sleep(next_sleep)
-                        continue
-                if response.status in [500, 502, 503, 504]:
-                    msg = 'Received %d response.  ' % response.status
-                    msg += 'Retrying in %3.1f seconds' % next_sleep
-                    boto.log.debug(msg)
-                    body = response.read()
-                    if isinstance(body, bytes):
-                        body = body.decode('utf-8')
-                elif response.status < 300 or response.status >= 400 or \
-                        not location:
+                action, i, next_sleep, body = self._check_response(
+                    request, response, i, next_sleep, retry_handler)
+                if action == RETRY_NOW:
+                    time.sleep(next_sleep)
+                    continue
+                elif action == GIVE_UP:
+                    break
+                elif action == DONE:
                     # don't return connection to the pool if response contains
                     # Connection:close header, because the connection has been
                     # closed and default reconnect behavior may do something
@@ -973,54 +1352,147 @@ class AWSAuthConnection(object):
                     # less efficient to try to reuse a closed connection.
                     conn_header_value = response.getheader('connection')
                     if conn_header_value == 'close':
-                        connection.close()
+                        self.release_http_connection(request.host,
+                                                     request.port,
+                                                     self.is_secure,
+                                                     connection)
                     else:
                         self.put_http_connection(request.host, request.port,
                                                  self.is_secure, connection)
-                    if self.request_hook is not None:
-                        self.request_hook.handle_request_data(request, response)
                     return response
-                else:
-                    scheme, request.host, request.path, \
-                        params, query, fragment = urlparse(location)
-                    if query:
-                        request.path += '?' + query
-                    # urlparse can return both host and port in netloc, so if
-                    # that's the case we need to split them up properly
-                    if ':' in request.host:
-                        request.host, request.port = request.host.split(':', 1)
-                    msg = 'Redirecting: %s' % scheme + '://'
-                    msg += request.host + request.path
-                    boto.log.debug(msg)
+                elif action == REDIRECT:
+                    self.release_http_connection(request.host, request.port,
+                                                 self.is_secure, connection)
+                    scheme = self._follow_redirect(request, response)
                     connection = self.get_http_connection(request.host,
                                                           request.port,
                                                           scheme == 'https')
                     response = None
                     continue
-            except PleaseRetryException as e:
-                boto.log.debug('encountered a retry exception: %s' % e)
-                connection = self.new_http_connection(request.host, request.port,
-                                                      self.is_secure)
-                response = e.response
-                ex = e
-            except self.http_exceptions as e:
-                for unretryable in self.http_unretryable_exceptions:
-                    if isinstance(e, unretryable):
-                        boto.log.debug(
-                            'encountered unretryable %s exception, re-raising' %
-                            e.__class__.__name__)
-                        raise
-                boto.log.debug('encountered %s exception, reconnecting' %
-                               e.__class__.__name__)
+            except Exception as e:
+                if not self._is_retryable_error(e, self.http_exceptions):
+                    self.release_http_connection(request.host, request.port,
+                                                 self.is_secure, connection)
+                    raise
                 connection = self.new_http_connection(request.host, request.port,
                                                       self.is_secure)
+                if isinstance(e, PleaseRetryException):
+                    response = e.response
                 ex = e
-            time.sleep(next_sleep)
             i += 1
+            if i > num_retries:
+                break
+            if not policy.allow_retry():
+                boto.log.debug('Retry budget exhausted, giving up')
+                break
+            time.sleep(next_sleep)
+        self.release_http_connection(request.host, request.port,
+                                     self.is_secure, connection)
         # If we made it here, it's because we have exhausted our retries
         # and stil haven't succeeded.  So, if we have a response object,
         # use it to raise an exception.
         # Otherwise, raise the exception that must have already happened.
+        self._raise_request_error(request, response, body, ex)
+
+    def _get_num_retries(self, override_num_retries=None):
+        if override_num_retries is not None:
+            return override_num_retries
+        num_retries = self.retry_policy.num_retries
+        if num_retries is None:
+            num_retries = self.num_retries
+        return num_retries
+
+    def _check_response(self, request, response, i, next_sleep,
+                        retry_handler=None):
+        """
+        Decides what a request loop does with ``response``, recording
+        the outcome with the retry policy.  Shared by ``_mexe`` and the
+        asyncio transport, so that both retry the same way.
+
+        Returns a tuple of ``(action, i, next_sleep, body)``: ``action``
+        is one of ``RETRY_NOW`` (the retry handler asked for another
+        attempt after ``next_sleep``), ``GIVE_UP`` (the retry budget is
+        spent), ``RETRY`` (a server error, retried like a failed
+        connection), ``DONE`` or ``REDIRECT``.  ``body`` is the decoded
+        body of a failed response.
+        """
+        policy = self.retry_policy
+        if callable(retry_handler):
+            status = retry_handler(response, i, next_sleep)
+            if status:
+                msg, i, next_sleep = status
+                if msg:
+                    boto.log.debug(msg)
+                policy.record_failure()
+                if not policy.allow_retry():
+                    boto.log.debug('Retry budget exhausted, giving up')
+                    return GIVE_UP, i, next_sleep, self._read_body(response)
+                return RETRY_NOW, i, next_sleep, None
+        if response.status in [500, 502, 503, 504]:
+            msg = 'Received %d response.  ' % response.status
+            msg += 'Retrying in %3.1f seconds' % next_sleep
+            boto.log.debug(msg)
+            policy.record_failure()
+            return RETRY, i, next_sleep, self._read_body(response)
+        if response.status < 300 or response.status >= 400 or \
+                not response.getheader('location'):
+            policy.record_success()
+            if self.request_hook is not None:
+                self.request_hook.handle_request_data(request, response)
+            return DONE, i, next_sleep, None
+        return REDIRECT, i, next_sleep, None
+
+    def _read_body(self, response):
+        body = response.read()
+        if isinstance(body, bytes):
+            body = body.decode('utf-8')
+        return body
+
+    def _follow_redirect(self, request, response):
+        """
+        Points ``request`` at the location ``response`` redirects to and
+        returns the new scheme.
+        """
+        scheme, request.host, request.path, \
+            params, query, fragment = urlparse(response.getheader('location'))
+        if query:
+            request.path += '?' + query
+        # urlparse can return both host and port in netloc, so if
+        # that's the case we need to split them up properly
+        if ':' in request.host:
+            request.host, request.port = request.host.split(':', 1)
+        msg = 'Redirecting: %s' % scheme + '://'
+        msg += request.host + request.path
+        boto.log.debug(msg)
+        return scheme
+
+    def _is_retryable_error(self, e, retryable, unretryable=()):
+        """
+        Records a failed attempt and returns whether the exception ``e``
+        may be retried: it must be a ``PleaseRetryException`` or one of
+        ``retryable``, but none of ``http_unretryable_exceptions`` or
+        ``unretryable``.
+        """
+        # Always record the outcome, or a half-open circuit breaker
+        # would never close or re-open.
+        self.retry_policy.record_failure()
+        if isinstance(e, PleaseRetryException):
+            boto.log.debug('encountered a retry exception: %s' % e)
+            return True
+        if not isinstance(e, retryable):
+            return False
+        unretryable = tuple(self.http_unretryable_exceptions) + \
+            tuple(unretryable)
+        if isinstance(e, unretryable):
+            boto.log.debug(
+                'encountered unretryable %s exception, re-raising' %
+                e.__class__.__name__)
+            return False
+        boto.log.debug('encountered %s exception, reconnecting' %
+                       e.__class__.__name__)
+        return True
+
+    def _raise_request_error(self, request, response, body, ex):
         if self.request_hook is not None:
             self.request_hook.handle_request_data(request, response, error=True)
         if response:
@@ -1177,7 +1649,7 @@ class AWSQueryConnection(AWSAuthConnection):
             h = boto.handler.XmlHandler(rs, parent)
             if isinstance(body, six.text_type):
                 body = body.encode('utf-8')
-            xml.sax.parseString(body, h)
+            boto.handler.parse_xml(body, h)
             return rs
         else:
             boto.log.error('%s %s' % (response.status, response.reason))
@@ -1199,7 +1671,7 @@ class AWSQueryConnection(AWSAuthConnection):
             h = boto.handler.XmlHandler(obj, parent)
             if isinstance(body, six.text_type):
                 body = body.encode('utf-8')
-            xml.sax.parseString(body, h)
+            boto.handler.parse_xml(body, h)
             return obj
         else:
             boto.log.error('%s %s' % (response.status, response.reason))
@@ -1218,7 +1690,7 @@ class AWSQueryConnection(AWSAuthConnection):
         elif response.status == 200:
             rs = ResultSet()
             h = boto.handler.XmlHandler(rs, parent)
-            xml.sax.parseString(body, h)
+            boto.handler.parse_xml(body, h)
             return rs.status
         else:
             boto.log.error('%s %s' % (response.status, response.reason))
@@ -21,7 +21,7 @@
 # IN THE SOFTWARE.
 #
 
-from boto.regioninfo import RegionInfo, get_regions
+from boto.regioninfo import RegionInfo, get_regions, connect
 
 
 def regions():
@@ -36,7 +36,7 @@ def regions():
 
 
 def connect_to_region(region_name, **kw_params):
-    for region in regions():
-        if region.name == region_name:
-            return region.connect(**kw_params)
-    return None
+    from boto.dynamodb2.layer1 import DynamoDBConnection
+    return connect('dynamodb', region_name,
+                   connection_cls=DynamoDBConnection,
+                   **kw_params)
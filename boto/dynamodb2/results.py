@@ -1,3 +1,11 @@
+import threading
+import time
+
+from boto.compat import Queue
+from boto.dynamodb2.types import Dynamizer
+from boto.pool import END, WorkerPool
+
+
 class ResultSet(object):
     """
     A class used to lazily handle page-to-page navigation through a set of
@@ -202,3 +210,232 @@ class BatchGetResultSet(ResultSet):
         # Decrease the limit, if it's present.
         if self.call_kwargs.get('limit'):
             self.call_kwargs['limit'] -= len(results['results'])
+
+
+class _CapacityThrottle(object):
+    """
+    Paces requests so that the capacity they consume stays below
+    ``units_per_second`` on average.
+
+    Capacity is only known once a response comes back, so consumption
+    is recorded after the fact and the caller sleeps off any debt.
+    """
+    def __init__(self, units_per_second):
+        self.rate = float(units_per_second)
+        self.available = self.rate
+        self.last = time.time()
+        self.lock = threading.Lock()
+
+    def consume(self, units):
+        with self.lock:
+            now = time.time()
+            self.available = min(self.rate,
+                                 self.available + (now - self.last) * self.rate)
+            self.last = now
+            self.available -= units
+            wait = max(0, -self.available / self.rate)
+        if wait:
+            time.sleep(wait)
+
+
+class ParallelScanResultSet(object):
+    """
+    An iterator over the results of a parallel scan.
+
+    The segments of the scan are read by a pool of worker threads, which
+    run at most ``prefetch`` pages ahead of the consumer.  Results come
+    back in no particular order across segments, but in order within
+    each segment.
+
+    ``checkpoint()`` returns, for every segment that has been started,
+    the last key of the last page that has been fully consumed, or
+    ``None`` if the segment is finished.  Passing that dictionary back
+    to ``Table.parallel_scan`` restarts the scan from that point, so a
+    page that was being consumed when the process died is read again
+    rather than lost.  Segments are given as strings and key values in
+    DynamoDB's wire format, so the checkpoint can be stored as JSON.
+    """
+    def __init__(self, total_segments, workers=None, max_page_size=None,
+                 prefetch=None, max_read_capacity=None, checkpoint=None,
+                 dynamizer=None):
+        self.total_segments = total_segments
+        self.workers = min(workers or total_segments, total_segments)
+        self.the_callable = None
+        self.call_args = []
+        self.call_kwargs = {}
+        self._max_page_size = max_page_size
+        self._prefetch = prefetch or self.workers * 2
+        self._throttle = None
+        if max_read_capacity:
+            self._throttle = _CapacityThrottle(max_read_capacity)
+        self._dynamizer = dynamizer or Dynamizer()
+        self._checkpoint = self._decode_checkpoint(checkpoint or {})
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pages = None
+        self._workers_left = 0
+        self._results = []
+        self._offset = 0
+        self._current = None
+
+    def to_call(self, the_callable, *args, **kwargs):
+        """
+        Sets up the callable, usually ``Table._scan``, & any arguments to
+        run it with.  ``segment``, ``total_segments``, ``limit`` and
+        ``exclusive_start_key`` are filled in for each page.
+        """
+        if not callable(the_callable):
+            raise ValueError(
+                'You must supply an object or function to be called.'
+            )
+
+        self.the_callable = the_callable
+        self.call_args = args
+        self.call_kwargs = kwargs
+
+    def checkpoint(self):
+        """
+        Returns a dictionary mapping each started segment to the last
+        key consumed from it, or to ``None`` if it is finished.
+
+        Segments are strings and keys are encoded as DynamoDB expects
+        them (e.g. ``{'id': {'N': '5'}}``), so the result round-trips
+        through ``json``.
+        """
+        with self._lock:
+            checkpoint = dict(self._checkpoint)
+
+        encoded = {}
+
+        for segment, last_key in checkpoint.items():
+            if last_key is not None:
+                last_key = dict(
+                    (name, self._dynamizer.encode(value))
+                    for name, value in last_key.items()
+                )
+
+            encoded[str(segment)] = last_key
+
+        return encoded
+
+    def _decode_checkpoint(self, checkpoint):
+        # Accepts both what ``checkpoint()`` returns & the decoded keys
+        # earlier versions handed out. Key attributes are only ever
+        # strings, numbers or binary, so a dict value is still encoded.
+        decoded = {}
+
+        for segment, last_key in checkpoint.items():
+            if last_key is not None:
+                last_key = dict(
+                    (name, self._dynamizer.decode(value)
+                     if isinstance(value, dict) else value)
+                    for name, value in last_key.items()
+                )
+
+            decoded[int(segment)] = last_key
+
+        return decoded
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._pages is None:
+            self._start()
+
+        while self._offset >= len(self._results):
+            self._page_consumed()
+
+            if self._workers_left == 0:
+                raise StopIteration()
+
+            try:
+                page = self._pool.get(self._pages)
+            except Exception:
+                self.close()
+                raise
+
+            if page is END:
+                self._workers_left -= 1
+                continue
+
+            segment, self._results, last_key = page
+            self._current = (segment, last_key)
+            self._offset = 0
+
+        result = self._results[self._offset]
+        self._offset += 1
+        return result
+
+    next = __next__
+
+    def close(self):
+        """
+        Stops the worker threads.  Called automatically when the scan
+        fails; call it to abandon a scan part way through.
+        """
+        if self._pool is not None:
+            self._pool.stop()
+            self._pool.join()
+        self._workers_left = 0
+        self._results = []
+        self._offset = 0
+
+    def _start(self):
+        self._pages = Queue(self._prefetch)
+        self._pool = WorkerPool()
+
+        for segment in range(self.total_segments):
+            self._pool.put(segment)
+
+        self._workers_left = self.workers
+        self._pool.start(self.workers, self._worker)
+        self._pool.close()
+
+    def _page_consumed(self):
+        if self._current is not None:
+            segment, last_key = self._current
+
+            with self._lock:
+                self._checkpoint[segment] = last_key
+
+            self._current = None
+
+    def _worker(self):
+        for segment in self._pool.work():
+            self._scan_segment(segment)
+
+        self._pool.put(END, self._pages)
+
+    def _scan_segment(self, segment):
+        with self._lock:
+            started = segment in self._checkpoint
+            last_key = self._checkpoint.get(segment)
+
+        if started and last_key is None:
+            # Finished before the scan was restarted.
+            return
+
+        while not self._pool.stopped:
+            kwargs = self.call_kwargs.copy()
+            kwargs['segment'] = segment
+            kwargs['total_segments'] = self.total_segments
+            kwargs['limit'] = self._max_page_size
+
+            if last_key is not None:
+                kwargs['exclusive_start_key'] = last_key
+
+            if self._throttle is not None:
+                kwargs['return_consumed_capacity'] = 'TOTAL'
+
+            results = self.the_callable(*self.call_args, **kwargs)
+
+            if self._throttle is not None:
+                self._throttle.consume(results.get('consumed_capacity') or 0)
+
+            last_key = results.get('last_key', None)
+            self._pool.put((segment, results.get('results', []), last_key),
+                           self._pages)
+
+            if last_key is None:
+                return
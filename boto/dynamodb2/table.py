@@ -1,3 +1,6 @@
+import threading
+import time
+
 import boto
 from boto.dynamodb2 import exceptions
 from boto.dynamodb2.fields import (HashKey, RangeKey,
@@ -6,10 +9,12 @@ from boto.dynamodb2.fields import (HashKey, RangeKey,
                                    GlobalIncludeIndex)
 from boto.dynamodb2.items import Item
 from boto.dynamodb2.layer1 import DynamoDBConnection
-from boto.dynamodb2.results import ResultSet, BatchGetResultSet
+from boto.dynamodb2.results import ResultSet, BatchGetResultSet, \
+    ParallelScanResultSet
 from boto.dynamodb2.types import (NonBooleanDynamizer, Dynamizer, FILTER_OPERATORS,
                                   QUERY_OPERATORS, STRING)
 from boto.exception import JSONResponseError
+from boto.pool import WorkerPool
 
 
 class Table(object):
@@ -778,7 +783,7 @@ class Table(object):
 
         return [field.name for field in self.schema]
 
-    def batch_write(self):
+    def batch_write(self, workers=None, stats_callback=None):
         """
         Allows the batching of writes to DynamoDB.
 
@@ -818,7 +823,29 @@ class Table(object):
             ...     # Nothing yet, but once we leave the context, the
             ...     # put/deletes will be sent.
 
+        Optionally accepts a ``workers`` parameter, which should be an integer
+        count of threads to send batches with. Several batches are then in
+        flight at once, unprocessed items are retried with an exponential
+        backoff & the number of concurrent requests adapts to throttling.
+        (Default: ``None`` - send each batch synchronously)
+
+        Optionally accepts a ``stats_callback`` parameter, which should be a
+        callable. When ``workers`` is given, it is called about once a second
+        with a dictionary of write statistics.
+
+        Example::
+
+            >>> with users.batch_write(workers=8) as batch:
+            ...     for data in load_users():
+            ...         batch.put_item(data=data)
+            >>> batch.stats()['items_written']
+            1000000
+
         """
+        if workers:
+            return ConcurrentBatchTable(self, workers=workers,
+                                        stats_callback=stats_callback)
+
         # PHENOMENAL COSMIC DOCS!!! itty-bitty code.
         return BatchTable(self)
 
@@ -1283,9 +1310,81 @@ class Table(object):
         results.to_call(self._scan, **kwargs)
         return results
 
+    def parallel_scan(self, total_segments, workers=None, max_page_size=None,
+                      prefetch=None, max_read_capacity=None, checkpoint=None,
+                      attributes=None, conditional_operator=None,
+                      **filter_kwargs):
+        """
+        Scans across all items within a DynamoDB table, reading several
+        segments of the table at once.
+
+        Requires a ``total_segments`` parameter, which should be an integer
+        count of the number of segments to divide the table into. Each
+        segment is read by one of a pool of worker threads.
+
+        Optionally accepts a ``workers`` parameter, which should be an
+        integer count of threads to read segments with. (Default: ``None`` -
+        one thread per segment)
+
+        Optionally accepts a ``max_page_size`` parameter, which should be an
+        integer count of the maximum number of items to retrieve
+        **per-request**. (Default: ``None`` - fetch as many as DynamoDB will
+        return)
+
+        Optionally accepts a ``prefetch`` parameter, which should be an
+        integer count of pages the workers may read ahead of the consumer.
+        (Default: ``None`` - twice the number of workers)
+
+        Optionally accepts a ``max_read_capacity`` parameter, which should be
+        the number of read capacity units per second the scan may consume,
+        as reported by DynamoDB's ``ConsumedCapacity``. Workers slow down to
+        stay under it. (Default: ``None`` - no limit)
+
+        Optionally accepts a ``checkpoint`` parameter, which should be a
+        dictionary returned by the ``checkpoint()`` method of an earlier
+        scan's results, or that dictionary after a round trip through
+        ``json``. The scan restarts from where that one got to. (Default: ``None`` - scan the whole table)
+
+        Filters, ``attributes`` & ``conditional_operator`` work as they do
+        for ``scan``.
+
+        Returns a ``ParallelScanResultSet``, an iterator over the items of
+        every segment.
+
+        Example::
+
+            >>> results = users.parallel_scan(total_segments=8, workers=4)
+            >>> try:
+            ...     for res in results:
+            ...         export(res)
+            ... finally:
+            ...     save(results.checkpoint())
+
+            # Later, after a crash.
+            >>> results = users.parallel_scan(total_segments=8, workers=4,
+            ...                               checkpoint=load())
+
+        """
+        results = ParallelScanResultSet(
+            total_segments,
+            workers=workers,
+            max_page_size=max_page_size,
+            prefetch=prefetch,
+            max_read_capacity=max_read_capacity,
+            checkpoint=checkpoint,
+            dynamizer=self._dynamizer
+        )
+        kwargs = filter_kwargs.copy()
+        kwargs.update({
+            'attributes': attributes,
+            'conditional_operator': conditional_operator,
+        })
+        results.to_call(self._scan, **kwargs)
+        return results
+
     def _scan(self, limit=None, exclusive_start_key=None, segment=None,
               total_segments=None, attributes=None, conditional_operator=None,
-              **filter_kwargs):
+              return_consumed_capacity=None, **filter_kwargs):
         """
         The internal method that performs the actual scan. Used extensively
         by ``ResultSet`` to perform each (paginated) request.
@@ -1298,6 +1397,9 @@ class Table(object):
             'conditional_operator': conditional_operator,
         }
 
+        if return_consumed_capacity:
+            kwargs['return_consumed_capacity'] = return_consumed_capacity
+
         if exclusive_start_key:
             kwargs['exclusive_start_key'] = {}
 
@@ -1331,9 +1433,12 @@ class Table(object):
             for key, value in raw_results['LastEvaluatedKey'].items():
                 last_key[key] = self._dynamizer.decode(value)
 
+        consumed = raw_results.get('ConsumedCapacity', {})
+
         return {
             'results': results,
             'last_key': last_key,
+            'consumed_capacity': consumed.get('CapacityUnits', 0),
         }
 
     def batch_get(self, keys, consistent=False, attributes=None):
@@ -1494,28 +1599,31 @@ class BatchTable(object):
 
         return False
 
-    def flush(self):
-        batch_data = {
-            self.table.table_name: [
-                # We'll insert data here shortly.
-            ],
-        }
+    def _build_requests(self):
+        requests = []
 
         for put in self._to_put:
             item = Item(self.table, data=put)
-            batch_data[self.table.table_name].append({
+            requests.append({
                 'PutRequest': {
                     'Item': item.prepare_full(),
                 }
             })
 
         for delete in self._to_delete:
-            batch_data[self.table.table_name].append({
+            requests.append({
                 'DeleteRequest': {
                     'Key': self.table._encode_keys(delete),
                 }
             })
 
+        return requests
+
+    def flush(self):
+        batch_data = {
+            self.table.table_name: self._build_requests(),
+        }
+
         resp = self.table.connection.batch_write_item(batch_data)
         self.handle_unprocessed(resp)
 
@@ -1541,8 +1649,17 @@ class BatchTable(object):
         boto.log.info(
             "Re-sending %s unprocessed items." % len(self._unprocessed)
         )
+        attempt = 0
 
         while len(self._unprocessed):
+            if attempt:
+                # Whatever was left over was most likely throttled, so back
+                # off before trying again.
+                time.sleep(
+                    self.table.connection._truncated_exponential_time(attempt)
+                )
+
+            attempt += 1
             # Again, do 25 at a time.
             to_resend = self._unprocessed[:25]
             # Remove them from the list.
@@ -1556,3 +1673,266 @@ class BatchTable(object):
             boto.log.info(
                 "%s unprocessed items left" % len(self._unprocessed)
             )
+
+
+class ConcurrentBatchTable(BatchTable):
+    """
+    Used by ``Table`` as the context manager for batch writes when
+    ``workers`` is given.
+
+    Batches are sent by a pool of threads, so several ``BatchWriteItem``
+    calls are in flight at once. Unprocessed items are merged into later
+    batches after an exponential backoff, and the number of concurrent
+    calls is halved whenever DynamoDB throttles a batch & grows by one
+    after each batch that goes through.
+
+    The first error raised while sending a batch stops the workers and is
+    raised again by the next ``put_item``, ``delete_item`` or ``flush``,
+    or on leaving the context. Nothing is dropped: the failed batch & any
+    batch that was still queued are kept, and ``unprocessed_requests``
+    returns them.
+
+    You likely don't want to try to use this object directly.
+    """
+    def __init__(self, table, workers=4, stats_callback=None):
+        super(ConcurrentBatchTable, self).__init__(table)
+        self.max_workers = workers
+        self.concurrency = workers
+        self.stats_callback = stats_callback
+        self._pool = None
+        self._lock = threading.Lock()
+        self._slots = threading.Condition(self._lock)
+        self._pending = 0
+        self._in_flight = 0
+        self._backoff_attempt = 0
+        self._retry_at = 0
+        self._items_written = 0
+        self._batches = 0
+        self._throttled = 0
+        self._started = time.time()
+        self._last_report = self._started
+        self._written_at_last_report = 0
+
+    def __exit__(self, type, value, traceback):
+        try:
+            if self._to_put or self._to_delete:
+                self.flush()
+
+            self.resend_unprocessed()
+        finally:
+            self._shutdown()
+
+    def flush(self):
+        self._raise_errors()
+        requests = self._take_unprocessed() + self._build_requests()
+        self._to_put = []
+        self._to_delete = []
+
+        for i in range(0, len(requests), 25):
+            self._submit(requests[i:i + 25])
+
+        return True
+
+    def resend_unprocessed(self):
+        # Wait for everything in flight, then send anything that came back
+        # unprocessed once its backoff has passed, until nothing is left.
+        while True:
+            self._wait()
+            self._raise_errors()
+
+            with self._lock:
+                if not self._unprocessed:
+                    return
+
+                wait = self._retry_at - time.time()
+
+            if wait > 0:
+                time.sleep(wait)
+
+            self.flush()
+
+    def unprocessed_requests(self):
+        """
+        Returns the write requests that haven't been written yet, in the
+        form ``BatchWriteItem`` takes them. After an error, these are the
+        items to send again.
+        """
+        with self._lock:
+            requests = list(self._unprocessed)
+
+        return requests + self._build_requests()
+
+    def stats(self):
+        """
+        Returns a dictionary of write statistics: the number of items
+        written, batches sent & batches throttled, the current concurrency,
+        the number of unprocessed items waiting to be resent, the elapsed
+        time and the average items written per second.
+        """
+        with self._lock:
+            elapsed = time.time() - self._started
+            return {
+                'items_written': self._items_written,
+                'batches': self._batches,
+                'throttled': self._throttled,
+                'concurrency': self.concurrency,
+                'unprocessed': len(self._unprocessed),
+                'elapsed': elapsed,
+                'items_per_second': self._items_written / max(elapsed, 1e-6),
+            }
+
+    def _take_unprocessed(self):
+        with self._lock:
+            if not self._unprocessed or time.time() < self._retry_at:
+                return []
+
+            requests = self._unprocessed
+            self._unprocessed = []
+            return requests
+
+    def _keep(self, requests):
+        with self._lock:
+            self._unprocessed.extend(requests)
+
+    def _submit(self, requests):
+        if self._pool is None:
+            # The bounded queue blocks the caller once enough batches are
+            # waiting, which keeps it from running arbitrarily far ahead
+            # of DynamoDB.
+            self._pool = WorkerPool(self.max_workers * 2)
+            self._pool.start(self.max_workers, self._worker)
+
+        with self._lock:
+            self._pending += 1
+
+        if not self._pool.put(requests):
+            with self._slots:
+                self._pending -= 1
+                self._slots.notify_all()
+
+            self._keep(requests)
+            self._raise_errors()
+
+    def _worker(self):
+        for requests in self._pool.work():
+            try:
+                self._send(requests)
+            except Exception:
+                # Keep the batch for the caller; the error stops the pool.
+                self._keep(requests)
+                raise
+            finally:
+                with self._slots:
+                    self._pending -= 1
+                    self._slots.notify_all()
+
+    def _wait(self):
+        # Waits for every submitted batch to be sent, or for a failure.
+        if self._pool is None:
+            return
+
+        with self._slots:
+            while self._pending and not self._pool.stopped:
+                self._slots.wait(WorkerPool.PollInterval)
+
+    def _send(self, requests):
+        table_name = self.table.table_name
+        connection = self.table.connection
+
+        with self._slots:
+            while self._in_flight >= self.concurrency:
+                self._slots.wait()
+
+            if self._pool.stopped:
+                # Another batch failed while this one waited.
+                self._unprocessed.extend(requests)
+                return
+
+            self._in_flight += 1
+
+        try:
+            events = getattr(connection, 'throughput_exceeded_events', 0)
+
+            try:
+                resp = connection.batch_write_item({table_name: requests})
+                unprocessed = resp.get('UnprocessedItems', {}).get(
+                    table_name, []
+                )
+            except exceptions.ProvisionedThroughputExceededException:
+                # Nothing was written; try the whole batch again later.
+                unprocessed = requests
+
+            throttled = bool(unprocessed) or events != getattr(
+                connection, 'throughput_exceeded_events', 0
+            )
+            self._record(len(requests) - len(unprocessed), unprocessed,
+                         throttled)
+        finally:
+            with self._slots:
+                self._in_flight -= 1
+                self._slots.notify_all()
+
+        self._report()
+
+    def _record(self, written, unprocessed, throttled):
+        with self._lock:
+            self._batches += 1
+            self._items_written += written
+
+            if unprocessed:
+                boto.log.info(
+                    "%s items were unprocessed. Storing for later." %
+                    len(unprocessed)
+                )
+                self._unprocessed.extend(unprocessed)
+
+            if throttled:
+                self._throttled += 1
+                self.concurrency = max(1, self.concurrency // 2)
+                self._backoff_attempt += 1
+                self._retry_at = time.time() + \
+                    self.table.connection._truncated_exponential_time(
+                        self._backoff_attempt
+                    )
+            else:
+                self.concurrency = min(self.max_workers, self.concurrency + 1)
+                self._backoff_attempt = 0
+
+    def _report(self):
+        with self._lock:
+            now = time.time()
+
+            if now - self._last_report < 1:
+                return
+
+            recent = (self._items_written - self._written_at_last_report) / \
+                (now - self._last_report)
+            self._last_report = now
+            self._written_at_last_report = self._items_written
+
+        stats = self.stats()
+        stats['recent_items_per_second'] = recent
+        boto.log.debug(
+            "Batch writer: %(recent_items_per_second).1f items/s, "
+            "concurrency %(concurrency)s, %(unprocessed)s unprocessed" % stats
+        )
+
+        if self.stats_callback is not None:
+            self.stats_callback(stats)
+
+    def _raise_errors(self):
+        if self._pool is not None:
+            self._pool.check()
+
+    def _shutdown(self):
+        pool, self._pool = self._pool, None
+
+        if pool is None:
+            return
+
+        pool.close()
+        pool.join()
+
+        # Batches still queued after a failure were never sent.
+        for requests in pool.unfinished():
+            self._keep(requests)
@@ -31,7 +31,7 @@ import base64
 
 import boto
 from boto.connection import AWSQueryConnection
-from boto.regioninfo import RegionInfo, get_regions, load_regions
+from boto.regioninfo import RegionInfo, get_regions, load_regions, connect
 from boto.ec2.autoscale.request import Request
 from boto.ec2.autoscale.launchconfig import LaunchConfiguration
 from boto.ec2.autoscale.group import AutoScalingGroup
@@ -71,10 +71,9 @@ def connect_to_region(region_name, **kw_params):
     :return: A connection to the given region, or None if an invalid region
         name is given
     """
-    for region in regions():
-        if region.name == region_name:
-            return region.connect(**kw_params)
-    return None
+    return connect('autoscaling', region_name,
+                   connection_cls=AutoScaleConnection,
+                   **kw_params)
 
 
 class AutoScaleConnection(AWSQueryConnection):
@@ -28,7 +28,7 @@ from boto.connection import AWSQueryConnection
 from boto.ec2.cloudwatch.metric import Metric
 from boto.ec2.cloudwatch.alarm import MetricAlarm, MetricAlarms, AlarmHistoryItem
 from boto.ec2.cloudwatch.datapoint import Datapoint
-from boto.regioninfo import RegionInfo, get_regions, load_regions
+from boto.regioninfo import RegionInfo, get_regions, load_regions, connect
 import boto
 
 RegionData = load_regions().get('cloudwatch', {})
@@ -55,10 +55,9 @@ def connect_to_region(region_name, **kw_params):
     :return: A connection to the given region, or None if an invalid region
         name is given
     """
-    for region in regions():
-        if region.name == region_name:
-            return region.connect(**kw_params)
-    return None
+    return connect('cloudwatch', region_name,
+                   connection_cls=CloudWatchConnection,
+                   **kw_params)
 
 
 class CloudWatchConnection(AWSQueryConnection):
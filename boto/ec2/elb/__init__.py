@@ -30,7 +30,7 @@ from boto.ec2.instanceinfo import InstanceInfo
 from boto.ec2.elb.loadbalancer import LoadBalancer, LoadBalancerZones
 from boto.ec2.elb.instancestate import InstanceState
 from boto.ec2.elb.healthcheck import HealthCheck
-from boto.regioninfo import RegionInfo, get_regions, load_regions
+from boto.regioninfo import RegionInfo, get_regions, load_regions, connect
 import boto
 from boto.compat import six
 
@@ -58,10 +58,9 @@ def connect_to_region(region_name, **kw_params):
     :return: A connection to the given region, or None if an invalid region
         name is given
     """
-    for region in regions():
-        if region.name == region_name:
-            return region.connect(**kw_params)
-    return None
+    return connect('elasticloadbalancing', region_name,
+                   connection_cls=ELBConnection,
+                   **kw_params)
 
 
 class ELBConnection(AWSQueryConnection):
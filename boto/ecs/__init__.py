@@ -24,7 +24,6 @@ from boto.connection import AWSQueryConnection, AWSAuthConnection
 from boto.exception import BotoServerError
 import time
 import urllib
-import xml.sax
 from boto.ecs.item import ItemSet
 from boto import handler
 
@@ -75,7 +74,7 @@ class ECSConnection(AWSQueryConnection):
         else:
             rs = itemSet
         h = handler.XmlHandler(rs, self)
-        xml.sax.parseString(body.encode('utf-8'), h)
+        handler.parse_xml(body.encode('utf-8'), h)
         if not rs.is_valid:
             raise BotoServerError(response.status, '{Code}: {Message}'.format(**rs.errors[0]))
         return rs
@@ -430,6 +430,22 @@ class AWSConnectionError(BotoClientError):
     pass
 
 
+class ConnectionPoolTimeoutError(AWSConnectionError):
+    """
+    Raised when a blocking connection pool has no free connection for a
+    host within the configured pool timeout.
+    """
+    pass
+
+
+class CircuitOpenError(BotoClientError):
+    """
+    Raised instead of sending a request while the circuit breaker for
+    its endpoint is open after repeated failures.
+    """
+    pass
+
+
 class StorageDataError(BotoClientError):
     """
     Error receiving data from a storage service.
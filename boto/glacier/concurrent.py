@@ -20,16 +20,21 @@
 # IN THE SOFTWARE.
 #
 import os
+import errno
+import json
 import math
+import mmap
+import random
 import threading
-import hashlib
 import time
 import logging
 from boto.compat import Queue
+from boto.vendored.six.moves.queue import Empty
 import binascii
 
 from boto.glacier.utils import DEFAULT_PART_SIZE, minimum_part_size, \
-                               chunk_hashes, tree_hash, bytes_to_hex
+                               chunk_hashes, tree_hash, bytes_to_hex, \
+                               compute_hashes_from_buffer
 from boto.glacier.exceptions import UploadArchiveError, \
                                     DownloadArchiveError, \
                                     TreeHashDoesNotMatchError
@@ -82,9 +87,24 @@ class ConcurrentUploader(ConcurrentTransferer):
     The threadpool is completely managed by this class and is
     transparent to the users of this class.
 
+    Where possible the file is mapped into memory and each part is
+    hashed and sent straight from the mapping, so the parts are not
+    copied.  At most ``max_memory`` bytes of parts are in flight at
+    once.  The number of parts uploaded at once also adapts to
+    failures: it is halved whenever a part fails and grows back as
+    parts succeed.  Each part is retried with exponential backoff.
+
+    If a ``state_file`` is given, the upload ID and the tree hash of
+    every part uploaded so far are recorded there.  An upload that
+    fails is then left in place rather than aborted, and uploading the
+    same file with the same state file, even from a new process, only
+    sends the parts that are missing.  The state can also be read with
+    :func:`read_upload_state` and passed to
+    :func:`boto.glacier.writer.resume_file_upload`.
+
     """
     def __init__(self, api, vault_name, part_size=DEFAULT_PART_SIZE,
-                 num_threads=10):
+                 num_threads=10, max_memory=None, state_file=None):
         """
         :type api: :class:`boto.glacier.layer1.Layer1`
         :param api: A layer1 glacier object.
@@ -102,10 +122,24 @@ class ConcurrentUploader(ConcurrentTransferer):
             The number of threads will control how much parts are being
             concurrently uploaded.
 
+        :type max_memory: int
+        :param max_memory: The number of bytes of parts that may be in
+            flight at once.  Defaults to ``num_threads`` parts.
+
+        :type state_file: str
+        :param state_file: An optional file in which to record
+            progress, so that a failed upload can be resumed.
+
         """
         super(ConcurrentUploader, self).__init__(part_size, num_threads)
         self._api = api
         self._vault_name = vault_name
+        self._max_memory = max_memory
+        self._state_file = state_file
+        self._state = None
+        self._mmap = None
+        self._existing_hashes = {}
+        self._upload_part_size = part_size
 
     def upload(self, filename, description=None):
         """Concurrently create an archive.
@@ -127,33 +161,58 @@ class ConcurrentUploader(ConcurrentTransferer):
 
         """
         total_size = os.stat(filename).st_size
-        total_parts, part_size = self._calculate_required_part_size(total_size)
+        self._state = None
+        state = self._load_state(total_size)
+        if state is not None:
+            upload_id = state['upload_id']
+            part_size = state['part_size']
+            total_parts = int(math.ceil(total_size / float(part_size)))
+            self._existing_hashes = state['part_hash_map']
+            log.debug("Resuming upload %s with %s of %s parts uploaded.",
+                      upload_id, len(self._existing_hashes), total_parts)
+        else:
+            total_parts, part_size = self._calculate_required_part_size(
+                total_size)
+            response = self._api.initiate_multipart_upload(self._vault_name,
+                                                           part_size,
+                                                           description)
+            upload_id = response['UploadId']
+            self._existing_hashes = {}
+            self._start_state(upload_id, part_size, total_size)
         hash_chunks = [None] * total_parts
         worker_queue = Queue()
         result_queue = Queue()
-        response = self._api.initiate_multipart_upload(self._vault_name,
-                                                       part_size,
-                                                       description)
-        upload_id = response['UploadId']
         # The basic idea is to add the chunks (the offsets not the actual
         # contents) to a work queue, start up a thread pool, let the crank
         # through the items in the work queue, and then place their results
         # in a result queue which we use to complete the multipart upload.
+        # Only offsets are queued; the parts themselves are read as the
+        # threads get to them.
         self._add_work_items_to_queue(total_parts, worker_queue, part_size)
-        self._start_upload_threads(result_queue, upload_id,
-                                   worker_queue, filename)
+        self._upload_part_size = part_size
         try:
+            self._start_upload_threads(result_queue, upload_id,
+                                       worker_queue, filename)
             self._wait_for_upload_threads(hash_chunks, result_queue,
                                           total_parts)
         except UploadArchiveError as e:
-            log.debug("An error occurred while uploading an archive, "
-                      "aborting multipart upload.")
-            self._api.abort_multipart_upload(self._vault_name, upload_id)
+            if self._state is not None:
+                log.debug("An error occurred while uploading an archive; "
+                          "leaving upload %s to be resumed from %s.",
+                          upload_id, self._state_file)
+            else:
+                log.debug("An error occurred while uploading an archive, "
+                          "aborting multipart upload.")
+                self._api.abort_multipart_upload(self._vault_name, upload_id)
             raise e
+        finally:
+            self._close_mmap()
+            self._close_state()
         log.debug("Completing upload.")
         response = self._api.complete_multipart_upload(
             self._vault_name, upload_id, bytes_to_hex(tree_hash(hash_chunks)),
             total_size)
+        self._remove_state()
         log.debug("Upload finished.")
         return response['ArchiveId']
 
@@ -171,18 +230,185 @@ class ConcurrentUploader(ConcurrentTransferer):
             # the entire archive.
             part_number, tree_sha256 = result
             hash_chunks[part_number] = tree_sha256
+            self._record_part(part_number, tree_sha256)
         self._shutdown_threads()
 
     def _start_upload_threads(self, result_queue, upload_id, worker_queue,
                               filename):
         log.debug("Starting threads.")
+        self._mmap = _map_file(filename)
+        max_parts = self._num_threads
+        if self._max_memory:
+            max_parts = max(1, min(max_parts, self._max_memory //
+                                   self._upload_part_size))
+        limit = _AdaptiveLimit(max_parts)
         for _ in range(self._num_threads):
             thread = UploadWorkerThread(self._api, self._vault_name, filename,
-                                        upload_id, worker_queue, result_queue)
+                                        upload_id, worker_queue, result_queue,
+                                        mapped_file=self._mmap, limit=limit,
+                                        existing_hashes=self._existing_hashes)
             time.sleep(0.2)
             thread.start()
             self._threads.append(thread)
 
+    def _close_mmap(self):
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # A part is still referenced somewhere; the mapping is
+                # released once it is garbage collected.
+                pass
+            self._mmap = None
+
+    def _load_state(self, total_size):
+        if not self._state_file:
+            return None
+        try:
+            state = read_upload_state(self._state_file)
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                log.warning("Couldn't read upload state %s: %s; starting a "
+                            "new upload.", self._state_file, e)
+            return None
+        except (ValueError, KeyError, IndexError) as e:
+            log.warning("Upload state %s is invalid: %s; starting a new "
+                        "upload.", self._state_file, e)
+            return None
+        if state['vault_name'] != self._vault_name or \
+                state['archive_size'] != total_size:
+            log.warning("Upload state %s is for a different archive; "
+                        "starting a new upload.", self._state_file)
+            return None
+        self._state = open(self._state_file, 'a')
+        return state
+
+    def _start_state(self, upload_id, part_size, total_size):
+        if self._state_file:
+            self._state = open(self._state_file, 'w')
+            self._state.write(json.dumps({'vault_name': self._vault_name,
+                                          'upload_id': upload_id,
+                                          'part_size': part_size,
+                                          'archive_size': total_size}))
+            self._state.write('\n')
+            self._state.flush()
+
+    def _record_part(self, part_number, tree_sha256):
+        if self._state is not None and \
+                self._existing_hashes.get(part_number) != tree_sha256:
+            self._state.write('%d %s\n' % (
+                part_number, bytes_to_hex(tree_sha256).decode('ascii')))
+            self._state.flush()
+
+    def _close_state(self):
+        if self._state is not None:
+            self._state.close()
+
+    def _remove_state(self):
+        if self._state is not None:
+            self._state = None
+            os.unlink(self._state_file)
+
+
+def read_upload_state(state_file):
+    """
+    Reads the progress that a :class:`ConcurrentUploader` recorded in
+    its ``state_file``.
+
+    The upload can be finished by uploading the file again with the
+    same state file, or serially with
+    ``resume_file_upload(vault, state['upload_id'], state['part_size'],
+    fobj, state['part_hash_map'])``.
+
+    :type state_file: str
+    :param state_file: The file the uploader recorded its progress in.
+
+    :rtype: dict
+    :return: The ``vault_name``, ``upload_id``, ``part_size`` and
+        ``archive_size`` of the upload, and a ``part_hash_map`` from
+        the index of each part uploaded so far to its binary tree hash.
+
+    """
+    with open(state_file, 'r') as f:
+        lines = f.read().splitlines()
+    state = json.loads(lines[0])
+    part_hash_map = {}
+    for line in lines[1:]:
+        try:
+            part_number, hex_tree_hash = line.split()
+            part_hash_map[int(part_number)] = binascii.unhexlify(
+                hex_tree_hash.encode('ascii'))
+        except (ValueError, TypeError):
+            # A line cut short by a crash; anything after it is lost.
+            break
+    state['part_hash_map'] = part_hash_map
+    return state
+
+
+def _map_file(filename):
+    """
+    Returns a read-only memory map of ``filename``, or None if it
+    can't be mapped and parts have to be read instead.
+    """
+    try:
+        with open(filename, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (IOError, OSError, ValueError, mmap.error):
+        # Empty files can't be mapped.
+        return None
+    try:
+        memoryview(mm).release()
+    except (TypeError, AttributeError):
+        # Python 2 mmaps don't export memoryviews.
+        mm.close()
+        return None
+    return mm
+
+
+class _AdaptiveLimit(object):
+    """
+    Limits how many parts are uploaded at once.  The limit is halved
+    whenever an attempt fails and grows by one after as many
+    successes in a row as the current limit, so a throttled upload
+    backs off and then recovers.
+    """
+    def __init__(self, maximum):
+        self.maximum = maximum
+        self.limit = maximum
+        self._active = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, thread):
+        """
+        Waits for a free slot.  Returns False if ``thread`` is asked to
+        stop while it waits.
+        """
+        with self._cond:
+            while self._active >= self.limit:
+                if not thread.should_continue:
+                    return False
+                self._cond.wait(0.5)
+            self._active += 1
+            return True
+
+    def release(self, success):
+        with self._cond:
+            self._active -= 1
+            if success:
+                self._successes += 1
+                if self._successes >= self.limit and \
+                        self.limit < self.maximum:
+                    self.limit += 1
+                    self._successes = 0
+            else:
+                self._successes = 0
+                if self.limit > 1:
+                    self.limit //= 2
+                    log.debug("Reducing concurrent part uploads to %s.",
+                              self.limit)
+            self._cond.notify_all()
+
 
 class TransferThread(threading.Thread):
     def __init__(self, worker_queue, result_queue):
@@ -214,10 +440,14 @@ class TransferThread(threading.Thread):
 
 
 class UploadWorkerThread(TransferThread):
+    # The longest a part waits before it is retried, in seconds.
+    MaxBackoff = 60
+
     def __init__(self, api, vault_name, filename, upload_id,
                  worker_queue, result_queue, num_retries=5,
                  time_between_retries=5,
-                 retry_exceptions=Exception):
+                 retry_exceptions=Exception, mapped_file=None, limit=None,
+                 existing_hashes=None):
         super(UploadWorkerThread, self).__init__(worker_queue, result_queue)
         self._api = api
         self._vault_name = vault_name
@@ -227,42 +457,89 @@ class UploadWorkerThread(TransferThread):
         self._num_retries = num_retries
         self._time_between_retries = time_between_retries
         self._retry_exceptions = retry_exceptions
+        self._mapped_file = mapped_file
+        self._view = None
+        if mapped_file is not None:
+            self._view = memoryview(mapped_file)
+        self._limit = limit
+        self._existing_hashes = existing_hashes or {}
 
     def _process_chunk(self, work):
         result = None
         for i in range(self._num_retries + 1):
+            if self._limit is not None and not self._limit.acquire(self):
+                return UploadArchiveError("Upload of part %s was "
+                                          "cancelled" % work[0])
+            succeeded = False
             try:
                 result = self._upload_chunk(work)
-                break
+                succeeded = True
             except self._retry_exceptions as e:
                 log.error("Exception caught uploading part number %s for "
                           "vault %s, attempt: (%s / %s), filename: %s, "
                           "exception: %s, msg: %s",
                           work[0], self._vault_name, i + 1, self._num_retries + 1,
                           self._filename, e.__class__, e)
-                time.sleep(self._time_between_retries)
                 result = e
+            finally:
+                if self._limit is not None:
+                    self._limit.release(succeeded)
+            if succeeded:
+                break
+            if i < self._num_retries:
+                time.sleep(self._backoff(i))
         return result
 
+    def _backoff(self, attempt):
+        # Jittered, so threads that failed together don't retry together.
+        delay = min(self._time_between_retries * (2 ** attempt),
+                    self.MaxBackoff)
+        return delay * random.uniform(0.5, 1)
+
     def _upload_chunk(self, work):
         part_number, part_size = work
         start_byte = part_number * part_size
-        self._fileobj.seek(start_byte)
-        contents = self._fileobj.read(part_size)
-        linear_hash = hashlib.sha256(contents).hexdigest()
-        tree_hash_bytes = tree_hash(chunk_hashes(contents))
-        byte_range = (start_byte, start_byte + len(contents) - 1)
-        log.debug("Uploading chunk %s of size %s", part_number, part_size)
-        response = self._api.upload_part(self._vault_name, self._upload_id,
-                                         linear_hash,
-                                         bytes_to_hex(tree_hash_bytes),
-                                         byte_range, contents)
-        # Reading the response allows the connection to be reused.
-        response.read()
+        if self._view is not None:
+            contents = self._view[start_byte:start_byte + part_size]
+        else:
+            self._fileobj.seek(start_byte)
+            contents = self._fileobj.read(part_size)
+        try:
+            # Hashing releases the GIL, so the other threads keep
+            # uploading while this one hashes its part.
+            linear_hash, hex_tree_hash = compute_hashes_from_buffer(contents)
+            tree_hash_bytes = binascii.unhexlify(hex_tree_hash)
+            if self._existing_hashes.get(part_number) == tree_hash_bytes:
+                log.debug("Part %s was already uploaded", part_number)
+                return (part_number, tree_hash_bytes)
+            byte_range = (start_byte, start_byte + len(contents) - 1)
+            log.debug("Uploading chunk %s of size %s", part_number, part_size)
+            response = self._api.upload_part(self._vault_name,
+                                             self._upload_id, linear_hash,
+                                             hex_tree_hash, byte_range,
+                                             contents)
+            # Reading the response allows the connection to be reused.
+            response.read()
+        finally:
+            if self._view is not None:
+                self._release_pages(start_byte, len(contents))
+            contents = None
         return (part_number, tree_hash_bytes)
 
+    def _release_pages(self, start, length):
+        # Drop the part's pages from this process; they stay in the
+        # page cache, but no longer count against the upload's memory.
+        if hasattr(self._mapped_file, 'madvise'):
+            try:
+                self._mapped_file.madvise(mmap.MADV_DONTNEED, start, length)
+            except (ValueError, OSError):
+                pass
+
     def _cleanup(self):
         self._fileobj.close()
+        if self._view is not None:
+            self._view.release()
+            self._view = None
 
 
 class ConcurrentDownloader(ConcurrentTransferer):
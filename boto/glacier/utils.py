@@ -22,6 +22,9 @@
 import hashlib
 import math
 import binascii
+import mmap
+import os
+import threading
 
 from boto.compat import six
 
@@ -71,16 +74,52 @@ def minimum_part_size(size_in_bytes, default_part_size=DEFAULT_PART_SIZE):
     return part_size
 
 
-def chunk_hashes(bytestring, chunk_size=_MEGABYTE):
-    chunk_count = int(math.ceil(len(bytestring) / float(chunk_size)))
-    hashes = []
-    for i in range(chunk_count):
-        start = i * chunk_size
-        end = (i + 1) * chunk_size
-        hashes.append(hashlib.sha256(bytestring[start:end]).digest())
-    if not hashes:
+def chunk_hashes(bytestring, chunk_size=_MEGABYTE, num_threads=1):
+    """
+    Returns the SHA256 digest of each ``chunk_size`` chunk of
+    ``bytestring``.  Chunks are hashed from a memoryview, so they are
+    never copied, and with more than one thread they are hashed
+    concurrently: hashlib releases the GIL while hashing large inputs.
+    """
+    if not len(bytestring):
         return [hashlib.sha256(b'').digest()]
-    return hashes
+    view = memoryview(bytestring)
+    if num_threads > 1:
+        threads, hashes, errors = _start_chunk_hashers(view, chunk_size,
+                                                       num_threads)
+        _join_chunk_hashers(threads, errors)
+        return hashes
+    return [hashlib.sha256(view[start:start + chunk_size]).digest()
+            for start in range(0, len(view), chunk_size)]
+
+
+def _start_chunk_hashers(view, chunk_size, num_threads):
+    starts = range(0, len(view), chunk_size)
+    hashes = [None] * len(starts)
+    errors = []
+
+    def hash_chunks(first):
+        try:
+            for i in range(first, len(starts), num_threads):
+                hashes[i] = hashlib.sha256(
+                    view[starts[i]:starts[i] + chunk_size]).digest()
+        except Exception as e:
+            errors.append(e)
+
+    threads = []
+    for i in range(min(num_threads, len(starts))):
+        thread = threading.Thread(target=hash_chunks, args=(i,))
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+    return threads, hashes, errors
+
+
+def _join_chunk_hashers(threads, errors):
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
 
 
 def tree_hash(fo):
@@ -89,25 +128,62 @@ def tree_hash(fo):
     together adjacent hashes until it ends up with one big one. So a
     tree of hashes.
     """
-    hashes = []
-    hashes.extend(fo)
+    hashes = list(fo)
     while len(hashes) > 1:
-        new_hashes = []
-        while True:
-            if len(hashes) > 1:
-                first = hashes.pop(0)
-                second = hashes.pop(0)
-                new_hashes.append(hashlib.sha256(first + second).digest())
-            elif len(hashes) == 1:
-                only = hashes.pop(0)
-                new_hashes.append(only)
-            else:
-                break
-        hashes.extend(new_hashes)
+        # Each level is half the size of the one below it, so the whole
+        # tree takes O(n) hashes.
+        paired = [hashlib.sha256(hashes[i] + hashes[i + 1]).digest()
+                  for i in range(0, len(hashes) - 1, 2)]
+        if len(hashes) % 2:
+            paired.append(hashes[-1])
+        hashes = paired
     return hashes[0]
 
 
-def compute_hashes_from_fileobj(fileobj, chunk_size=1024 * 1024):
+def compute_hashes_from_buffer(data, chunk_size=_MEGABYTE, num_threads=1):
+    """Compute the linear and tree hash of a buffer.
+
+    With a single thread each chunk is fed to the linear hash right
+    after it is hashed for the tree, so the data is read from memory
+    once.  With more threads the chunks are hashed concurrently while
+    the calling thread computes the linear hash.
+
+    :type data: bytes, bytearray, memoryview or mmap
+    :param data: The data to hash.
+
+    :param chunk_size: The size of the chunks to use for the tree
+        hash.
+
+    :param num_threads: The number of threads hashing chunks.
+
+    :rtype: tuple
+    :return: A tuple of (linear_hash, tree_hash).  Both hashes
+        are returned in hex.
+
+    """
+    linear_hash = hashlib.sha256()
+    if not len(data):
+        return linear_hash.hexdigest(), bytes_to_hex(tree_hash(
+            chunk_hashes(b'')))
+    view = memoryview(data)
+    if num_threads > 1:
+        threads, hashes, errors = _start_chunk_hashers(view, chunk_size,
+                                                       num_threads)
+        try:
+            linear_hash.update(view)
+        finally:
+            _join_chunk_hashers(threads, errors)
+    else:
+        hashes = []
+        for start in range(0, len(view), chunk_size):
+            chunk = view[start:start + chunk_size]
+            hashes.append(hashlib.sha256(chunk).digest())
+            linear_hash.update(chunk)
+    return linear_hash.hexdigest(), bytes_to_hex(tree_hash(hashes))
+
+
+def compute_hashes_from_fileobj(fileobj, chunk_size=1024 * 1024,
+                                num_threads=1):
     """Compute the linear and tree hash from a fileobj.
 
     This function will compute the linear/tree hash of a fileobj
@@ -119,6 +195,11 @@ def compute_hashes_from_fileobj(fileobj, chunk_size=1024 * 1024):
         hash.  This is also the buffer size used to read from
         `fileobj`.
 
+    :param num_threads: If greater than one and ``fileobj`` is a
+        regular file, the file is mapped into memory and hashed with
+        :func:`compute_hashes_from_buffer` using this many threads.
+        Either way the fileobj is left positioned at its end.
+
     :rtype: tuple
     :return: A tuple of (linear_hash, tree_hash).  Both hashes
         are returned in hex.
@@ -128,6 +209,11 @@ def compute_hashes_from_fileobj(fileobj, chunk_size=1024 * 1024):
     if six.PY3 and hasattr(fileobj, 'mode') and 'b' not in fileobj.mode:
         raise ValueError('File-like object must be opened in binary mode!')
 
+    if num_threads > 1:
+        hashes = _compute_hashes_from_mmap(fileobj, chunk_size, num_threads)
+        if hashes is not None:
+            return hashes
+
     linear_hash = hashlib.sha256()
     chunks = []
     chunk = fileobj.read(chunk_size)
@@ -145,6 +231,43 @@ def compute_hashes_from_fileobj(fileobj, chunk_size=1024 * 1024):
     return linear_hash.hexdigest(), bytes_to_hex(tree_hash(chunks))
 
 
+def _compute_hashes_from_mmap(fileobj, chunk_size, num_threads):
+    """
+    Hashes the rest of ``fileobj`` through a memory map, or returns
+    None if it can't be mapped.
+    """
+    try:
+        fd = fileobj.fileno()
+        offset = fileobj.tell()
+        size = os.fstat(fd).st_size
+    except (AttributeError, IOError, OSError, ValueError):
+        return None
+    if size <= offset:
+        return None
+    mm = None
+    try:
+        mm = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        view = memoryview(mm)
+    except (TypeError, ValueError, mmap.error):
+        # Python 2 mmaps don't export memoryviews.
+        if mm is not None:
+            mm.close()
+        return None
+    try:
+        hashes = compute_hashes_from_buffer(view[offset:], chunk_size,
+                                            num_threads)
+    finally:
+        view = None
+        try:
+            mm.close()
+        except BufferError:
+            # A view is still referenced somewhere; the mapping is
+            # released once it is garbage collected.
+            pass
+    fileobj.seek(size)
+    return hashes
+
+
 def bytes_to_hex(str_as_bytes):
     return binascii.hexlify(str_as_bytes)
 
@@ -22,9 +22,10 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 # IN THE SOFTWARE.
 #
-import hashlib
+import binascii
 
 from boto.glacier.utils import chunk_hashes, tree_hash, bytes_to_hex
+from boto.glacier.utils import compute_hashes_from_buffer
 # This import is provided for backwards compatibility.  This function is
 # now in boto.glacier.utils, but any existing code can still import
 # this directly from this module.
@@ -114,11 +115,10 @@ class _Uploader(object):
         if self.closed:
             raise ValueError("I/O operation on closed file")
         # Create a request and sign it
-        part_tree_hash = tree_hash(chunk_hashes(part_data, self.chunk_size))
-        self._insert_tree_hash(part_index, part_tree_hash)
+        linear_hash, hex_tree_hash = compute_hashes_from_buffer(
+            part_data, self.chunk_size)
+        self._insert_tree_hash(part_index, binascii.unhexlify(hex_tree_hash))
 
-        hex_tree_hash = bytes_to_hex(part_tree_hash)
-        linear_hash = hashlib.sha256(part_data).hexdigest()
         start = self.part_size * part_index
         content_range = (start,
                          (start + len(part_data)) - 1)
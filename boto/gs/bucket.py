@@ -21,7 +21,6 @@
 
 import re
 import urllib
-import xml.sax
 
 import boto
 from boto import handler
@@ -348,7 +347,7 @@ class Bucket(S3Bucket):
         body = self._get_xml_acl_helper(key_name, headers, query_args)
         acl = ACL(self)
         h = handler.XmlHandler(acl, self)
-        xml.sax.parseString(body, h)
+        handler.parse_xml(body, h)
         return acl
 
     def get_acl(self, key_name='', headers=None, version_id=None,
@@ -571,7 +570,7 @@ class Bucket(S3Bucket):
             # Success - parse XML and return Cors object.
             cors = Cors()
             h = handler.XmlHandler(cors, self)
-            xml.sax.parseString(body, h)
+            handler.parse_xml(body, h)
             return cors
         else:
             raise self.connection.provider.storage_response_error(
@@ -604,7 +603,7 @@ class Bucket(S3Bucket):
         if response.status == 200:
             rs = ResultSet(self)
             h = handler.XmlHandler(rs, self)
-            xml.sax.parseString(body, h)
+            handler.parse_xml(body, h)
             return rs.StorageClass
         else:
             raise self.connection.provider.storage_response_error(
@@ -963,7 +962,7 @@ class Bucket(S3Bucket):
         if response.status == 200:
             lifecycle_config = LifecycleConfig()
             h = handler.XmlHandler(lifecycle_config, self)
-            xml.sax.parseString(body, h)
+            handler.parse_xml(body, h)
             return lifecycle_config
         else:
             raise self.connection.provider.storage_response_error(
@@ -19,9 +19,59 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 # IN THE SOFTWARE.
 
+import threading
 import xml.sax
+import xml.sax.handler
+import xml.sax.xmlreader
 
-from boto.compat import StringIO
+from boto.compat import BytesIO, StringIO, six
+
+# Each thread keeps an idle parser here between documents.
+_local = threading.local()
+
+
+def _make_parser():
+    parser = xml.sax.make_parser()
+    parser.setFeature(xml.sax.handler.feature_external_ges, 0)
+    # Element names are interned in a table that lives as long as the
+    # parser, so repeated tags share one string across documents.
+    parser.setFeature(xml.sax.handler.feature_string_interning, 1)
+    return parser
+
+
+def parse_xml(content, handler):
+    """
+    Parses an XML document with ``handler``, like ``xml.sax.parseString``
+    but reusing one parser per thread rather than creating a new one for
+    every response.
+
+    :type content: bytes or string
+    :param content: The XML document.
+
+    :type handler: :class:`xml.sax.ContentHandler`
+    :param handler: The handler receiving the SAX events.
+    """
+    source = xml.sax.xmlreader.InputSource()
+    if isinstance(content, six.text_type) and not six.PY2:
+        source.setCharacterStream(StringIO(content))
+    else:
+        if isinstance(content, six.text_type):
+            content = content.encode('utf-8')
+        source.setByteStream(BytesIO(content))
+
+    # Take the parser while it's in use so that a document parsed from
+    # inside a handler gets a parser of its own.
+    parser = getattr(_local, 'parser', None)
+    _local.parser = None
+    if parser is None:
+        parser = _make_parser()
+    parser.setContentHandler(handler)
+    try:
+        parser.parse(source)
+    finally:
+        # Don't keep the handler (and the objects it built) alive.
+        parser.setContentHandler(xml.sax.handler.ContentHandler())
+        _local.parser = parser
 
 
 class XmlHandler(xml.sax.ContentHandler):
@@ -29,32 +79,40 @@ class XmlHandler(xml.sax.ContentHandler):
     def __init__(self, root_node, connection):
         self.connection = connection
         self.nodes = [('root', root_node)]
-        self.current_text = ''
+        # Expat may deliver the text of one element in many pieces, so
+        # collect them and join once when the element ends.
+        self._text = []
+
+    @property
+    def current_text(self):
+        return ''.join(self._text)
+
+    @current_text.setter
+    def current_text(self, value):
+        self._text = [value]
 
     def startElement(self, name, attrs):
-        self.current_text = ''
+        del self._text[:]
         new_node = self.nodes[-1][1].startElement(name, attrs, self.connection)
         if new_node is not None:
             self.nodes.append((name, new_node))
 
     def endElement(self, name):
-        self.nodes[-1][1].endElement(name, self.current_text, self.connection)
+        self.nodes[-1][1].endElement(name, ''.join(self._text),
+                                     self.connection)
         if self.nodes[-1][0] == name:
             if hasattr(self.nodes[-1][1], 'endNode'):
                 self.nodes[-1][1].endNode(self.connection)
             self.nodes.pop()
-        self.current_text = ''
+        del self._text[:]
 
     def characters(self, content):
-        self.current_text += content
+        self._text.append(content)
 
 
 class XmlHandlerWrapper(object):
     def __init__(self, root_node, connection):
         self.handler = XmlHandler(root_node, connection)
-        self.parser = xml.sax.make_parser()
-        self.parser.setContentHandler(self.handler)
-        self.parser.setFeature(xml.sax.handler.feature_external_ges, 0)
 
     def parseString(self, content):
-        return self.parser.parse(StringIO(content))
+        return parse_xml(content, self.handler)
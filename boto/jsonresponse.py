@@ -22,6 +22,7 @@
 
 import xml.sax
 from boto import utils
+from boto.handler import parse_xml
 
 
 class XmlHandler(xml.sax.ContentHandler):
@@ -29,10 +30,18 @@ class XmlHandler(xml.sax.ContentHandler):
     def __init__(self, root_node, connection):
         self.connection = connection
         self.nodes = [('root', root_node)]
-        self.current_text = ''
+        self._text = []
+
+    @property
+    def current_text(self):
+        return ''.join(self._text)
+
+    @current_text.setter
+    def current_text(self, value):
+        self._text = [value]
 
     def startElement(self, name, attrs):
-        self.current_text = ''
+        del self._text[:]
         t = self.nodes[-1][1].startElement(name, attrs, self.connection)
         if t is not None:
             if isinstance(t, tuple):
@@ -41,18 +50,19 @@ class XmlHandler(xml.sax.ContentHandler):
                 self.nodes.append((name, t))
 
     def endElement(self, name):
-        self.nodes[-1][1].endElement(name, self.current_text, self.connection)
+        self.nodes[-1][1].endElement(name, ''.join(self._text),
+                                     self.connection)
         if self.nodes[-1][0] == name:
             self.nodes.pop()
-        self.current_text = ''
+        del self._text[:]
 
     def characters(self, content):
-        self.current_text += content
+        self._text.append(content)
 
     def parse(self, s):
         if not isinstance(s, bytes):
             s = s.encode('utf-8')
-        xml.sax.parseString(s, self)
+        parse_xml(s, self)
 
 
 class Element(dict):
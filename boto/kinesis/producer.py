@@ -0,0 +1,497 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+"""
+Buffered, batching producer for Kinesis streams.
+"""
+import base64
+import bisect
+import collections
+import hashlib
+import socket
+import threading
+import time
+
+import boto
+from boto.compat import http_client, six
+from boto.exception import BotoServerError
+from boto.kinesis.exceptions import ProvisionedThroughputExceededException
+
+log = boto.log
+
+THROUGHPUT_EXCEEDED = 'ProvisionedThroughputExceededException'
+
+
+class _Record(object):
+    __slots__ = ('entry', 'size', 'shard_id', 'enqueued', 'attempts')
+
+    def __init__(self, entry, size, shard_id, enqueued):
+        self.entry = entry
+        self.size = size
+        self.shard_id = shard_id
+        self.enqueued = enqueued
+        self.attempts = 0
+
+
+class _ShardBuffer(object):
+    """
+    The records waiting to be sent to one shard.
+    """
+    def __init__(self):
+        self.records = collections.deque()
+        self.bytes = 0
+        self.retry_at = 0
+        self.delay = None
+
+
+class KinesisProducer(object):
+    """
+    Puts records to a stream in batches, from a pool of threads.
+
+    :func:`put` adds a record to a bounded buffer and returns at once.
+    Records are grouped by the shard their hash key falls in, using the
+    hash key ranges from ``DescribeStream``.  A shard's records are sent
+    in a ``PutRecords`` request as soon as they reach ``MaxRecords``
+    records or ``MaxBytes`` bytes, or once the oldest of them has waited
+    ``linger`` seconds; a request that isn't full is topped up with other
+    shards' records.  Up to ``num_threads`` requests are in flight.
+
+    ``PutRecords`` can fail for some records and not others.  Only the
+    records that failed are retried, up to ``num_retries`` times.  While
+    a shard is being retried its records are held back, with the delays
+    of the connection's retry policy, but other shards carry on.  Records
+    may therefore reach a shard out of order.  Records that still fail
+    are passed to ``failure_callback``, or logged.
+
+    Errors that aren't worth retrying, such as a missing stream, stop the
+    producer; they are raised by the next call to :func:`put`,
+    :func:`flush` or :func:`close`.
+
+    The producer can be used as a context manager, which closes it::
+
+        with KinesisProducer(conn, 'my-stream') as producer:
+            for line in lines:
+                producer.put(line, partition_key=line[:8])
+
+    :type connection: :class:`boto.kinesis.layer1.KinesisConnection`
+    :param connection: The connection to put records with.
+
+    :type stream_name: string
+    :param stream_name: The stream to put records to.
+
+    :type num_threads: int
+    :param num_threads: The most ``PutRecords`` requests in flight.
+
+    :type linger: float
+    :param linger: The longest a record waits for its request to fill up,
+        in seconds.
+
+    :type max_buffered: int
+    :param max_buffered: :func:`put` blocks while this many records are
+        waiting to be sent.
+
+    :type max_buffered_bytes: int
+    :param max_buffered_bytes: :func:`put` also blocks while the records
+        waiting to be sent add up to this many bytes.
+
+    :type num_retries: int
+    :param num_retries: How many times to retry a record that fails.
+
+    :type failure_callback: callable
+    :param failure_callback: Called with the partition key, the error code
+        and the error message of each record that is given up on.
+    """
+    MaxRecords = 500
+    MaxBytes = 5 * 1024 * 1024
+    MaxRecordBytes = 1024 * 1024
+    RetryableStatus = 500
+    # The shortest time between refreshes of the shard map.
+    ShardRefreshInterval = 10
+
+    def __init__(self, connection, stream_name, num_threads=4, linger=0.1,
+                 max_buffered=10000, max_buffered_bytes=64 * 1024 * 1024,
+                 num_retries=10, failure_callback=None):
+        self.connection = connection
+        self.stream_name = stream_name
+        self.num_threads = max(num_threads, 1)
+        self.linger = linger
+        self.max_buffered = max_buffered
+        self.max_buffered_bytes = max_buffered_bytes
+        self.num_retries = num_retries
+        self.failure_callback = failure_callback
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._shards = collections.OrderedDict()
+        # The start of each open shard's hash key range, and its ID.
+        self._shard_map = ([], [])
+        self._shards_stale = False
+        self._shards_refreshed = 0
+        self._buffered = 0
+        self._buffered_bytes = 0
+        self._in_flight = 0
+        self._flushing = 0
+        self._closed = False
+        self._discard = False
+        self._errors = []
+        self._threads = []
+        self._started = time.time()
+        self._counters = dict.fromkeys(
+            ['records_put', 'records_failed', 'records_retried',
+             'requests', 'throttled', 'bytes_put'], 0)
+        self._request_time = 0.0
+        self._max_request_time = 0.0
+        self._record_time = 0.0
+        self.refresh_shards()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            # Don't hold up the error by sending what's left.
+            self._shutdown(discard=True)
+
+    def refresh_shards(self):
+        """
+        Reloads the hash key ranges of the stream's open shards, which
+        are used to group records by shard.
+        """
+        starts = []
+        shard_id = None
+        while True:
+            description = self.connection.describe_stream(
+                self.stream_name,
+                exclusive_start_shard_id=shard_id)['StreamDescription']
+            for shard in description['Shards']:
+                shard_id = shard['ShardId']
+                if shard['SequenceNumberRange'].get('EndingSequenceNumber'):
+                    # Closed by a split or merge; no longer written to.
+                    continue
+                start = int(shard['HashKeyRange']['StartingHashKey'])
+                starts.append((start, shard_id))
+            if not description.get('HasMoreShards') or shard_id is None:
+                break
+        starts.sort()
+        with self._lock:
+            self._shard_map = ([start for start, shard_id in starts],
+                               [shard_id for start, shard_id in starts])
+            self._shards_stale = False
+            self._shards_refreshed = time.time()
+
+    def predict_shard(self, partition_key, explicit_hash_key=None):
+        """
+        Returns the ID of the shard a record will be put to, or None if
+        the stream has no open shards.
+        """
+        if explicit_hash_key is not None:
+            hash_key = int(explicit_hash_key)
+        else:
+            if isinstance(partition_key, six.text_type):
+                partition_key = partition_key.encode('utf-8')
+            hash_key = int(hashlib.md5(partition_key).hexdigest(), 16)
+        starts, shard_ids = self._shard_map
+        index = bisect.bisect_right(starts, hash_key) - 1
+        if index < 0:
+            return None
+        return shard_ids[index]
+
+    def put(self, data, partition_key, explicit_hash_key=None):
+        """
+        Adds a record to the buffer, waiting for room if it is full.
+
+        :type data: bytes or string
+        :param data: The record's data, which is Base64 encoded here.
+
+        :type partition_key: string
+        :param partition_key: Determines which shard the record goes to.
+
+        :type explicit_hash_key: string
+        :param explicit_hash_key: A hash key to use instead of the hash of
+            the partition key.
+        """
+        if not isinstance(data, six.binary_type):
+            data = data.encode('utf-8')
+        if isinstance(partition_key, six.binary_type):
+            partition_key = partition_key.decode('utf-8')
+        size = len(data) + len(partition_key.encode('utf-8'))
+        if size > self.MaxRecordBytes:
+            raise ValueError('Record of %d bytes is larger than the %d '
+                             'allowed' % (size, self.MaxRecordBytes))
+        entry = {'Data': base64.b64encode(data).decode('ascii'),
+                 'PartitionKey': partition_key}
+        if explicit_hash_key is not None:
+            entry['ExplicitHashKey'] = str(explicit_hash_key)
+        shard_id = self.predict_shard(partition_key, explicit_hash_key)
+        record = _Record(entry, size, shard_id, time.time())
+
+        with self._cond:
+            self._raise_errors()
+            if self._closed:
+                raise ValueError('The producer is closed')
+            while not self._errors and self._buffered and (
+                    self._buffered >= self.max_buffered or
+                    self._buffered_bytes + size > self.max_buffered_bytes):
+                self._cond.wait()
+            self._raise_errors()
+            shard = self._shards.get(shard_id)
+            if shard is None:
+                shard = self._shards[shard_id] = _ShardBuffer()
+            shard.records.append(record)
+            shard.bytes += size
+            self._buffered += 1
+            self._buffered_bytes += size
+            self._cond.notify_all()
+        if not self._threads:
+            self._start()
+
+    def flush(self):
+        """
+        Sends every buffered record, without waiting for requests to fill
+        up, and waits until they have all been put or given up on.
+        """
+        with self._cond:
+            self._flushing += 1
+            self._cond.notify_all()
+            try:
+                while not self._errors and (self._buffered or
+                                            self._in_flight):
+                    self._cond.wait()
+            finally:
+                self._flushing -= 1
+            self._raise_errors()
+
+    def close(self):
+        """
+        Sends every buffered record and stops the threads.
+        """
+        try:
+            self.flush()
+        finally:
+            self._shutdown()
+
+    def stats(self):
+        """
+        Returns a dictionary of statistics: the records put, given up on
+        and retried, the requests sent, the records throttled, the bytes
+        put, the records buffered and requests in flight, the elapsed
+        time, the records and bytes put per second, the average and
+        longest request latency, and the average time from :func:`put`
+        until a record was stored.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats['buffered'] = self._buffered
+            stats['in_flight'] = self._in_flight
+            elapsed = max(time.time() - self._started, 1e-6)
+            stats['elapsed'] = elapsed
+            stats['records_per_second'] = stats['records_put'] / elapsed
+            stats['bytes_per_second'] = stats['bytes_put'] / elapsed
+            stats['request_latency'] = \
+                self._request_time / max(stats['requests'], 1)
+            stats['max_request_latency'] = self._max_request_time
+            stats['record_latency'] = \
+                self._record_time / max(stats['records_put'], 1)
+            return stats
+
+    def _raise_errors(self):
+        if self._errors:
+            raise self._errors[0]
+
+    def _start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.num_threads):
+                thread = threading.Thread(target=self._worker)
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+
+    def _shutdown(self, discard=False):
+        with self._cond:
+            self._closed = True
+            self._discard = self._discard or discard
+            self._cond.notify_all()
+            threads = self._threads
+        for thread in threads:
+            thread.join()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                batch = self._wait_for_batch()
+                if batch is None:
+                    return
+                self._in_flight += 1
+            try:
+                self._send(batch)
+            except Exception as e:
+                with self._cond:
+                    self._errors.append(e)
+            finally:
+                with self._cond:
+                    self._in_flight -= 1
+                    self._cond.notify_all()
+            if self._claim_refresh():
+                try:
+                    self.refresh_shards()
+                except Exception as e:
+                    log.debug('Could not refresh the shard map: %s', e)
+
+    def _claim_refresh(self):
+        with self._lock:
+            now = time.time()
+            if not self._shards_stale or \
+                    now - self._shards_refreshed < self.ShardRefreshInterval:
+                return False
+            self._shards_refreshed = now
+            return True
+
+    def _wait_for_batch(self):
+        while True:
+            if self._errors or self._discard or \
+                    (self._closed and not self._buffered):
+                return None
+            batch, wait = self._take_batch(time.time())
+            if batch:
+                return batch
+            self._cond.wait(wait)
+
+    def _take_batch(self, now):
+        # Returns the records for a request, or how long to wait before
+        # there could be one.
+        urgent = self._flushing or self._closed
+        ready = []
+        waiting = []
+        wake = None
+        for shard in self._shards.values():
+            if not shard.records:
+                continue
+            if shard.retry_at > now:
+                wake = min(wake or shard.retry_at, shard.retry_at)
+                continue
+            if len(shard.records) >= self.MaxRecords or \
+                    shard.bytes >= self.MaxBytes:
+                return self._take_from([shard]), None
+            deadline = shard.records[0].enqueued + self.linger
+            if urgent or deadline <= now:
+                ready.append(shard)
+            else:
+                waiting.append(shard)
+                wake = min(wake or deadline, deadline)
+        if ready:
+            return self._take_from(ready + waiting), None
+        if wake is None:
+            return None, None
+        return None, max(wake - now, 0.001)
+
+    def _take_from(self, shards):
+        batch = []
+        size = 0
+        for shard in shards:
+            while shard.records and len(batch) < self.MaxRecords:
+                record = shard.records[0]
+                if size + record.size > self.MaxBytes:
+                    break
+                shard.records.popleft()
+                shard.bytes -= record.size
+                batch.append(record)
+                size += record.size
+        self._buffered -= len(batch)
+        self._buffered_bytes -= size
+        self._cond.notify_all()
+        return batch
+
+    def _send(self, batch):
+        started = time.time()
+        try:
+            response = self.connection.put_records(
+                [record.entry for record in batch], self.stream_name,
+                b64_encode=False)
+            results = response['Records']
+        except ProvisionedThroughputExceededException as e:
+            results = [{'ErrorCode': THROUGHPUT_EXCEEDED,
+                        'ErrorMessage': str(e)}] * len(batch)
+        except BotoServerError as e:
+            if e.status < self.RetryableStatus:
+                raise
+            results = [{'ErrorCode': e.error_code or str(e.status),
+                        'ErrorMessage': str(e)}] * len(batch)
+        except (socket.error, http_client.HTTPException) as e:
+            results = [{'ErrorCode': e.__class__.__name__,
+                        'ErrorMessage': str(e)}] * len(batch)
+        self._record(batch, results, started)
+
+    def _record(self, batch, results, started):
+        now = time.time()
+        given_up = []
+        retry = collections.OrderedDict()
+        succeeded = set()
+        with self._cond:
+            elapsed = now - started
+            self._counters['requests'] += 1
+            self._request_time += elapsed
+            self._max_request_time = max(self._max_request_time, elapsed)
+            for record, result in zip(batch, results):
+                code = result.get('ErrorCode')
+                if not code:
+                    self._counters['records_put'] += 1
+                    self._counters['bytes_put'] += record.size
+                    self._record_time += now - record.enqueued
+                    succeeded.add(record.shard_id)
+                    if record.shard_id != result.get('ShardId') and \
+                            self._shard_map[1]:
+                        # The stream has been resharded.
+                        self._shards_stale = True
+                    continue
+                if code == THROUGHPUT_EXCEEDED:
+                    self._counters['throttled'] += 1
+                record.attempts += 1
+                if record.attempts > self.num_retries:
+                    self._counters['records_failed'] += 1
+                    given_up.append((record, code,
+                                     result.get('ErrorMessage')))
+                else:
+                    self._counters['records_retried'] += 1
+                    retry.setdefault(record.shard_id, []).append(record)
+            policy = self.connection.retry_policy
+            for shard_id, records in retry.items():
+                shard = self._shards[shard_id]
+                shard.records.extendleft(reversed(records))
+                size = sum(record.size for record in records)
+                shard.bytes += size
+                self._buffered += len(records)
+                self._buffered_bytes += size
+                shard.delay = policy.next_delay(shard.delay)
+                shard.retry_at = now + shard.delay
+            for shard_id in succeeded:
+                if shard_id not in retry:
+                    self._shards[shard_id].delay = None
+            self._cond.notify_all()
+        for record, code, message in given_up:
+            if self.failure_callback is not None:
+                self.failure_callback(record.entry['PartitionKey'], code,
+                                      message)
+            else:
+                log.error('Giving up on a record for partition key %s: '
+                          '%s %s', record.entry['PartitionKey'], code,
+                          message)
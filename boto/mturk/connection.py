@@ -18,7 +18,6 @@
 # WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 # IN THE SOFTWARE.
-import xml.sax
 import datetime
 import itertools
 
@@ -847,7 +846,7 @@ class MTurkConnection(AWSQueryConnection):
         if '<Errors>' not in body:
             rs = ResultSet(marker_elems)
             h = handler.XmlHandler(rs, self)
-            xml.sax.parseString(body, h)
+            handler.parse_xml(body, h)
             return rs
         else:
             raise MTurkRequestError(response.status, response.reason, body)
@@ -989,7 +988,7 @@ class QualificationRequest(BaseAutoResultElement):
             answer_rs = ResultSet([('Answer', QuestionFormAnswer)])
             h = handler.XmlHandler(answer_rs, connection)
             value = connection.get_utf8_value(value)
-            xml.sax.parseString(value, h)
+            handler.parse_xml(value, h)
             self.answers.append(answer_rs)
         else:
             super(QualificationRequest, self).endElement(name, value, connection)
@@ -1014,7 +1013,7 @@ class Assignment(BaseAutoResultElement):
             answer_rs = ResultSet([('Answer', QuestionFormAnswer)])
             h = handler.XmlHandler(answer_rs, connection)
             value = connection.get_utf8_value(value)
-            xml.sax.parseString(value, h)
+            handler.parse_xml(value, h)
             self.answers.append(answer_rs)
         else:
             super(Assignment, self).endElement(name, value, connection)
@@ -18,7 +18,6 @@
 # WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 # IN THE SOFTWARE.
-import xml.sax
 import hashlib
 import string
 import collections
@@ -26,7 +25,7 @@ from boto.connection import AWSQueryConnection
 from boto.exception import BotoServerError
 import boto.mws.exception
 import boto.mws.response
-from boto.handler import XmlHandler
+from boto.handler import XmlHandler, parse_xml
 from boto.compat import filter, map, six, encodebytes
 
 __all__ = ['MWSConnection']
@@ -331,7 +330,7 @@ class MWSConnection(AWSQueryConnection):
         if not contenttype.startswith('text/xml'):
             return body
         handler = XmlHandler(parser, self)
-        xml.sax.parseString(body, handler)
+        parse_xml(body, handler)
         return parser
 
     def method_for(self, name):
@@ -0,0 +1,192 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+"""
+A small pool of worker threads sharing a queue of work, used by the
+parallel transfer, listing, delete and scan helpers.
+"""
+import threading
+
+import boto
+from boto.compat import Empty, Full, Queue
+
+#: Marks the end of a queue.  ``WorkerPool.close`` puts one on the work
+#: queue for each worker, and workers may put it on their own output
+#: queues to mark that they have finished.
+END = object()
+
+
+class WorkerPool(object):
+    """
+    Runs worker threads that take their work from one queue.
+
+    Work is added with ``put``, which waits while the queue is full, and
+    each worker iterates over ``work()``.  The first exception raised by
+    a worker stops the pool: ``put`` and ``work`` then return straight
+    away, queued work is dropped, and ``check`` raises the exception
+    again on the calling thread.
+
+    :type maxsize: int
+    :param maxsize: The most items the work queue holds, or 0 for no
+        limit.
+    """
+    #: How often, in seconds, blocked calls check whether the pool has
+    #: stopped.
+    PollInterval = 0.1
+
+    def __init__(self, maxsize=0):
+        self.queue = Queue(maxsize)
+        self.errors = []
+        self._stop = threading.Event()
+        self._threads = []
+        self._unstarted = []
+        self._unstarted_lock = threading.Lock()
+
+    @property
+    def stopped(self):
+        return self._stop.is_set()
+
+    def start(self, num_threads, target, *args):
+        """
+        Starts ``num_threads`` daemon threads, each calling
+        ``target(*args)``.  An exception raised by ``target`` is
+        recorded and stops the pool.
+        """
+        for i in range(num_threads):
+            thread = threading.Thread(target=self._run, args=(target, args))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _run(self, target, args):
+        try:
+            target(*args)
+        except Exception as e:
+            self.fail(e)
+
+    def fail(self, error):
+        """
+        Records ``error`` and stops the pool.
+        """
+        boto.log.debug('Worker thread failed: %s' % error)
+        self.errors.append(error)
+        self._stop.set()
+
+    def stop(self):
+        """
+        Stops the pool.  Workers exit once they finish their current
+        item, and queued work is dropped.
+        """
+        self._stop.set()
+
+    def put(self, item, queue=None):
+        """
+        Adds ``item`` to ``queue``, the work queue by default, waiting
+        for room if it is full.
+
+        :rtype: bool
+        :return: False if the pool stopped before the item was added.
+        """
+        if queue is None:
+            queue = self.queue
+        while not self._stop.is_set():
+            try:
+                queue.put(item, timeout=self.PollInterval)
+                return True
+            except Full:
+                pass
+        return False
+
+    def get(self, queue):
+        """
+        Takes the next item from ``queue``, usually one the workers put
+        their results on.  Raises the first worker error instead if a
+        worker failed and ``queue`` is empty or at its end, since the
+        rest of the results may never arrive.
+        """
+        while True:
+            try:
+                item = queue.get(timeout=self.PollInterval)
+            except Empty:
+                self.check()
+                continue
+            if item is END:
+                self.check()
+            return item
+
+    def work(self):
+        """
+        Yields items from the work queue until ``close`` is called or
+        the pool stops.  Meant to be iterated over by each worker.
+        """
+        while True:
+            try:
+                item = self.queue.get(timeout=self.PollInterval)
+            except Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            if item is END:
+                return
+            if self._stop.is_set():
+                with self._unstarted_lock:
+                    self._unstarted.append(item)
+                return
+            yield item
+            item = None
+
+    def close(self):
+        """
+        Marks the end of the work.  Each worker exits once the work
+        queued before it has been taken.
+        """
+        for thread in self._threads:
+            if not self.put(END):
+                break
+
+    def join(self):
+        """
+        Waits for every worker to exit.
+        """
+        for thread in self._threads:
+            thread.join()
+
+    def unfinished(self):
+        """
+        Returns the work that was queued but never handed to a worker,
+        because the pool stopped first.  Call it after ``join``.
+        """
+        with self._unstarted_lock:
+            items, self._unstarted = self._unstarted, []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except Empty:
+                return items
+            if item is not END:
+                items.append(item)
+
+    def check(self):
+        """
+        Raises the first error raised by a worker, if there was one.
+        """
+        if self.errors:
+            raise self.errors[0]
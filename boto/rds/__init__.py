@@ -31,7 +31,7 @@ from boto.rds.event import Event
 from boto.rds.regioninfo import RDSRegionInfo
 from boto.rds.dbsubnetgroup import DBSubnetGroup
 from boto.rds.vpcsecuritygroupmembership import VPCSecurityGroupMembership
-from boto.regioninfo import get_regions
+from boto.regioninfo import get_regions, connect
 from boto.rds.logfile import LogFile, LogFileObject
 
 
@@ -63,10 +63,10 @@ def connect_to_region(region_name, **kw_params):
     :return: A connection to the given region, or None if an invalid region
              name is given
     """
-    for region in regions():
-        if region.name == region_name:
-            return region.connect(**kw_params)
-    return None
+    return connect('rds', region_name,
+                   region_cls=RDSRegionInfo,
+                   connection_cls=RDSConnection,
+                   **kw_params)
 
 #boto.set_stream_logger('rds')
 
@@ -19,7 +19,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 # IN THE SOFTWARE.
 #
-from boto.regioninfo import get_regions
+from boto.regioninfo import get_regions, connect
 
 
 def regions():
@@ -47,7 +47,7 @@ def connect_to_region(region_name, **kw_params):
     :return: A connection to the given region, or None if an invalid region
              name is given
     """
-    for region in regions():
-        if region.name == region_name:
-            return region.connect(**kw_params)
-    return None
+    from boto.rds2.layer1 import RDSConnection
+    return connect('rds', region_name,
+                   connection_cls=RDSConnection,
+                   **kw_params)
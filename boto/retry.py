@@ -0,0 +1,232 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+"""
+Retry policies used by ``AWSAuthConnection._mexe``.
+
+A :class:`RetryPolicy` decides how long to wait between attempts and
+whether another attempt may be made at all.  Delays use "decorrelated
+jitter", so that clients which failed at the same moment spread their
+retries out instead of retrying in lock step.  Optionally, a policy
+draws on a :class:`RetryBudget`, a token bucket shared by every
+connection to the same endpoint, and a :class:`CircuitBreaker`, which
+fails requests fast after repeated failures.  Both are disabled by
+default and can be enabled in the Boto config section::
+
+    [Boto]
+    retry_budget = 100
+    circuit_breaker_threshold = 20
+    circuit_breaker_timeout = 30
+"""
+import random
+import threading
+import time
+
+from boto import config
+from boto.exception import CircuitOpenError
+
+
+class RetryBudget(object):
+    """
+    A token bucket that limits the number of retries.
+
+    Every retry withdraws ``retry_cost`` tokens and every successful
+    request deposits ``success_credit`` tokens, up to ``capacity``.
+    Once the bucket is empty retries are refused, so that a failing
+    endpoint is not hit with a multiple of its normal load.
+    """
+    def __init__(self, capacity, retry_cost=5, success_credit=1):
+        self.capacity = capacity
+        self.retry_cost = retry_cost
+        self.success_credit = success_credit
+        self.tokens = capacity
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Withdraws the cost of one retry.  Returns False if there are
+        not enough tokens left.
+        """
+        with self.lock:
+            if self.tokens < self.retry_cost:
+                return False
+            self.tokens -= self.retry_cost
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.tokens = min(self.capacity,
+                              self.tokens + self.success_credit)
+
+
+class CircuitBreaker(object):
+    """
+    Fails requests fast after ``threshold`` consecutive failed attempts.
+
+    Once open, the circuit rejects requests for ``timeout`` seconds.
+    After that a single trial request is let through: if it succeeds
+    the circuit closes again, otherwise it stays open for another
+    ``timeout`` seconds.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, threshold, timeout=30.0):
+        self.threshold = threshold
+        self.timeout = timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.lock = threading.Lock()
+
+    def allow_request(self):
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and \
+                    time.time() >= self.opened_at + self.timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or \
+                    self.failures >= self.threshold:
+                self.state = self.OPEN
+                self.opened_at = time.time()
+
+
+class RetryPolicy(object):
+    """
+    Decides whether and when ``_mexe`` retries a request.
+
+    :type num_retries: int
+    :param num_retries: The number of retries.  If None, the caller's
+        default is used.
+
+    :type base_delay: float
+    :param base_delay: The shortest delay between attempts, in seconds.
+
+    :type max_delay: float
+    :param max_delay: The longest delay between attempts, in seconds.
+
+    :type budget: :class:`RetryBudget`
+    :param budget: An optional retry budget, usually shared with other
+        connections to the same endpoint.
+
+    :type breaker: :class:`CircuitBreaker`
+    :param breaker: An optional circuit breaker.
+    """
+    def __init__(self, num_retries=None, base_delay=0.25, max_delay=60,
+                 budget=None, breaker=None):
+        self.num_retries = num_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.breaker = breaker
+
+    @classmethod
+    def from_config(cls, endpoint=None):
+        """
+        Builds a policy from the Boto config section.  The config is
+        read once here rather than on every request.  Retry budgets and
+        circuit breakers are shared by all policies for ``endpoint``.
+        """
+        num_retries = None
+        if config.has_option('Boto', 'num_retries'):
+            num_retries = config.getint('Boto', 'num_retries')
+        max_delay = config.getfloat('Boto', 'max_retry_delay', 60)
+        budget = None
+        if config.has_option('Boto', 'retry_budget'):
+            budget = _get_shared(_budgets, endpoint, RetryBudget,
+                                 config.getint('Boto', 'retry_budget'))
+        breaker = None
+        if config.has_option('Boto', 'circuit_breaker_threshold'):
+            breaker = _get_shared(
+                _breakers, endpoint, CircuitBreaker,
+                config.getint('Boto', 'circuit_breaker_threshold'),
+                config.getfloat('Boto', 'circuit_breaker_timeout', 30))
+        return cls(num_retries, max_delay=max_delay, budget=budget,
+                   breaker=breaker)
+
+    def before_request(self, description=''):
+        """
+        Called before the first attempt of a request.  Raises
+        CircuitOpenError if the circuit breaker is open.
+        """
+        if self.breaker is not None and not self.breaker.allow_request():
+            raise CircuitOpenError(
+                'Circuit breaker is open, not sending request %s' %
+                description)
+
+    def next_delay(self, previous_delay=None):
+        """
+        Returns the delay before the next attempt, picked at random
+        between ``base_delay`` and three times the previous delay.
+        """
+        if previous_delay is None or previous_delay < self.base_delay:
+            previous_delay = self.base_delay
+        delay = random.uniform(self.base_delay, previous_delay * 3)
+        return min(delay, self.max_delay)
+
+    def allow_retry(self):
+        """
+        Called before every retry.  Returns False if the retry budget
+        is exhausted or the circuit breaker has opened, in which case
+        the request should fail without further attempts.
+        """
+        if self.breaker is not None and not self.breaker.allow_request():
+            return False
+        if self.budget is not None and not self.budget.acquire():
+            return False
+        return True
+
+    def record_success(self):
+        if self.budget is not None:
+            self.budget.record_success()
+        if self.breaker is not None:
+            self.breaker.record_success()
+
+    def record_failure(self):
+        if self.breaker is not None:
+            self.breaker.record_failure()
+
+
+_budgets = {}
+_breakers = {}
+_shared_lock = threading.Lock()
+
+
+def _get_shared(registry, endpoint, factory, *args):
+    if endpoint is None:
+        return factory(*args)
+    with _shared_lock:
+        if endpoint not in registry:
+            registry[endpoint] = factory(*args)
+        return registry[endpoint]
@@ -27,7 +27,6 @@
 from boto.route53 import exception
 import random
 import uuid
-import xml.sax
 
 import boto
 from boto.connection import AWSAuthConnection
@@ -445,7 +444,7 @@ class Route53Connection(AWSAuthConnection):
                                            body)
         rs = ResourceRecordSets(connection=self, hosted_zone_id=hosted_zone_id)
         h = handler.XmlHandler(rs, self)
-        xml.sax.parseString(body, h)
+        handler.parse_xml(body, h)
         return rs
 
     def change_rrsets(self, hosted_zone_id, xml_body):
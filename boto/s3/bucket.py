@@ -33,9 +33,13 @@ from boto.s3.multipart import MultiPartUpload
 from boto.s3.multipart import CompleteMultiPartUpload
 from boto.s3.multidelete import MultiDeleteResult
 from boto.s3.multidelete import Error
+from boto.s3.multidelete import MAX_KEYS_PER_REQUEST, MultiDeleter
+from boto.s3.multidelete import build_delete_xml, delete_target
 from boto.s3.bucketlistresultset import BucketListResultSet
 from boto.s3.bucketlistresultset import VersionedBucketListResultSet
 from boto.s3.bucketlistresultset import MultiPartUploadListResultSet
+from boto.s3.listing import ParallelLister, StreamingListing
+from boto.s3.transfer import MultipartCopier
 from boto.s3.lifecycle import Lifecycle
 from boto.s3.tagging import Tags
 from boto.s3.cors import CORSConfiguration
@@ -43,8 +47,6 @@ from boto.s3.bucketlogging import BucketLogging
 from boto.s3 import website
 import boto.jsonresponse
 import boto.utils
-import xml.sax
-import xml.sax.saxutils
 import re
 import base64
 from collections import defaultdict
@@ -230,7 +232,7 @@ class Bucket(object):
                     response.status, response.reason, '')
 
     def list(self, prefix='', delimiter='', marker='', headers=None,
-             encoding_type=None):
+             encoding_type=None, key_class=None, stream=False):
         """
         List key objects within a bucket.  This returns an instance of an
         BucketListResultSet that automatically handles all of the result
@@ -274,11 +276,70 @@ class Bucket(object):
             Valid options: ``url``
         :type encoding_type: string
 
+        :type key_class: class
+        :param key_class: The class to create for each key. Defaults to the
+            bucket's ``key_class``. Pass
+            :class:`boto.s3.listing.KeyRecord` when holding very large
+            listings in memory: records are much smaller than keys, and
+            their ``to_key`` method returns a full key when one is needed.
+
+        :type stream: bool
+        :param stream: If True, each page is parsed with
+            ``iter_all_keys`` as it is received, so keys are returned
+            before the whole page has downloaded, and a page cut short
+            by a connection error is requested again.  Defaults to
+            False.
+
         :rtype: :class:`boto.s3.bucketlistresultset.BucketListResultSet`
         :return: an instance of a BucketListResultSet that handles paging, etc
         """
         return BucketListResultSet(self, prefix, delimiter, marker, headers,
-                                   encoding_type=encoding_type)
+                                   encoding_type=encoding_type,
+                                   key_class=key_class, stream=stream)
+
+    def list_parallel(self, prefix='', shard_delimiter='/', headers=None,
+                      encoding_type=None, key_class=None, num_threads=10,
+                      ordered=True, stream=False):
+        """
+        List all keys under a prefix, using several threads to list
+        different parts of the bucket at the same time.  This is much
+        faster than ``list`` for large buckets whose keys are spread over
+        many "directories".
+
+        The bucket is split into shards at the common prefixes found by
+        listing ``prefix`` with ``shard_delimiter``; each shard is listed
+        by one of ``num_threads`` workers.
+
+        :type prefix: string
+        :param prefix: Only list keys that begin with this prefix.
+
+        :type shard_delimiter: string
+        :param shard_delimiter: The delimiter used to find shards.
+
+        :type encoding_type: string
+        :param encoding_type: As for ``list``.
+
+        :type key_class: class
+        :param key_class: As for ``list``.
+
+        :type stream: bool
+        :param stream: As for ``list``.
+
+        :type num_threads: int
+        :param num_threads: How many shards to list at once.
+
+        :type ordered: bool
+        :param ordered: If True (the default), keys are returned in the
+            same order ``list`` would return them.  If False, keys are
+            returned as soon as they are found.
+
+        :rtype: :class:`boto.s3.listing.ParallelLister`
+        :return: An iterable over the keys
+        """
+        return ParallelLister(self, prefix, shard_delimiter, headers,
+                              encoding_type=encoding_type,
+                              key_class=key_class, num_threads=num_threads,
+                              ordered=ordered, stream=stream)
 
     def list_versions(self, prefix='', delimiter='', key_marker='',
                       version_id_marker='', headers=None, encoding_type=None):
@@ -403,7 +464,7 @@ class Bucket(object):
             h = handler.XmlHandler(rs, self)
             if not isinstance(body, bytes):
                 body = body.encode('utf-8')
-            xml.sax.parseString(body, h)
+            handler.parse_xml(body, h)
             return rs
         else:
             raise self.connection.provider.storage_response_error(
@@ -460,17 +521,55 @@ class Bucket(object):
             Valid options: ``url``
         :type encoding_type: string
 
+        :type key_class: class
+        :param key_class: The class to create for each key. Defaults to
+            the bucket's ``key_class``.
+
         :rtype: ResultSet
         :return: The result from S3 listing the keys requested
 
         """
+        key_class = params.pop('key_class', None) or self.key_class
         self.validate_kwarg_names(params, ['maxkeys', 'max_keys', 'prefix',
                                            'marker', 'delimiter',
                                            'encoding_type'])
-        return self._get_all([('Contents', self.key_class),
+        return self._get_all([('Contents', key_class),
                               ('CommonPrefixes', Prefix)],
                              '', headers, **params)
 
+    def iter_all_keys(self, headers=None, key_class=None, **params):
+        """
+        Like ``get_all_keys``, but returns the entries as the response is
+        received rather than after the whole page has been read and
+        parsed.  The page attributes (``is_truncated``, ``next_marker``)
+        are available on the returned object once iteration is complete.
+
+        Takes the same parameters as ``get_all_keys``, plus:
+
+        :type key_class: class
+        :param key_class: The class to create for each entry. Defaults to
+            the bucket's ``key_class``;
+            :class:`boto.s3.listing.KeyRecord` builds lighter records
+            holding only what the listing contains.
+
+        :rtype: :class:`boto.s3.listing.StreamingListing`
+        :return: An iterable over the keys and common prefixes of the page
+        """
+        self.validate_kwarg_names(params, ['maxkeys', 'max_keys', 'prefix',
+                                           'marker', 'delimiter',
+                                           'encoding_type'])
+        query_args = self._get_all_query_args(params)
+        response = self.connection.make_request('GET', self.name,
+                                                headers=headers,
+                                                query_args=query_args)
+        if response.status != 200:
+            body = response.read()
+            raise self.connection.provider.storage_response_error(
+                response.status, response.reason, body)
+        return StreamingListing(response, self,
+                                [('Contents', key_class or self.key_class),
+                                 ('CommonPrefixes', Prefix)])
+
     def get_all_versions(self, headers=None, **params):
         """
         A lower-level, version-aware method for listing contents of a
@@ -631,7 +730,9 @@ class Bucket(object):
                                             response_headers=response_headers,
                                             expires_in_absolute=expires_in_absolute)
 
-    def delete_keys(self, keys, quiet=False, mfa_token=None, headers=None):
+    def delete_keys(self, keys, quiet=False, mfa_token=None, headers=None,
+                    num_threads=None, batch_callback=None,
+                    progress_callback=None):
         """
         Deletes a set of keys using S3's Multi-object delete API. If a
         VersionID is specified for that key then that version is removed.
@@ -640,7 +741,8 @@ class Bucket(object):
 
         :type keys: list
         :param keys: A list of either key_names or (key_name, versionid) pairs
-            or a list of Key instances.
+            or a list of Key instances.  Any iterable works, including
+            the result of ``list`` or ``list_versions``.
 
         :type quiet: boolean
         :param quiet: In quiet mode the response includes only keys
@@ -655,78 +757,77 @@ class Bucket(object):
             required anytime you are deleting versioned objects from a
             bucket that has the MFADelete option on the bucket.
 
+        :type num_threads: int
+        :param num_threads: If given, send up to this many delete
+            requests at once and retry keys that fail with transient
+            errors, using a :class:`boto.s3.multidelete.MultiDeleter`.
+
+        :type batch_callback: function
+        :param batch_callback: Only with ``num_threads``. Called with the
+            MultiDeleteResult of each request instead of collecting every
+            result in the one returned.
+
+        :type progress_callback: function
+        :param progress_callback: Only with ``num_threads``. Called with
+            a dict of progress counters after each request.
+
         :returns: An instance of MultiDeleteResult
         """
-        ikeys = iter(keys)
+        if num_threads:
+            deleter = MultiDeleter(self, num_threads=num_threads, quiet=quiet,
+                                   mfa_token=mfa_token, headers=headers,
+                                   batch_callback=batch_callback,
+                                   progress_callback=progress_callback)
+            return deleter.delete(keys)
+
         result = MultiDeleteResult(self)
-        provider = self.connection.provider
-        query_args = 'delete'
-
-        def delete_keys2(hdrs):
-            hdrs = hdrs or {}
-            data = u"""<?xml version="1.0" encoding="UTF-8"?>"""
-            data += u"<Delete>"
-            if quiet:
-                data += u"<Quiet>true</Quiet>"
-            count = 0
-            while count < 1000:
-                try:
-                    key = next(ikeys)
-                except StopIteration:
-                    break
-                if isinstance(key, six.string_types):
-                    key_name = key
-                    version_id = None
-                elif isinstance(key, tuple) and len(key) == 2:
-                    key_name, version_id = key
-                elif (isinstance(key, Key) or isinstance(key, DeleteMarker)) and key.name:
-                    key_name = key.name
-                    version_id = key.version_id
-                else:
-                    if isinstance(key, Prefix):
-                        key_name = key.name
-                        code = 'PrefixSkipped'   # Don't delete Prefix
-                    else:
-                        key_name = repr(key)   # try get a string
-                        code = 'InvalidArgument'  # other unknown type
-                    message = 'Invalid. No delete action taken for this object.'
-                    error = Error(key_name, code=code, message=message)
-                    result.errors.append(error)
-                    continue
-                count += 1
-                data += u"<Object><Key>%s</Key>" % xml.sax.saxutils.escape(key_name)
-                if version_id:
-                    data += u"<VersionId>%s</VersionId>" % version_id
-                data += u"</Object>"
-            data += u"</Delete>"
-            if count <= 0:
-                return False  # no more
-            data = data.encode('utf-8')
-            fp = BytesIO(data)
-            md5 = boto.utils.compute_md5(fp)
-            hdrs['Content-MD5'] = md5[1]
-            hdrs['Content-Type'] = 'text/xml'
-            if mfa_token:
-                hdrs[provider.mfa_header] = ' '.join(mfa_token)
-            response = self.connection.make_request('POST', self.name,
-                                                    headers=hdrs,
-                                                    query_args=query_args,
-                                                    data=data)
-            body = response.read()
-            if response.status == 200:
-                h = handler.XmlHandler(result, self)
-                if not isinstance(body, bytes):
-                    body = body.encode('utf-8')
-                xml.sax.parseString(body, h)
-                return count >= 1000  # more?
-            else:
-                raise provider.storage_response_error(response.status,
-                                                      response.reason,
-                                                      body)
-        while delete_keys2(headers):
-            pass
+        batch = []
+        for key in keys:
+            target = delete_target(key)
+            if isinstance(target, Error):
+                result.errors.append(target)
+                continue
+            batch.append(target)
+            if len(batch) == MAX_KEYS_PER_REQUEST:
+                self._delete_batch(batch, quiet, mfa_token, headers, result)
+                batch = []
+        if batch:
+            self._delete_batch(batch, quiet, mfa_token, headers, result)
         return result
 
+    def _delete_batch(self, targets, quiet=False, mfa_token=None,
+                      headers=None, result=None):
+        """
+        Sends a single Multi-Object Delete request for up to 1000
+        ``(key_name, version_id)`` pairs and parses the response into
+        ``result`` (a new MultiDeleteResult if not given).
+        """
+        if result is None:
+            result = MultiDeleteResult(self)
+        provider = self.connection.provider
+        data = build_delete_xml(targets, quiet)
+        hdrs = dict(headers or {})
+        md5 = boto.utils.compute_md5(BytesIO(data))
+        hdrs['Content-MD5'] = md5[1]
+        hdrs['Content-Type'] = 'text/xml'
+        if mfa_token:
+            hdrs[provider.mfa_header] = ' '.join(mfa_token)
+        response = self.connection.make_request('POST', self.name,
+                                                headers=hdrs,
+                                                query_args='delete',
+                                                data=data)
+        body = response.read()
+        if response.status == 200:
+            h = handler.XmlHandler(result, self)
+            if not isinstance(body, bytes):
+                body = body.encode('utf-8')
+            handler.parse_xml(body, h)
+            return result
+        else:
+            raise provider.storage_response_error(response.status,
+                                                  response.reason,
+                                                  body)
+
     def delete_key(self, key_name, headers=None, version_id=None,
                    mfa_token=None):
         """
@@ -788,7 +889,8 @@ class Bucket(object):
     def copy_key(self, new_key_name, src_bucket_name,
                  src_key_name, metadata=None, src_version_id=None,
                  storage_class='STANDARD', preserve_acl=False,
-                 encrypt_key=False, headers=None, query_args=None):
+                 encrypt_key=False, headers=None, query_args=None,
+                 num_threads=None, part_size=None):
         """
         Create a new key in the bucket by copying another existing key.
 
@@ -839,9 +941,29 @@ class Bucket(object):
         :param query_args: A string of additional querystring arguments
             to append to the request
 
+        :type num_threads: int
+        :param num_threads: If greater than one, a source larger than
+            ``part_size`` is copied as a multipart upload whose parts
+            are copied concurrently by this many threads.  This is
+            required for sources over 5GB.  See
+            :class:`boto.s3.transfer.MultipartCopier`.
+
+        :type part_size: int
+        :param part_size: The size, in bytes, of each part copied when
+            num_threads is greater than one.
+
         :rtype: :class:`boto.s3.key.Key` or subclass
         :returns: An instance of the newly created key object
         """
+        if num_threads is not None and num_threads > 1 and not query_args:
+            copier = MultipartCopier(self, num_threads=num_threads,
+                                     part_size=part_size)
+            return copier.copy(new_key_name, src_bucket_name, src_key_name,
+                               metadata=metadata,
+                               src_version_id=src_version_id,
+                               storage_class=storage_class,
+                               preserve_acl=preserve_acl,
+                               encrypt_key=encrypt_key, headers=headers)
         headers = headers or {}
         provider = self.connection.provider
         src_key_name = boto.utils.get_utf8_value(src_key_name)
@@ -875,7 +997,7 @@ class Bucket(object):
             h = handler.XmlHandler(key, self)
             if not isinstance(body, bytes):
                 body = body.encode('utf-8')
-            xml.sax.parseString(body, h)
+            handler.parse_xml(body, h)
             if hasattr(key, 'Error'):
                 raise provider.storage_copy_error(key.Code, key.Message, body)
             key.handle_version_headers(response)
@@ -955,7 +1077,7 @@ class Bucket(object):
             h = handler.XmlHandler(policy, self)
             if not isinstance(body, bytes):
                 body = body.encode('utf-8')
-            xml.sax.parseString(body, h)
+            handler.parse_xml(body, h)
             return policy
         else:
             raise self.connection.provider.storage_response_error(
@@ -1137,7 +1259,7 @@ class Bucket(object):
             h = handler.XmlHandler(rs, self)
             if not isinstance(body, bytes):
                 body = body.encode('utf-8')
-            xml.sax.parseString(body, h)
+            handler.parse_xml(body, h)
             return rs.LocationConstraint
         else:
             raise self.connection.provider.storage_response_error(
@@ -1218,7 +1340,7 @@ class Bucket(object):
             h = handler.XmlHandler(blogging, self)
             if not isinstance(body, bytes):
                 body = body.encode('utf-8')
-            xml.sax.parseString(body, h)
+            handler.parse_xml(body, h)
             return blogging
         else:
             raise self.connection.provider.storage_response_error(
@@ -1380,7 +1502,7 @@ class Bucket(object):
             h = handler.XmlHandler(lifecycle, self)
             if not isinstance(body, bytes):
                 body = body.encode('utf-8')
-            xml.sax.parseString(body, h)
+            handler.parse_xml(body, h)
             return lifecycle
         else:
             raise self.connection.provider.storage_response_error(
@@ -1486,7 +1608,7 @@ class Bucket(object):
         config_xml = self.get_website_configuration_xml(headers=headers)
         config = website.WebsiteConfiguration()
         h = handler.XmlHandler(config, self)
-        xml.sax.parseString(config_xml, h)
+        handler.parse_xml(config_xml, h)
         return config
 
     def get_website_configuration_with_xml(self, headers=None):
@@ -1666,7 +1788,7 @@ class Bucket(object):
         body = self.get_cors_xml(headers)
         cors = CORSConfiguration()
         h = handler.XmlHandler(cors, self)
-        xml.sax.parseString(body, h)
+        handler.parse_xml(body, h)
         return cors
 
     def delete_cors(self, headers=None):
@@ -1758,7 +1880,7 @@ class Bucket(object):
             h = handler.XmlHandler(resp, self)
             if not isinstance(body, bytes):
                 body = body.encode('utf-8')
-            xml.sax.parseString(body, h)
+            handler.parse_xml(body, h)
             return resp
         else:
             raise self.connection.provider.storage_response_error(
@@ -1789,7 +1911,7 @@ class Bucket(object):
             h = handler.XmlHandler(resp, self)
             if not isinstance(body, bytes):
                 body = body.encode('utf-8')
-            xml.sax.parseString(body, h)
+            handler.parse_xml(body, h)
             # Use a dummy key to parse various response headers
             # for versioning, encryption info and then explicitly
             # set the completed MPU object values from key.
@@ -1828,7 +1950,7 @@ class Bucket(object):
         h = handler.XmlHandler(tags, self)
         if not isinstance(response, bytes):
             response = response.encode('utf-8')
-        xml.sax.parseString(response, h)
+        handler.parse_xml(response, h)
         return tags
 
     def get_xml_tags(self):
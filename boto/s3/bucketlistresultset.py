@@ -19,27 +19,84 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 # IN THE SOFTWARE.
 
-from boto.compat import urllib, six
+import socket
+
+import boto
+from boto.compat import http_client, urllib, six
+from boto.s3.prefix import Prefix
+
+# Errors that can cut a streamed page short.  The rest of the page is
+# then requested again.
+_CONNECTION_ERRORS = (http_client.HTTPException, socket.error)
+
+
+def _next_marker(marker, encoding_type):
+    if marker and encoding_type == "url":
+        if isinstance(marker, six.text_type):
+            marker = marker.encode('utf-8')
+        marker = urllib.parse.unquote(marker)
+    return marker
 
 def bucket_lister(bucket, prefix='', delimiter='', marker='', headers=None,
-                  encoding_type=None):
+                  encoding_type=None, key_class=None, stream=False):
     """
     A generator function for listing keys in a bucket.
+
+    With ``stream``, and where the bucket supports it, each page is
+    parsed as it is received, so keys are yielded before the page has
+    finished downloading.  If the connection fails part way through a
+    page, the rest of the page is requested again, up to the
+    connection's ``num_retries`` times: after the last key yielded, or,
+    for delimited listings, from the start of the page, skipping the
+    entries already yielded.  A page lists its keys before its common
+    prefixes, so resuming after a key could miss a prefix that sorts
+    before it.
     """
     more_results = True
     k = None
+    streaming = stream and hasattr(bucket, 'iter_all_keys')
+    get_keys = bucket.iter_all_keys if streaming else bucket.get_all_keys
+    num_retries = getattr(bucket.connection, 'num_retries', 0) or 0
+    retries = 0
+    params = {}
+    if key_class is not None:
+        params['key_class'] = key_class
+    page_marker = marker
+    # Names yielded from the current page, while it is being retried.
+    yielded = set()
+    last_key = None
     while more_results:
-        rs = bucket.get_all_keys(prefix=prefix, marker=marker,
-                                 delimiter=delimiter, headers=headers,
-                                 encoding_type=encoding_type)
-        for k in rs:
-            yield k
+        rs = get_keys(prefix=prefix, marker=marker,
+                      delimiter=delimiter, headers=headers,
+                      encoding_type=encoding_type, **params)
+        try:
+            for entry in rs:
+                if entry.name in yielded:
+                    continue
+                if streaming:
+                    yielded.add(entry.name)
+                    if not isinstance(entry, Prefix):
+                        last_key = entry
+                k = entry
+                yield entry
+        except _CONNECTION_ERRORS as e:
+            if not streaming or retries >= num_retries:
+                raise
+            retries += 1
+            if delimiter or last_key is None:
+                marker = page_marker
+            else:
+                marker = _next_marker(last_key.name, encoding_type)
+                yielded = set()
+            boto.log.debug('Listing interrupted by %s, resuming from %r' %
+                           (e.__class__.__name__, marker))
+            continue
+        retries = 0
+        yielded = set()
+        last_key = None
         if k:
-            marker = rs.next_marker or k.name
-        if marker and encoding_type == "url":
-            if isinstance(marker, six.text_type):
-                marker = marker.encode('utf-8')
-            marker = urllib.parse.unquote(marker)
+            marker = _next_marker(rs.next_marker or k.name, encoding_type)
+        page_marker = marker
         more_results= rs.is_truncated
 
 class BucketListResultSet(object):
@@ -52,19 +109,23 @@ class BucketListResultSet(object):
     """
 
     def __init__(self, bucket=None, prefix='', delimiter='', marker='',
-                 headers=None, encoding_type=None):
+                 headers=None, encoding_type=None, key_class=None,
+                 stream=False):
         self.bucket = bucket
         self.prefix = prefix
         self.delimiter = delimiter
         self.marker = marker
         self.headers = headers
         self.encoding_type = encoding_type
+        self.key_class = key_class
+        self.stream = stream
 
     def __iter__(self):
         return bucket_lister(self.bucket, prefix=self.prefix,
                              delimiter=self.delimiter, marker=self.marker,
                              headers=self.headers,
-                             encoding_type=self.encoding_type)
+                             encoding_type=self.encoding_type,
+                             key_class=self.key_class, stream=self.stream)
 
 def versioned_bucket_lister(bucket, prefix='', delimiter='',
                             key_marker='', version_id_marker='', headers=None,
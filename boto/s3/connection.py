@@ -22,7 +22,6 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 # IN THE SOFTWARE.
 
-import xml.sax
 import base64
 from boto.compat import six, urllib
 import time
@@ -442,7 +441,7 @@ class S3Connection(AWSAuthConnection):
         h = handler.XmlHandler(rs, self)
         if not isinstance(body, bytes):
             body = body.encode('utf-8')
-        xml.sax.parseString(body, h)
+        handler.parse_xml(body, h)
         return rs
 
     def get_canonical_user_id(self, headers=None):
@@ -23,12 +23,17 @@
 import email.utils
 import errno
 import hashlib
+import io
 import mimetypes
 import os
 import re
 import base64
 import binascii
 import math
+import mmap
+import socket
+import ssl
+import stat
 from hashlib import md5
 import boto.utils
 from boto.compat import BytesIO, six, urllib, encodebytes
@@ -38,6 +43,7 @@ from boto.exception import StorageDataError
 from boto.exception import PleaseRetryException
 from boto.provider import Provider
 from boto.s3.keyfile import KeyFile
+from boto.s3.transfer import ParallelDownloader, DEFAULT_PART_SIZE
 from boto.s3.user import User
 from boto import UserAgent
 from boto.utils import compute_md5, compute_hash
@@ -45,6 +51,238 @@ from boto.utils import find_matching_headers
 from boto.utils import merge_headers_by_name
 
 
+def _buffer_writer(fp):
+    """
+    Returns a function that writes a memoryview to ``fp`` in full.
+    Objects that aren't known to take buffers are given bytes.
+    """
+    if isinstance(fp, io.RawIOBase):
+        def write(view):
+            # Unbuffered files may write only part of what they're given.
+            while view:
+                view = view[fp.write(view):]
+        return write
+    if isinstance(fp, io.IOBase):
+        return fp.write
+    return lambda view: fp.write(view.tobytes())
+
+
+# Binary files whose read() can be replaced by readinto().  Subclasses
+# are left alone, since they may override read() to see the data.
+_READINTO_TYPES = (io.BufferedReader, io.BufferedRandom, io.FileIO,
+                   io.BytesIO)
+
+
+def _sendmsg_all(sock, buffers):
+    """
+    Sends ``buffers`` in order with as few system calls as possible.
+    """
+    buffers = [memoryview(b) for b in buffers if len(b)]
+    while buffers:
+        sent = sock.sendmsg(buffers)
+        while sent:
+            if sent < len(buffers[0]):
+                buffers[0] = buffers[0][sent:]
+                break
+            sent -= len(buffers[0])
+            buffers.pop(0)
+
+
+class _UploadBody(object):
+    """
+    Sends the body of an upload.  ``advance`` walks the data in pieces of
+    whatever size the caller asks for, so progress is counted exactly as
+    before, while the data is read, hashed and sent in blocks of up to
+    ``block_size`` bytes:
+
+    * ``BytesIO`` and ``mmap`` objects are sent straight from their
+      buffers.
+    * Regular files that need no hashing are sent with
+      ``socket.sendfile`` when the connection isn't encrypted.
+    * Other binary files are read into one reusable buffer.
+    * Anything else is read and sent a piece at a time.
+
+    Chunked transfers send one chunk per block, and on unencrypted
+    connections a chunk and its framing go out in a single ``sendmsg``.
+    """
+
+    def __init__(self, fp, http_conn, digesters, chunked, size, block_size,
+                 seekable):
+        self.fp = fp
+        self.http_conn = http_conn
+        self.digesters = digesters
+        self.chunked = chunked
+        self.block_size = block_size
+        sock = getattr(http_conn, 'sock', None)
+        if (not isinstance(sock, socket.socket) or
+                isinstance(sock, ssl.SSLSocket)):
+            sock = None
+        self.sock = sock
+        # Data between _start and _pos has been consumed but not sent;
+        # data between _pos and _end is available.
+        self._view = None
+        self._start = self._pos = self._end = 0
+        # How much more may be read, if there is a limit.
+        self._limit = size or None
+        self._ranged = False
+        self._advance = self._advance_read
+        self._send = None
+
+        kind = type(fp)
+        view = self._memory_view(fp) if seekable else None
+        if view is not None:
+            self._use_range(fp.tell(), len(view))
+            self._view = view
+            self._send = self._send_view
+        elif (seekable and self._can_sendfile(fp, sock) and
+              kind in _READINTO_TYPES):
+            self._use_range(fp.tell(), os.fstat(fp.fileno()).st_size)
+            self._send = self._send_file
+        elif kind in _READINTO_TYPES:
+            remaining = self._file_remaining(fp)
+            if remaining is not None:
+                block_size = min(block_size, remaining)
+            if self._limit is not None:
+                block_size = min(block_size, self._limit)
+            self._view = memoryview(bytearray(max(block_size, 1)))
+            self._advance = self._advance_buffered
+            self._send = self._send_view
+
+    def _memory_view(self, fp):
+        # BytesIO.getbuffer and memoryviews of mmaps are Python 3 only;
+        # elsewhere the data is read like any other file.
+        try:
+            if type(fp) is io.BytesIO:
+                return fp.getbuffer()
+            if type(fp) is mmap.mmap:
+                return memoryview(fp)
+        except (AttributeError, TypeError):
+            pass
+        return None
+
+    def _use_range(self, start, end):
+        if self._limit is not None:
+            end = min(end, start + self._limit)
+        self._start = self._pos = start
+        self._end = max(start, end)
+        self._ranged = True
+        self._advance = self._advance_range
+
+    def _can_sendfile(self, fp, sock):
+        return (sock is not None and hasattr(sock, 'sendfile') and
+                not self.chunked and not self.digesters and
+                self._file_remaining(fp) is not None)
+
+    def _file_remaining(self, fp):
+        try:
+            st = os.fstat(fp.fileno())
+            if not stat.S_ISREG(st.st_mode):
+                return None
+            return max(st.st_size - fp.tell(), 0)
+        except (AttributeError, EnvironmentError, io.UnsupportedOperation):
+            return None
+
+    def advance(self, size):
+        """
+        Consumes up to ``size`` bytes and returns how many there were;
+        0 means the data is exhausted.  Consumed data is sent by the
+        next ``flush`` at the latest.
+        """
+        return self._advance(size)
+
+    def _advance_read(self, size):
+        chunk = self.fp.read(size)
+        if not isinstance(chunk, bytes):
+            chunk = chunk.encode('utf-8')
+        if chunk:
+            self._send_data(chunk)
+        return len(chunk)
+
+    def _advance_range(self, size):
+        taken = min(size, self._end - self._pos)
+        self._pos += taken
+        if self._pos - self._start >= self.block_size:
+            self.flush()
+        return taken
+
+    def _advance_buffered(self, size):
+        taken = 0
+        while taken < size:
+            if self._pos == self._end and not self._fill():
+                break
+            n = min(size - taken, self._end - self._pos)
+            self._pos += n
+            taken += n
+        return taken
+
+    def _fill(self):
+        self.flush()
+        want = len(self._view)
+        if self._limit is not None:
+            want = min(want, self._limit)
+        n = want and (self.fp.readinto(self._view[:want]) or 0)
+        if self._limit is not None:
+            self._limit -= n
+        self._start = self._pos = 0
+        self._end = n
+        return n
+
+    def flush(self, trailer=None):
+        """
+        Sends everything consumed so far, followed by ``trailer``.
+        """
+        if self._pos > self._start:
+            self._send(self._start, self._pos, trailer)
+            self._start = self._pos
+        elif trailer:
+            self._send_data(b'', trailer)
+
+    def finish(self):
+        """
+        Sends whatever is left, ending the body of a chunked transfer.
+        """
+        self.flush(b'0\r\n\r\n' if self.chunked else None)
+
+    def close(self):
+        """
+        Releases the buffer and leaves the file positioned after the
+        data that was consumed.
+        """
+        if self._ranged:
+            self.fp.seek(self._pos)
+        if self._view is not None:
+            # memoryview.release is missing on Python 2.
+            release = getattr(self._view, 'release', None)
+            if release is not None:
+                release()
+            self._view = None
+
+    def _send_view(self, start, stop, trailer):
+        self._send_data(self._view[start:stop], trailer)
+
+    def _send_file(self, start, stop, trailer):
+        sent = self.sock.sendfile(self.fp, start, stop - start)
+        if sent != stop - start:
+            raise StorageDataError(
+                'File changed size while being uploaded')
+
+    def _send_data(self, data, trailer=None):
+        for alg in self.digesters:
+            self.digesters[alg].update(data)
+        buffers = [data]
+        if self.chunked and len(data):
+            buffers = [('%x;\r\n' % len(data)).encode('ascii'), data,
+                       b'\r\n']
+        if trailer:
+            buffers.append(trailer)
+        if self.sock is not None and hasattr(self.sock, 'sendmsg'):
+            _sendmsg_all(self.sock, buffers)
+        else:
+            for buf in buffers:
+                if len(buf):
+                    self.http_conn.send(buf)
+
+
 class Key(object):
     """
     Represents a key (object) in an S3 bucket.
@@ -83,6 +321,18 @@ class Key(object):
 
 
     BufferSize = boto.config.getint('Boto', 'key_buffer_size', 8192)
+    # The size of the reads used when an upload is hashed as it is sent.
+    SinglePassBufferSize = 1024 * 1024
+    # Uploads are read, hashed and sent in blocks of up to this size,
+    # whatever the size of the pieces progress is counted in.
+    SendBufferSize = boto.config.getint(
+        'Boto', 'key_send_buffer_size', 1024 * 1024)
+    # Downloads are read into a reusable buffer that starts at the
+    # smaller size and doubles, up to the larger, each time a read
+    # fills it.
+    MinReadIntoBufferSize = 1024 * 1024
+    MaxReadIntoBufferSize = boto.config.getint(
+        'Boto', 'key_max_buffer_size', 8 * 1024 * 1024)
 
     # The object metadata fields a user can set, other than custom metadata
     # fields (i.e., those beginning with a provider-specific prefix like
@@ -402,6 +652,29 @@ class Key(object):
             self.close()
         return data
 
+    def readinto(self, b):
+        """
+        Reads up to ``len(b)`` bytes of the key into the writable
+        buffer ``b``, without allocating a new string.
+
+        :rtype: int
+        :return: The number of bytes read, or 0 at the end of the key.
+        """
+        self.open_read()
+        if self._response_supports_readinto():
+            n = self.resp.readinto(b)
+        else:
+            data = self.resp.read(len(b))
+            n = len(data)
+            b[:n] = data
+        if not n:
+            self.close()
+        return n
+
+    def _response_supports_readinto(self):
+        # Checked on the class, so that mocked responses use read().
+        return hasattr(type(self.resp), 'readinto')
+
     def change_storage_class(self, new_storage_class, dst_bucket=None,
                              validate_dst_bucket=True):
         """
@@ -707,7 +980,8 @@ class Key(object):
                                                    version_id)
 
     def send_file(self, fp, headers=None, cb=None, num_cb=10,
-                  query_args=None, chunked_transfer=False, size=None):
+                  query_args=None, chunked_transfer=False, size=None,
+                  single_pass=False):
         """
         Upload a file to a key into a bucket on S3.
 
@@ -744,14 +1018,22 @@ class Key(object):
             up into different ranges to be uploaded. If not specified,
             the default behaviour is to read all bytes from the file
             pointer. Less bytes may be available.
+
+        :type single_pass: bool
+        :param single_pass: (optional) If True, the MD5 has not been
+            computed up front: the data is hashed as it is sent, using
+            larger reads, and checked against the ETag returned. Ignored
+            for chunked transfers.  SigV4 over plain HTTP still reads
+            the data once up front to sign its SHA256.
         """
         self._send_file_internal(fp, headers=headers, cb=cb, num_cb=num_cb,
                                  query_args=query_args,
-                                 chunked_transfer=chunked_transfer, size=size)
+                                 chunked_transfer=chunked_transfer, size=size,
+                                 single_pass=single_pass)
 
     def _send_file_internal(self, fp, headers=None, cb=None, num_cb=10,
                             query_args=None, chunked_transfer=False, size=None,
-                            hash_algs=None):
+                            hash_algs=None, single_pass=False):
         provider = self.bucket.connection.provider
         try:
             spos = fp.tell()
@@ -759,11 +1041,17 @@ class Key(object):
             spos = None
             self.read_from_stream = False
 
+        # With single_pass the data is read only once: it is hashed as it
+        # is sent and the MD5 is checked against the ETag returned.
+        single_pass = single_pass and not chunked_transfer
+        buffer_size = self.BufferSize
+        if single_pass:
+            buffer_size = max(buffer_size, self.SinglePassBufferSize)
+
         # If hash_algs is unset and the MD5 hasn't already been computed,
         # default to an MD5 hash_alg to hash the data on-the-fly.
         if hash_algs is None and not self.md5:
             hash_algs = {'md5': md5}
-        digesters = dict((alg, hash_algs[alg]()) for alg in hash_algs or {})
 
         def sender(http_conn, method, path, data, headers):
             # This function is called repeatedly for temporary retries
@@ -799,6 +1087,8 @@ class Key(object):
             if getattr(http_conn, 'debuglevel', 0) < 4:
                 http_conn.set_debuglevel(0)
 
+            digesters = dict((alg, hash_algs[alg]())
+                             for alg in hash_algs or {})
             data_len = 0
             if cb:
                 if size:
@@ -810,10 +1100,10 @@ class Key(object):
                 if chunked_transfer and cb_size == 0:
                     # For chunked Transfer, we call the cb for every 1MB
                     # of data transferred, except when we know size.
-                    cb_count = (1024 * 1024) / self.BufferSize
+                    cb_count = (1024 * 1024) / buffer_size
                 elif num_cb > 1:
                     cb_count = int(
-                        math.ceil(cb_size / self.BufferSize / (num_cb - 1.0)))
+                        math.ceil(cb_size / buffer_size / (num_cb - 1.0)))
                 elif num_cb < 0:
                     cb_count = -1
                 else:
@@ -821,56 +1111,45 @@ class Key(object):
                 i = 0
                 cb(data_len, cb_size)
 
-            bytes_togo = size
-            if bytes_togo and bytes_togo < self.BufferSize:
-                chunk = fp.read(bytes_togo)
-            else:
-                chunk = fp.read(self.BufferSize)
-
-            if not isinstance(chunk, bytes):
-                chunk = chunk.encode('utf-8')
-
-            if spos is None:
-                # read at least something from a non-seekable fp.
-                self.read_from_stream = True
-            while chunk:
-                chunk_len = len(chunk)
-                data_len += chunk_len
-                if chunked_transfer:
-                    http_conn.send('%x;\r\n' % chunk_len)
-                    http_conn.send(chunk)
-                    http_conn.send('\r\n')
-                else:
-                    http_conn.send(chunk)
-                for alg in digesters:
-                    digesters[alg].update(chunk)
-                if bytes_togo:
-                    bytes_togo -= chunk_len
-                    if bytes_togo <= 0:
-                        break
-                if cb:
-                    i += 1
-                    if i == cb_count or cb_count == -1:
-                        cb(data_len, cb_size)
-                        i = 0
-                if bytes_togo and bytes_togo < self.BufferSize:
-                    chunk = fp.read(bytes_togo)
+            body = _UploadBody(fp, http_conn, digesters, chunked_transfer,
+                               size, max(buffer_size, self.SendBufferSize),
+                               spos is not None)
+            try:
+                bytes_togo = size
+                if bytes_togo and bytes_togo < buffer_size:
+                    chunk_len = body.advance(bytes_togo)
                 else:
-                    chunk = fp.read(self.BufferSize)
-
-                if not isinstance(chunk, bytes):
-                    chunk = chunk.encode('utf-8')
+                    chunk_len = body.advance(buffer_size)
+
+                if spos is None:
+                    # read at least something from a non-seekable fp.
+                    self.read_from_stream = True
+                while chunk_len:
+                    data_len += chunk_len
+                    if bytes_togo:
+                        bytes_togo -= chunk_len
+                        if bytes_togo <= 0:
+                            break
+                    if cb:
+                        i += 1
+                        if i == cb_count or cb_count == -1:
+                            body.flush()
+                            cb(data_len, cb_size)
+                            i = 0
+                    if bytes_togo and bytes_togo < buffer_size:
+                        chunk_len = body.advance(bytes_togo)
+                    else:
+                        chunk_len = body.advance(buffer_size)
+
+                body.finish()
+            finally:
+                body.close()
 
             self.size = data_len
 
             for alg in digesters:
                 self.local_hashes[alg] = digesters[alg].digest()
 
-            if chunked_transfer:
-                http_conn.send('0\r\n')
-                    # http_conn.send("Content-MD5: %s\r\n" % self.base64md5)
-                http_conn.send('\r\n')
-
             if cb and (cb_count <= 1 or i > 0) and data_len > 0:
                 cb(data_len, cb_size)
 
@@ -936,10 +1215,19 @@ class Key(object):
         # the auth mechanism (because closures). Detect if it's SigV4 & embelish
         # while we can before the auth calculations occur.
         if 'hmac-v4-s3' in self.bucket.connection._required_auth_capability():
-            kwargs = {'fp': fp, 'hash_algorithm': hashlib.sha256}
-            if size is not None:
-                kwargs['size'] = size
-            headers['_sha256'] = compute_hash(**kwargs)[0]
+            if single_pass and self.bucket.connection.is_secure:
+                # TLS already protects the body, so don't read it all
+                # just to sign it.
+                headers['_sha256'] = 'UNSIGNED-PAYLOAD'
+            else:
+                if single_pass:
+                    boto.log.warning('SigV4 over plain HTTP signs the body, '
+                                     'so %s is read twice despite '
+                                     'single_pass' % self.name)
+                kwargs = {'fp': fp, 'hash_algorithm': hashlib.sha256}
+                if size is not None:
+                    kwargs['size'] = size
+                headers['_sha256'] = compute_hash(**kwargs)[0]
         headers['Expect'] = '100-Continue'
         headers = boto.utils.merge_meta(headers, self.metadata, provider)
         resp = self.bucket.connection.make_request(
@@ -1119,7 +1407,8 @@ class Key(object):
     def set_contents_from_file(self, fp, headers=None, replace=True,
                                cb=None, num_cb=10, policy=None, md5=None,
                                reduced_redundancy=False, query_args=None,
-                               encrypt_key=False, size=None, rewind=False):
+                               encrypt_key=False, size=None, rewind=False,
+                               single_pass=False):
         """
         Store an object in S3 using the name of the Key object as the
         key in S3 and the contents of the file pointed to by 'fp' as the
@@ -1192,6 +1481,15 @@ class Key(object):
             it. The default behaviour is False which reads from the
             current position of the file pointer (fp).
 
+        :type single_pass: bool
+        :param single_pass: (optional) If True and no md5 is given, the
+            file is read only once: the MD5 is computed while the data
+            is sent and checked against the ETag S3 returns, instead of
+            being computed up front and sent as Content-MD5.  Data that
+            is corrupted in transit is then detected only after it has
+            been stored.  SigV4 requests over plain HTTP must sign the
+            SHA256 of the body, so the file is still read twice there.
+
         :rtype: int
         :return: The number of bytes written to the key.
         """
@@ -1263,7 +1561,7 @@ class Key(object):
                     if (re.match('^"[a-fA-F0-9]{32}"$', key.etag)):
                         etag = key.etag.strip('"')
                         md5 = (etag, base64.b64encode(binascii.unhexlify(etag)))
-                if not md5:
+                if not md5 and not single_pass:
                     # compute_md5() and also set self.size to actual
                     # size of the bytes read computing the md5.
                     md5 = self.compute_md5(fp, size)
@@ -1279,8 +1577,12 @@ class Key(object):
                     self.size = fp.tell() - spos
                     fp.seek(spos)
                     size = self.size
-                self.md5 = md5[0]
-                self.base64md5 = md5[1]
+                if md5:
+                    self.md5 = md5[0]
+                    self.base64md5 = md5[1]
+                else:
+                    # Computed while sending, see _send_file_internal.
+                    self.md5 = None
 
             if self.name is None:
                 self.name = self.md5
@@ -1290,14 +1592,15 @@ class Key(object):
 
             self.send_file(fp, headers=headers, cb=cb, num_cb=num_cb,
                            query_args=query_args,
-                           chunked_transfer=chunked_transfer, size=size)
+                           chunked_transfer=chunked_transfer, size=size,
+                           single_pass=single_pass and not self.md5)
             # return number of bytes written.
             return self.size
 
     def set_contents_from_filename(self, filename, headers=None, replace=True,
                                    cb=None, num_cb=10, policy=None, md5=None,
                                    reduced_redundancy=False,
-                                   encrypt_key=False):
+                                   encrypt_key=False, single_pass=False):
         """
         Store an object in S3 using the name of the Key object as the
         key in S3 and the contents of the file named by 'filename'.
@@ -1352,6 +1655,10 @@ class Key(object):
             will be encrypted on the server-side by S3 and will be
             stored in an encrypted form while at rest in S3.
 
+        :type single_pass: bool
+        :param single_pass: If True, the file is read only once, except
+            for SigV4 over plain HTTP, see set_contents_from_file.
+
         :rtype: int
         :return: The number of bytes written to the key.
         """
@@ -1359,7 +1666,8 @@ class Key(object):
             return self.set_contents_from_file(fp, headers, replace, cb,
                                                num_cb, policy, md5,
                                                reduced_redundancy,
-                                               encrypt_key=encrypt_key)
+                                               encrypt_key=encrypt_key,
+                                               single_pass=single_pass)
 
     def set_contents_from_string(self, string_data, headers=None, replace=True,
                                  cb=None, num_cb=10, policy=None, md5=None,
@@ -1514,6 +1822,7 @@ class Key(object):
                   override_num_retries=override_num_retries)
 
         data_len = 0
+        cb_size = 0
         if cb:
             if self.size is None:
                 cb_size = 0
@@ -1532,25 +1841,29 @@ class Key(object):
             i = 0
             cb(data_len, cb_size)
         try:
-            for bytes in self:
-                fp.write(bytes)
-                data_len += len(bytes)
-                for alg in digesters:
-                    digesters[alg].update(bytes)
-                if cb:
-                    if cb_size > 0 and data_len >= cb_size:
-                        break
-                    i += 1
-                    if i == cb_count or cb_count == -1:
-                        cb(data_len, cb_size)
-                        i = 0
+            if self._response_supports_readinto():
+                data_len = self._read_into_file(fp, digesters, cb, cb_size,
+                                                num_cb)
+            else:
+                for bytes in self:
+                    fp.write(bytes)
+                    data_len += len(bytes)
+                    for alg in digesters:
+                        digesters[alg].update(bytes)
+                    if cb:
+                        if cb_size > 0 and data_len >= cb_size:
+                            break
+                        i += 1
+                        if i == cb_count or cb_count == -1:
+                            cb(data_len, cb_size)
+                            i = 0
+                if cb and (cb_count <= 1 or i > 0) and data_len > 0:
+                    cb(data_len, cb_size)
         except IOError as e:
             if e.errno == errno.ENOSPC:
                 raise StorageDataError('Out of space for destination file '
                                        '%s' % fp.name)
             raise
-        if cb and (cb_count <= 1 or i > 0) and data_len > 0:
-            cb(data_len, cb_size)
         for alg in digesters:
           self.local_hashes[alg] = digesters[alg].digest()
         if self.size is None and not torrent and "Range" not in headers:
@@ -1558,6 +1871,54 @@ class Key(object):
         self.close()
         self.bucket.connection.debug = save_debug
 
+    def _read_into_file(self, fp, digesters, cb, cb_size, num_cb):
+        """
+        Copies the open response to ``fp`` through one reusable buffer.
+        Each read is written and hashed from a memoryview of the buffer,
+        so no string is allocated per read.  Returns the number of
+        bytes copied.
+        """
+        size = self.MinReadIntoBufferSize
+        if self.size is not None:
+            # No point in a buffer bigger than the whole key.
+            size = max(1, min(size, self.size))
+        buf = bytearray(size)
+        view = memoryview(buf)
+        write = _buffer_writer(fp)
+        # Callbacks are spaced by bytes rather than by reads, since
+        # reads vary in size.
+        cb_interval = None
+        if cb:
+            if cb_size > 0 and num_cb > 1:
+                cb_interval = cb_size // (num_cb - 1)
+            elif num_cb < 0:
+                cb_interval = 0
+            elif cb_size == 0 and num_cb != -1:
+                cb_interval = 1024 * 1024
+        last_cb = data_len = 0
+        while True:
+            n = self.resp.readinto(view)
+            if not n:
+                break
+            chunk = view[:n]
+            write(chunk)
+            for alg in digesters:
+                digesters[alg].update(chunk)
+            chunk = None
+            data_len += n
+            if cb_interval is not None and data_len - last_cb >= cb_interval:
+                cb(data_len, cb_size)
+                last_cb = data_len
+            if n == len(buf) and len(buf) < self.MaxReadIntoBufferSize and \
+                    (self.size is None or self.size - data_len > len(buf)):
+                # The connection is keeping up; read more at a time.
+                buf = bytearray(min(len(buf) * 2,
+                                    self.MaxReadIntoBufferSize))
+                view = memoryview(buf)
+        if cb and last_cb < data_len:
+            cb(data_len, cb_size)
+        return data_len
+
     def get_torrent_file(self, fp, headers=None, cb=None, num_cb=10):
         """
         Get a torrent file (see to get_file)
@@ -1654,7 +2015,9 @@ class Key(object):
                                  torrent=False,
                                  version_id=None,
                                  res_download_handler=None,
-                                 response_headers=None):
+                                 response_headers=None,
+                                 num_threads=None,
+                                 part_size=None):
         """
         Retrieve an object from S3 using the name of the Key object as the
         key in S3.  Store contents of the object to a file named by 'filename'.
@@ -1702,7 +2065,24 @@ class Key(object):
             retrieving the object.  You can set the Key object's
             ``version_id`` attribute to None to always grab the latest
             version from a version-enabled bucket.
+
+        :type num_threads: int
+        :param num_threads: If greater than one, the object is fetched
+            as byte ranges over this many connections at once, see
+            :class:`boto.s3.transfer.ParallelDownloader`.  If a
+            res_download_handler is also given, its tracker file is used
+            to resume ranges left incomplete by an earlier attempt.
+
+        :type part_size: int
+        :param part_size: The size, in bytes, of each range fetched when
+            num_threads is greater than one.
         """
+        if num_threads is not None and num_threads > 1 and not torrent:
+            self._get_contents_to_filename_parallel(
+                filename, headers, cb, num_cb, version_id,
+                res_download_handler, response_headers, num_threads,
+                part_size)
+            return
         try:
             with open(filename, 'wb') as fp:
                 self.get_contents_to_file(fp, headers, cb, num_cb,
@@ -1713,12 +2093,45 @@ class Key(object):
         except Exception:
             os.remove(filename)
             raise
+        self._set_file_time(filename)
+
+    def _get_contents_to_filename_parallel(self, filename, headers, cb,
+                                           num_cb, version_id,
+                                           res_download_handler,
+                                           response_headers, num_threads,
+                                           part_size):
+        tracker_file_name = None
+        num_retries = 5
+        if res_download_handler is not None:
+            tracker_file_name = res_download_handler.tracker_file_name
+            if res_download_handler.num_retries is not None:
+                num_retries = res_download_handler.num_retries
+        downloader = ParallelDownloader(
+            self, num_threads=num_threads,
+            part_size=part_size or DEFAULT_PART_SIZE,
+            num_retries=num_retries, tracker_file_name=tracker_file_name)
+        try:
+            downloader.download(filename, headers, cb, num_cb,
+                                version_id=version_id,
+                                response_headers=response_headers)
+        except Exception:
+            # Keep what has been written if it can be resumed later.
+            if tracker_file_name is None and os.path.exists(filename):
+                os.remove(filename)
+            raise
+        finally:
+            if res_download_handler is not None:
+                res_download_handler.download_start_point = \
+                    downloader.resumed_bytes
+        self._set_file_time(filename)
+
+    def _set_file_time(self, filename):
         # if last_modified date was sent from s3, try to set file's timestamp
         if self.last_modified is not None:
             try:
                 modified_tuple = email.utils.parsedate_tz(self.last_modified)
                 modified_stamp = int(email.utils.mktime_tz(modified_tuple))
-                os.utime(fp.name, (modified_stamp, modified_stamp))
+                os.utime(filename, (modified_stamp, modified_stamp))
             except Exception:
                 pass
 
@@ -0,0 +1,328 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+"""
+Incremental parsing of bucket listings, so entries can be used while the
+rest of the response is still being received, and listing of disjoint
+parts of a bucket in parallel.
+"""
+import xml.sax
+import xml.sax.handler
+
+from boto.compat import Queue, six, urllib
+from boto.handler import XmlHandler
+from boto.pool import END, WorkerPool
+from boto.resultset import ResultSet
+from boto.s3.bucketlistresultset import bucket_lister
+from boto.s3.prefix import Prefix
+from boto.s3.user import User
+
+
+class KeyRecord(object):
+    """
+    A lightweight entry from a bucket listing, holding only the fields the
+    listing contains.  Records have no per-instance ``__dict__``, so they
+    take a fraction of the memory of a full :class:`boto.s3.key.Key`.
+
+    Other attributes raise ``AttributeError``.  To download, delete or
+    otherwise use the object, call ``to_key`` for a ``Key`` of the
+    bucket's ``key_class`` built from the record's fields.
+    """
+    __slots__ = ('bucket', 'name', 'size', 'etag', 'last_modified',
+                 'storage_class', 'owner', 'version_id', 'is_latest',
+                 '_key')
+
+    def __init__(self, bucket=None, name=None):
+        self.bucket = bucket
+        self.name = name
+        self.size = None
+        self.etag = None
+        self.last_modified = None
+        self.storage_class = None
+        self.owner = None
+        self.version_id = None
+        self.is_latest = False
+        self._key = None
+
+    def __repr__(self):
+        if self.bucket:
+            return '<KeyRecord: %s,%s>' % (self.bucket.name, self.name)
+        return '<KeyRecord: None,%s>' % self.name
+
+    def to_key(self):
+        """
+        Returns the full key for this record, creating it on first use.
+
+        :rtype: :class:`boto.s3.key.Key`
+        """
+        if self._key is None:
+            key = self.bucket.new_key(self.name)
+            key.size = self.size
+            key.etag = self.etag
+            key.last_modified = self.last_modified
+            if self.storage_class is not None:
+                key.storage_class = self.storage_class
+            key.owner = self.owner
+            key.version_id = self.version_id
+            key.is_latest = self.is_latest
+            self._key = key
+        return self._key
+
+    def startElement(self, name, attrs, connection):
+        if name == 'Owner':
+            self.owner = User(self)
+            return self.owner
+        return None
+
+    def endElement(self, name, value, connection):
+        if name == 'Key':
+            self.name = value
+        elif name == 'Size':
+            self.size = int(value)
+        elif name == 'ETag':
+            self.etag = value
+        elif name == 'LastModified':
+            self.last_modified = value
+        elif name == 'StorageClass':
+            self.storage_class = value
+        elif name == 'VersionId':
+            self.version_id = value
+        elif name == 'IsLatest':
+            self.is_latest = value == 'true'
+
+
+class StreamingListing(object):
+    """
+    Iterates over the entries of a listing response while it is being
+    read, ``ChunkSize`` bytes at a time.  Only entries that have not been
+    consumed yet are held in memory.
+
+    The attributes describing the page as a whole (``is_truncated``,
+    ``next_marker`` and so on) are available once iteration finishes.
+    Stopping early closes the response, so the connection it used is not
+    returned to the pool.
+    """
+    ChunkSize = 64 * 1024
+
+    def __init__(self, response, bucket, element_map):
+        self.response = response
+        self.bucket = bucket
+        self.result = ResultSet(element_map)
+        self._started = False
+
+    @property
+    def is_truncated(self):
+        return self.result.is_truncated
+
+    @property
+    def marker(self):
+        return self.result.marker
+
+    @property
+    def next_marker(self):
+        return self.result.next_marker
+
+    def __iter__(self):
+        if self._started:
+            raise ValueError('A streaming listing can only be iterated once')
+        self._started = True
+        return self._entries()
+
+    def _entries(self):
+        parser = xml.sax.make_parser()
+        parser.setFeature(xml.sax.handler.feature_external_ges, 0)
+        handler = XmlHandler(self.result, self.bucket)
+        parser.setContentHandler(handler)
+        pending = self.result
+        finished = False
+        try:
+            while not finished:
+                chunk = self.response.read(self.ChunkSize)
+                if chunk:
+                    parser.feed(chunk)
+                else:
+                    parser.close()
+                    finished = True
+                # The newest entry is incomplete while the parser is
+                # still inside it.
+                complete = len(pending)
+                if len(handler.nodes) > 1:
+                    complete -= 1
+                if complete > 0:
+                    entries = pending[:complete]
+                    del pending[:complete]
+                    for entry in entries:
+                        yield entry
+        finally:
+            if not finished:
+                self.response.close()
+
+
+class ParallelLister(object):
+    """
+    Lists every key under a prefix using several threads.
+
+    The key space is split on ``shard_delimiter``: a delimited listing of
+    ``prefix`` returns the keys directly under it and the common prefixes
+    below it, and each of those prefixes is then listed in full by one of
+    ``num_threads`` workers.  Parallelism is therefore limited by how
+    many common prefixes there are.
+
+    Because every common prefix covers a contiguous range of keys, the
+    results can be merged back into the same lexical order a plain
+    listing produces (``ordered=True``).  With ``ordered=False`` entries
+    are yielded as soon as any worker finds them, which avoids waiting on
+    slow shards.  At most ``max_buffered`` entries are held per shard.
+    With ``stream=True`` pages are parsed as they are received, as
+    ``Bucket.list`` does.
+    """
+
+    def __init__(self, bucket, prefix='', shard_delimiter='/', headers=None,
+                 encoding_type=None, key_class=None, num_threads=10,
+                 ordered=True, max_buffered=1000, stream=False):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.shard_delimiter = shard_delimiter
+        self.headers = headers
+        self.encoding_type = encoding_type
+        self.key_class = key_class
+        self.num_threads = num_threads
+        self.ordered = ordered
+        self.max_buffered = max_buffered
+        self.stream = stream
+        self._pool = None
+
+    def __iter__(self):
+        # The work queue holds the shards to list.  In ordered mode
+        # ``plan`` holds, in listing order, the keys found by the
+        # delimited listing and a queue for each shard's entries.
+        # Otherwise everything goes straight to ``plan``.
+        self._pool = pool = WorkerPool()
+        plan = Queue(self.max_buffered)
+        pool.start(1, self._discover, plan)
+        pool.start(self.num_threads, self._worker)
+        if self.ordered:
+            return self._ordered_entries(plan)
+        return self._unordered_entries(plan)
+
+    def _ordered_entries(self, plan):
+        pool = self._pool
+        try:
+            while True:
+                item = pool.get(plan)
+                if item is END:
+                    break
+                if not isinstance(item, Queue):
+                    yield item
+                    continue
+                while True:
+                    entry = pool.get(item)
+                    if entry is END:
+                        break
+                    yield entry
+        finally:
+            pool.stop()
+            pool.join()
+
+    def _unordered_entries(self, plan):
+        pool = self._pool
+        shards_listed = 0
+        total_shards = None
+        try:
+            while total_shards is None or shards_listed < total_shards:
+                item = pool.get(plan)
+                if item is END:
+                    shards_listed += 1
+                elif isinstance(item, tuple):
+                    # The delimited listing is done; it knows how many
+                    # shards there are.
+                    total_shards = item[1]
+                else:
+                    yield item
+        finally:
+            pool.stop()
+            pool.join()
+
+    def _unquote(self, name):
+        if self.encoding_type == 'url':
+            if isinstance(name, six.text_type):
+                name = name.encode('utf-8')
+            name = urllib.parse.unquote(name)
+        return name
+
+    def _delimited_pages(self):
+        get_keys = self.bucket.get_all_keys
+        if self.stream and hasattr(self.bucket, 'iter_all_keys'):
+            get_keys = self.bucket.iter_all_keys
+        params = {}
+        if self.key_class is not None:
+            params['key_class'] = self.key_class
+        marker = ''
+        while True:
+            rs = get_keys(prefix=self.prefix, marker=marker,
+                          delimiter=self.shard_delimiter,
+                          headers=self.headers,
+                          encoding_type=self.encoding_type, **params)
+            page = list(rs)
+            yield page
+            if not rs.is_truncated or not page:
+                return
+            marker = self._unquote(rs.next_marker or page[-1].name)
+
+    def _discover(self, plan):
+        pool = self._pool
+        total_shards = 0
+        try:
+            for page in self._delimited_pages():
+                if self.ordered:
+                    # A page lists its keys and then its common prefixes;
+                    # put them back into a single lexical order.
+                    page.sort(key=lambda entry: self._unquote(entry.name))
+                for entry in page:
+                    if isinstance(entry, Prefix):
+                        output = plan
+                        if self.ordered:
+                            output = Queue(self.max_buffered)
+                            if not pool.put(output, plan):
+                                return
+                        pool.put((self._unquote(entry.name), output))
+                        total_shards += 1
+                    elif not pool.put(entry, plan):
+                        return
+            if self.ordered:
+                pool.put(END, plan)
+            else:
+                pool.put(('shards', total_shards), plan)
+        finally:
+            pool.close()
+
+    def _worker(self):
+        pool = self._pool
+        for shard_prefix, output in pool.work():
+            try:
+                for entry in bucket_lister(self.bucket, prefix=shard_prefix,
+                                           headers=self.headers,
+                                           encoding_type=self.encoding_type,
+                                           key_class=self.key_class,
+                                           stream=self.stream):
+                    if not pool.put(entry, output):
+                        break
+            finally:
+                pool.put(END, output)
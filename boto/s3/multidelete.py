@@ -19,8 +19,23 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 # IN THE SOFTWARE.
 
-from boto import handler
+import threading
+import time
 import xml.sax
+import xml.sax.saxutils
+
+import boto
+from boto import handler
+from boto.compat import six
+from boto.exception import StorageResponseError
+from boto.pool import WorkerPool
+from boto.s3.deletemarker import DeleteMarker
+from boto.s3.key import Key
+from boto.s3.listing import KeyRecord
+from boto.s3.prefix import Prefix
+
+#: The most keys a single Multi-Object Delete request may name.
+MAX_KEYS_PER_REQUEST = 1000
 
 class Deleted(object):
     """
@@ -135,4 +150,205 @@ class MultiDeleteResult(object):
 
     def endElement(self, name, value, connection):
         setattr(self, name, value)
- 
+
+
+def delete_target(key):
+    """
+    Works out what to delete for one of the values accepted by
+    ``Bucket.delete_keys``.
+
+    :returns: A ``(key_name, version_id)`` pair, or an :class:`Error`
+        if the value can't be deleted.
+    """
+    if isinstance(key, six.string_types):
+        return key, None
+    elif isinstance(key, tuple) and len(key) == 2:
+        return key
+    elif isinstance(key, (Key, KeyRecord, DeleteMarker)) and key.name:
+        return key.name, key.version_id
+    if isinstance(key, Prefix):
+        key_name = key.name
+        code = 'PrefixSkipped'   # Don't delete Prefix
+    else:
+        key_name = repr(key)   # try get a string
+        code = 'InvalidArgument'  # other unknown type
+    message = 'Invalid. No delete action taken for this object.'
+    return Error(key_name, code=code, message=message)
+
+
+def build_delete_xml(targets, quiet=False):
+    """
+    Builds the body of a Multi-Object Delete request.
+
+    :type targets: list
+    :param targets: ``(key_name, version_id)`` pairs.
+
+    :rtype: bytes
+    """
+    parts = [u'<?xml version="1.0" encoding="UTF-8"?><Delete>']
+    if quiet:
+        parts.append(u'<Quiet>true</Quiet>')
+    for key_name, version_id in targets:
+        parts.append(u'<Object><Key>%s</Key>' %
+                     xml.sax.saxutils.escape(key_name))
+        if version_id:
+            parts.append(u'<VersionId>%s</VersionId>' % version_id)
+        parts.append(u'</Object>')
+    parts.append(u'</Delete>')
+    return u''.join(parts).encode('utf-8')
+
+
+class MultiDeleter(object):
+    """
+    Deletes keys with several Multi-Object Delete requests in flight at
+    once.
+
+    Keys are read from the iterable passed to ``delete`` on the calling
+    thread, so passing ``bucket.list(...)`` overlaps listing with
+    deletion.  Keys that fail with one of ``RetryableErrorCodes`` are
+    retried, as are requests that fail with a server error, up to
+    ``num_retries`` times.
+
+    By default the outcome for every key is collected into the returned
+    :class:`MultiDeleteResult`.  When deleting millions of keys, pass a
+    ``batch_callback`` instead: it is called with a
+    :class:`MultiDeleteResult` for each finished request, and nothing is
+    kept.  ``progress_callback`` is called with ``stats()`` after every
+    request.  Both are called from worker threads, one at a time, and
+    may call ``stats()`` themselves.
+    """
+    RetryableErrorCodes = ('InternalError', 'ServiceUnavailable', 'SlowDown')
+
+    def __init__(self, bucket, num_threads=4, quiet=False, mfa_token=None,
+                 headers=None, num_retries=5, batch_callback=None,
+                 progress_callback=None):
+        self.bucket = bucket
+        self.num_threads = num_threads
+        self.quiet = quiet
+        self.mfa_token = mfa_token
+        self.headers = headers
+        self.num_retries = num_retries
+        self.batch_callback = batch_callback
+        self.progress_callback = progress_callback
+        self._lock = threading.Lock()
+        # Serializes the callbacks without holding up the counters.
+        self._callback_lock = threading.Lock()
+        self._pool = None
+        self._start_time = None
+        self._counters = {'keys_deleted': 0, 'keys_failed': 0,
+                          'requests': 0, 'retries': 0}
+
+    def stats(self):
+        """
+        Returns the progress so far: keys deleted and failed, requests
+        made and retried, elapsed seconds and keys deleted per second.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return self._stats()
+
+    def _stats(self):
+        stats = dict(self._counters)
+        elapsed = 0.0
+        if self._start_time is not None:
+            elapsed = time.time() - self._start_time
+        stats['elapsed'] = elapsed
+        stats['keys_per_second'] = 0.0
+        if elapsed > 0:
+            stats['keys_per_second'] = stats['keys_deleted'] / elapsed
+        return stats
+
+    def delete(self, keys):
+        """
+        Deletes ``keys``, which may be anything ``Bucket.delete_keys``
+        accepts, including a lazy listing.
+
+        :rtype: :class:`MultiDeleteResult`
+        """
+        self._start_time = time.time()
+        result = MultiDeleteResult(self.bucket)
+        self._pool = pool = WorkerPool(self.num_threads * 2)
+        pool.start(self.num_threads, self._worker, result)
+        try:
+            batch = []
+            for key in keys:
+                target = delete_target(key)
+                if isinstance(target, Error):
+                    self._record(result, [], [target])
+                    continue
+                batch.append(target)
+                if len(batch) == MAX_KEYS_PER_REQUEST:
+                    if not pool.put(batch):
+                        break
+                    batch = []
+            if batch:
+                pool.put(batch)
+            pool.close()
+        except BaseException:
+            pool.stop()
+            raise
+        finally:
+            pool.join()
+        pool.check()
+        return result
+
+    def _worker(self, result):
+        for batch in self._pool.work():
+            self._delete_batch(batch, result)
+
+    def _delete_batch(self, batch, result):
+        policy = self.bucket.connection.retry_policy
+        delay = None
+        attempt = 0
+        while True:
+            try:
+                batch_result = self.bucket._delete_batch(
+                    batch, self.quiet, self.mfa_token, self.headers)
+            except StorageResponseError as e:
+                if e.status < 500 or attempt >= self.num_retries or \
+                        self._pool.stopped:
+                    raise
+                boto.log.debug('Retrying multi-object delete: %s' % e)
+            else:
+                retry = []
+                failed = []
+                for error in batch_result.errors:
+                    if error.code in self.RetryableErrorCodes and \
+                            attempt < self.num_retries and \
+                            not self._pool.stopped:
+                        retry.append(error)
+                    else:
+                        failed.append(error)
+                self._record(result, batch_result.deleted, failed,
+                             len(batch) - len(batch_result.errors))
+                if not retry:
+                    return
+                batch = [(e.key, e.version_id) for e in retry]
+            attempt += 1
+            with self._lock:
+                self._counters['retries'] += 1
+            delay = policy.next_delay(delay)
+            time.sleep(delay)
+
+    def _record(self, result, deleted, failed, num_deleted=None):
+        with self._lock:
+            counters = self._counters
+            if num_deleted is not None:
+                # Only results of a request say how many keys it deleted.
+                counters['requests'] += 1
+                counters['keys_deleted'] += num_deleted
+            counters['keys_failed'] += len(failed)
+            if self.batch_callback is None:
+                result.deleted.extend(deleted)
+                result.errors.extend(failed)
+        if self.batch_callback is None and self.progress_callback is None:
+            return
+        with self._callback_lock:
+            if self.batch_callback is not None:
+                batch_result = MultiDeleteResult(self.bucket)
+                batch_result.deleted = deleted
+                batch_result.errors = failed
+                self.batch_callback(batch_result)
+            if self.progress_callback is not None:
+                self.progress_callback(self.stats())
@@ -25,7 +25,6 @@
 from boto.s3 import user
 from boto.s3 import key
 from boto import handler
-import xml.sax
 
 
 class CompleteMultiPartUpload(object):
@@ -222,7 +221,7 @@ class MultiPartUpload(object):
         body = response.read()
         if response.status == 200:
             h = handler.XmlHandler(self, self)
-            xml.sax.parseString(body, h)
+            handler.parse_xml(body, h)
             return self._parts
 
     def upload_part_from_file(self, fp, part_num, headers=None, replace=True,
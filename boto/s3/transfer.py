@@ -0,0 +1,908 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+"""
+High level, concurrent transfers to and from S3.
+
+The classes in this module split a transfer into parts and move the
+parts over several pooled connections at once, which is considerably
+faster than a single stream for large objects.
+"""
+import errno
+import hashlib
+import math
+import mmap
+import os
+import socket
+import threading
+import time
+
+import boto
+import boto.utils
+from boto.compat import encodebytes, http_client, six, urllib
+from boto.exception import BotoClientError, PleaseRetryException, \
+    S3CopyError, S3ResponseError, StorageDataError
+from boto.pool import WorkerPool
+
+
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+
+def _pwrite(fd, data, offset):
+    """
+    Writes all of ``data`` to ``fd`` at ``offset``, without moving
+    any file position shared with other threads.
+    """
+    view = memoryview(data)
+    while view:
+        if hasattr(os, 'pwrite'):
+            written = os.pwrite(fd, view, offset)
+        else:
+            # Every worker has its own descriptor, so seeking is safe.
+            os.lseek(fd, offset, os.SEEK_SET)
+            written = os.write(fd, view)
+        view = view[written:]
+        offset += written
+
+
+def _preallocate(fp, size):
+    try:
+        os.posix_fallocate(fp.fileno(), 0, size)
+    except (AttributeError, OSError):
+        # Not available on this platform or filesystem; fall back to a
+        # (possibly sparse) file of the right length.
+        fp.truncate(size)
+
+
+class ParallelDownloader(object):
+    """
+    Downloads a key by fetching byte ranges over several connections.
+
+    Each range is written in place into a preallocated file, so the
+    download needs no more memory than one buffer per thread.  A range
+    that fails part way through is retried from the last byte written.
+    Every range is requested with ``If-Match`` set to the key's ETag,
+    so an object that is overwritten during the download fails with a
+    412 instead of producing a file stitched together from two
+    versions.
+
+    If a ``tracker_file_name`` is given, the ranges written so far are
+    recorded there and a later download of the same ETag to the same
+    file only fetches what is missing.
+    """
+    # Prefix of the tracker file's first line.  A serial
+    # ResumableDownloadHandler reading the tracker sees an ETag that
+    # never matches, and so won't mistake a preallocated file for a
+    # complete one.
+    TRACKER_PREFIX = 'ranges:'
+
+    def __init__(self, key, num_threads=10, part_size=DEFAULT_PART_SIZE,
+                 num_retries=5, verify_etag=False, tracker_file_name=None):
+        """
+        :type key: :class:`boto.s3.key.Key`
+        :param key: The key to download.
+
+        :type num_threads: int
+        :param num_threads: The number of ranges fetched concurrently.
+
+        :type part_size: int
+        :param part_size: The size, in bytes, of each range.
+
+        :type num_retries: int
+        :param num_retries: The number of times a range that failed
+            part way through is retried.
+
+        :type verify_etag: bool
+        :param verify_etag: If True and the key's ETag is a plain MD5
+            (that is, the object was not uploaded in parts), the MD5
+            of the downloaded file is checked against it.
+
+        :type tracker_file_name: string
+        :param tracker_file_name: An optional file in which to record
+            progress, so that an interrupted download can be resumed.
+        """
+        self.key = key
+        self.num_threads = num_threads
+        self.part_size = part_size
+        self.num_retries = num_retries
+        self.verify_etag = verify_etag
+        self.tracker_file_name = tracker_file_name
+        # The number of bytes that were already present from an earlier
+        # attempt when the download started.
+        self.resumed_bytes = 0
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def download(self, filename, headers=None, cb=None, num_cb=10,
+                 version_id=None, response_headers=None):
+        """
+        Downloads the key to ``filename``.
+
+        :type filename: string
+        :param filename: The file to write to.
+
+        :type headers: dict
+        :param headers: Additional headers to send with every request.
+
+        :type cb: function
+        :param cb: A callback that is called with the number of bytes
+            written so far and the size of the key.
+
+        :type num_cb: int
+        :param num_cb: The maximum number of times ``cb`` is called.
+
+        :type version_id: str
+        :param version_id: The ID of a particular version of the key.
+
+        :type response_headers: dict
+        :param response_headers: Headers to override in the response.
+        """
+        key = self.key
+        headers = dict(headers or {})
+        if version_id is None:
+            version_id = key.version_id
+        if key.size is None or key.etag is None:
+            self._load_key_metadata(headers, version_id)
+        etag = key.etag.strip('"\'')
+        headers.setdefault('If-Match', key.etag)
+
+        query_args = []
+        if version_id:
+            query_args.append('versionId=%s' % version_id)
+        for name in response_headers or {}:
+            query_args.append('%s=%s' % (
+                name, urllib.parse.quote(response_headers[name])))
+        query_args = '&'.join(query_args)
+
+        self.resumed_bytes = 0
+        progress = self._load_tracker(filename, etag)
+        ranges = []
+        for start in range(0, key.size, self.part_size):
+            end = min(start + self.part_size, key.size) - 1
+            done = min(progress.get(start, start - 1), end)
+            self.resumed_bytes += done - start + 1
+            if done < end:
+                ranges.append((start, done + 1, end))
+        if not progress:
+            with open(filename, 'wb') as fp:
+                _preallocate(fp, key.size)
+            self._start_tracker(etag)
+
+        self._bytes_done = self.resumed_bytes
+        self._cb = cb
+        self._cb_interval = 0
+        if cb and num_cb > 1:
+            self._cb_interval = key.size // (num_cb - 1)
+        self._last_cb = self._bytes_done
+        if cb:
+            cb(self._bytes_done, key.size)
+
+        self._pool = pool = WorkerPool()
+        for item in ranges:
+            pool.put(item)
+        try:
+            pool.start(max(1, min(self.num_threads, len(ranges))),
+                       self._worker, filename, headers, query_args)
+            pool.close()
+            pool.join()
+        finally:
+            pool.stop()
+            if self._tracker is not None:
+                self._tracker.close()
+        pool.check()
+
+        if cb and self._last_cb < key.size:
+            cb(key.size, key.size)
+        if self.verify_etag and '-' not in etag:
+            self._verify_md5(filename, etag)
+        self._remove_tracker()
+
+    def _load_key_metadata(self, headers, version_id):
+        fresh = self.key.bucket.get_key(self.key.name, headers=headers,
+                                        version_id=version_id)
+        if fresh is None:
+            raise self.key.bucket.connection.provider.storage_response_error(
+                404, 'Not Found')
+        for attr in ('size', 'etag', 'last_modified', 'version_id'):
+            setattr(self.key, attr, getattr(fresh, attr))
+
+    def _worker(self, filename, headers, query_args):
+        fd = os.open(filename, os.O_WRONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            for work in self._pool.work():
+                try:
+                    self._download_range(fd, work, headers, query_args)
+                except Exception as e:
+                    boto.log.debug('Failed to download range %s of %s: %s' %
+                                   (work, self.key.name, e))
+                    raise
+        finally:
+            os.close(fd)
+
+    def _download_range(self, fd, work, headers, query_args):
+        # [start, next byte to fetch, end], updated by _fetch as data is
+        # written so that a retry picks up where the last attempt stopped.
+        state = list(work)
+        policy = self.key.bucket.connection.retry_policy
+        delay = None
+        attempt = 0
+        while True:
+            try:
+                self._fetch(fd, state, headers, query_args)
+                return
+            except (http_client.HTTPException, socket.error, IOError,
+                    PleaseRetryException) as e:
+                if isinstance(e, IOError) and e.errno == errno.ENOSPC:
+                    raise StorageDataError('Out of space for destination '
+                                           'file %s' % self.key.name)
+                if attempt >= self.num_retries or self._pool.stopped:
+                    raise
+                attempt += 1
+                delay = policy.next_delay(delay)
+                boto.log.debug('Retrying range %d-%d of %s in %.2fs: %s' %
+                               (state[1], state[2], self.key.name, delay, e))
+                time.sleep(delay)
+
+    def _fetch(self, fd, state, headers, query_args):
+        """
+        Fetches the rest of the range described by ``state`` into
+        ``fd``.
+        """
+        start, offset, end = state
+        connection = self.key.bucket.connection
+        range_headers = dict(headers)
+        range_headers['Range'] = 'bytes=%d-%d' % (offset, end)
+        response = connection.make_request(
+            'GET', self.key.bucket.name, self.key.name, range_headers,
+            query_args=query_args)
+        if response.status not in (200, 206):
+            body = response.read()
+            raise connection.provider.storage_response_error(
+                response.status, response.reason, body)
+        if response.status == 200 and offset != 0:
+            response.read()
+            raise StorageDataError('Range request for %s returned the '
+                                   'whole object' % self.key.name)
+        first = offset
+        view = None
+        if hasattr(type(response), 'readinto'):
+            # Read into one buffer rather than a new string per read.
+            view = memoryview(bytearray(min(self.key.MinReadIntoBufferSize,
+                                            end - offset + 1)))
+        try:
+            while offset <= end:
+                if self._pool.stopped:
+                    break
+                if view is not None:
+                    data = view[:response.readinto(
+                        view[:min(len(view), end - offset + 1)])]
+                else:
+                    data = response.read(min(self.key.BufferSize,
+                                             end - offset + 1))
+                if not data:
+                    break
+                _pwrite(fd, data, offset)
+                offset += len(data)
+                state[1] = offset
+                self._record_progress(len(data))
+        finally:
+            if offset <= end:
+                response.close()
+            if offset > first:
+                self._save_progress(start, offset - 1)
+        if offset <= end and not self._pool.stopped:
+            raise PleaseRetryException(
+                'Got %d of %d bytes of range %d-%d' % (
+                    offset - start, end - start + 1, start, end))
+
+    def _save_progress(self, start, last):
+        # Progress is saved once per response rather than per buffer,
+        # which still lets a range cut short resume where it stopped.
+        with self._lock:
+            if self._tracker is not None and not self._tracker.closed:
+                self._tracker.write('%d %d\n' % (start, last))
+                self._tracker.flush()
+
+    def _record_progress(self, size):
+        with self._lock:
+            self._bytes_done += size
+            if self._cb and \
+                    self._bytes_done - self._last_cb >= self._cb_interval:
+                self._last_cb = self._bytes_done
+                self._cb(self._bytes_done, self.key.size)
+
+    def _load_tracker(self, filename, etag):
+        """
+        Returns a dict mapping the start of each range to the last
+        byte written to it by an earlier attempt.
+        """
+        progress = {}
+        self._tracker = None
+        if not self.tracker_file_name:
+            return progress
+        try:
+            with open(self.tracker_file_name, 'r') as f:
+                lines = f.read().splitlines()
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                boto.log.warning("Couldn't read tracker file %s: %s; "
+                                 "restarting download from scratch." %
+                                 (self.tracker_file_name, e))
+            return progress
+        if not lines or lines[0] != self.TRACKER_PREFIX + etag:
+            return progress
+        try:
+            if os.path.getsize(filename) != self.key.size:
+                return progress
+        except OSError:
+            return progress
+        for line in lines[1:]:
+            try:
+                start, last = [int(n) for n in line.split()]
+            except ValueError:
+                # A line cut short by a crash; anything after it is lost.
+                break
+            progress[start] = max(last, progress.get(start, last))
+        if progress:
+            self._tracker = open(self.tracker_file_name, 'a')
+        return progress
+
+    def _start_tracker(self, etag):
+        if self.tracker_file_name:
+            self._tracker = open(self.tracker_file_name, 'w')
+            self._tracker.write('%s%s\n' % (self.TRACKER_PREFIX, etag))
+            self._tracker.flush()
+
+    def _remove_tracker(self):
+        if self._tracker is not None:
+            self._tracker = None
+            os.unlink(self.tracker_file_name)
+
+    def _verify_md5(self, filename, etag):
+        digest = hashlib.md5()
+        with open(filename, 'rb') as fp:
+            for data in iter(lambda: fp.read(self.part_size), b''):
+                digest.update(data)
+        if digest.hexdigest() != etag:
+            raise StorageDataError(
+                'MD5 of %s (%s) does not match the ETag of %s (%s)' % (
+                    filename, digest.hexdigest(), self.key.name, etag))
+
+
+class _ViewFile(object):
+    """
+    A read-only file object over a buffer.  Reads are served from a
+    memoryview of the buffer, so a part sliced out of an mmap is never
+    copied as a whole.
+    """
+    def __init__(self, data):
+        self._view = memoryview(data)
+        self._pos = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            end = len(self._view)
+        else:
+            end = min(self._pos + size, len(self._view))
+        data = self._view[self._pos:end].tobytes()
+        self._pos = end
+        return data
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self._pos
+        elif whence == os.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, min(offset, len(self._view)))
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        self._view = memoryview(b'')
+
+
+class _MultipartTransfer(object):
+    """
+    What uploading and copying in parts have in common: choosing a part
+    size, finding an upload to resume and completing it.
+    """
+    MIN_PART_SIZE = 5 * 1024 * 1024
+    MAX_PARTS = 10000
+
+    def _choose_part_size(self, size):
+        part_size = max(self.part_size, self.MIN_PART_SIZE)
+        if size:
+            part_size = max(part_size,
+                            int(math.ceil(size / float(self.MAX_PARTS))))
+        return part_size
+
+    def _find_upload(self, key_name, upload_id=None):
+        uploads = [upload for upload in
+                   self.bucket.get_all_multipart_uploads(prefix=key_name)
+                   if upload.key_name == key_name and
+                   upload_id in (None, upload.id)]
+        if not uploads:
+            if upload_id is not None:
+                raise BotoClientError('No multipart upload %s for %s' % (
+                    upload_id, key_name))
+            return None
+        return max(uploads, key=lambda upload: upload.initiated)
+
+    def _complete(self, key_name, mp):
+        xml = ['<CompleteMultipartUpload>']
+        for part_num in sorted(self._etags):
+            xml.append('<Part><PartNumber>%d</PartNumber><ETag>%s</ETag>'
+                       '</Part>' % (part_num, self._etags[part_num]))
+        xml.append('</CompleteMultipartUpload>')
+        return self.bucket.complete_multipart_upload(key_name, mp.id,
+                                                     ''.join(xml))
+
+
+class MultipartUploader(_MultipartTransfer):
+    """
+    Uploads a file, stream or buffer to S3 as a multipart upload.
+
+    Parts are uploaded concurrently and each part is retried on its
+    own.  At most ``max_queued_parts`` parts are held in memory at a
+    time, on top of the one each thread is uploading; files are mapped
+    into memory with mmap and sliced, so their parts are not copied.
+
+    If ``resume`` is True, an unfinished upload of the same key is
+    picked up: its parts are listed with ``get_all_parts`` and any part
+    whose size and MD5 match is not uploaded again.  An upload that
+    fails is then left in place to be resumed, rather than cancelled.
+    """
+    def __init__(self, bucket, num_threads=10, part_size=DEFAULT_PART_SIZE,
+                 num_retries=5, max_queued_parts=None):
+        """
+        :type bucket: :class:`boto.s3.bucket.Bucket`
+        :param bucket: The bucket to upload to.
+
+        :type num_threads: int
+        :param num_threads: The number of parts uploaded concurrently.
+
+        :type part_size: int
+        :param part_size: The preferred size, in bytes, of each part.
+            Larger parts are used if the source would otherwise need
+            more than 10,000 parts, and parts are never smaller than
+            the 5MB minimum that S3 allows.
+
+        :type num_retries: int
+        :param num_retries: The number of times each part is retried.
+
+        :type max_queued_parts: int
+        :param max_queued_parts: The number of parts read ahead of the
+            upload threads.  Defaults to ``num_threads``.
+        """
+        self.bucket = bucket
+        self.num_threads = num_threads
+        self.part_size = part_size
+        self.num_retries = num_retries
+        self.max_queued_parts = max_queued_parts or num_threads
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def upload(self, key_name, source, headers=None, size=None, cb=None,
+               num_cb=10, resume=False, upload_id=None, **kwargs):
+        """
+        Uploads ``source`` to ``key_name``.
+
+        :type key_name: string
+        :param key_name: The name of the key to create.
+
+        :type source: string, file, bytes or memoryview
+        :param source: A filename, a file-like object to read until EOF,
+            or a buffer.
+
+        :type headers: dict
+        :param headers: Headers to send when initiating the upload.
+
+        :type size: int
+        :param size: The size of the source, if it is a stream whose
+            size is known.  Used to pick the part size.
+
+        :type cb: function
+        :param cb: A callback that is called with the number of bytes
+            uploaded so far and the total size, or 0 if the size of a
+            stream is unknown.
+
+        :type num_cb: int
+        :param num_cb: The maximum number of times ``cb`` is called.
+
+        :type resume: bool
+        :param resume: If True, resume an unfinished upload of the key.
+
+        :type upload_id: string
+        :param upload_id: The ID of a particular upload to resume.
+
+        Any other keyword arguments are passed to
+        :meth:`boto.s3.bucket.Bucket.initiate_multipart_upload`.
+
+        :rtype: :class:`boto.s3.multipart.CompleteMultiPartUpload`
+        :return: The completed upload.
+        """
+        mm = fileobj = None
+        if isinstance(source, six.string_types):
+            fileobj = source = open(source, 'rb')
+            size = os.fstat(source.fileno()).st_size
+            if size:
+                try:
+                    mm = mmap.mmap(source.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+                    source = memoryview(mm)
+                except (TypeError, mmap.error):
+                    # Python 2 mmaps don't export memoryviews; read the
+                    # parts from the file instead.
+                    if mm is not None:
+                        mm.close()
+                        mm = None
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = memoryview(source)
+            size = len(source)
+        try:
+            return self._upload(key_name, source, headers, size, cb, num_cb,
+                                resume, upload_id, kwargs)
+        finally:
+            source = None
+            if mm is not None:
+                try:
+                    mm.close()
+                except BufferError:
+                    # A part is still referenced somewhere; the mapping
+                    # is released once it is garbage collected.
+                    pass
+            if fileobj is not None:
+                fileobj.close()
+
+    def _upload(self, key_name, source, headers, size, cb, num_cb, resume,
+                upload_id, kwargs):
+        part_size = self._choose_part_size(size)
+        mp = None
+        if resume or upload_id:
+            mp = self._find_upload(key_name, upload_id)
+        existing = {}
+        if mp is None:
+            mp = self.bucket.initiate_multipart_upload(key_name, headers,
+                                                       **kwargs)
+        else:
+            for part in mp:
+                existing[part.part_number] = part
+
+        self._etags = {}
+        self._bytes_done = 0
+        self._cb = cb
+        self._cb_size = size or 0
+        self._cb_interval = 0
+        if cb and num_cb > 1 and size:
+            self._cb_interval = size // (num_cb - 1)
+        self._last_cb = 0
+        if cb:
+            cb(0, self._cb_size)
+
+        self._pool = pool = WorkerPool(self.max_queued_parts)
+        pool.start(self.num_threads, self._worker, mp, existing)
+        try:
+            try:
+                for part_num, data in self._iter_parts(source, part_size):
+                    if not pool.put((part_num, data)):
+                        break
+                    data = None
+                pool.close()
+            except BaseException:
+                pool.stop()
+                raise
+            finally:
+                pool.join()
+            pool.check()
+        except BaseException:
+            if not (resume or upload_id):
+                boto.log.debug('Cancelling multipart upload %s of %s' %
+                               (mp.id, key_name))
+                mp.cancel_upload()
+            raise
+
+        if cb and self._last_cb < self._bytes_done:
+            cb(self._bytes_done, self._cb_size)
+        return self._complete(key_name, mp)
+
+    def _iter_parts(self, source, part_size):
+        """
+        Yields the number and contents of each part of ``source``.
+        """
+        if isinstance(source, memoryview):
+            # Always yield at least one part: S3 needs one, even if empty.
+            for part_num, start in enumerate(
+                    range(0, max(len(source), 1), part_size)):
+                yield part_num + 1, source[start:start + part_size]
+            return
+        part_num = 1
+        data = source.read(part_size)
+        yield part_num, data
+        while len(data) == part_size:
+            data = source.read(part_size)
+            if not data:
+                break
+            part_num += 1
+            yield part_num, data
+
+    def _worker(self, mp, existing):
+        for part_num, data in self._pool.work():
+            try:
+                self._upload_part(mp, part_num, data, existing.get(part_num))
+            except Exception as e:
+                boto.log.debug('Failed to upload part %d of %s: %s' %
+                               (part_num, mp.key_name, e))
+                raise
+            finally:
+                data = None
+
+    def _upload_part(self, mp, part_num, data, existing_part):
+        digest = hashlib.md5(data)
+        md5 = (digest.hexdigest(),
+               encodebytes(digest.digest()).decode('utf-8').rstrip('\n'))
+        etag = '"%s"' % md5[0]
+        if existing_part is not None and existing_part.size == len(data) \
+                and existing_part.etag == etag:
+            boto.log.debug('Part %d of %s already uploaded' %
+                           (part_num, mp.key_name))
+        else:
+            policy = self.bucket.connection.retry_policy
+            delay = None
+            attempt = 0
+            fp = _ViewFile(data)
+            while True:
+                try:
+                    fp.seek(0)
+                    key = mp.upload_part_from_file(fp, part_num, md5=md5,
+                                                   size=len(data))
+                    etag = key.etag
+                    break
+                except S3ResponseError as e:
+                    if e.status < 500:
+                        raise
+                    err = e
+                except Exception as e:
+                    err = e
+                if attempt >= self.num_retries or self._pool.stopped:
+                    raise err
+                attempt += 1
+                delay = policy.next_delay(delay)
+                boto.log.debug('Retrying part %d of %s in %.2fs: %s' %
+                               (part_num, mp.key_name, delay, err))
+                time.sleep(delay)
+        with self._lock:
+            self._etags[part_num] = etag
+            self._bytes_done += len(data)
+            if self._cb and \
+                    self._bytes_done - self._last_cb >= self._cb_interval:
+                self._last_cb = self._bytes_done
+                self._cb(self._bytes_done, self._cb_size)
+
+
+class MultipartCopier(_MultipartTransfer):
+    """
+    Copies a key within S3 as a multipart upload whose parts are ranges
+    of the source, copied concurrently with ``copy_part_from_key``.
+    Nothing passes through the client, and unlike a single PUT-copy the
+    source may be larger than 5GB.
+
+    The copy behaves like :meth:`boto.s3.bucket.Bucket.copy_key`: the
+    source's metadata and content headers are carried over unless new
+    ``metadata`` is given, and the source's ACL is copied if
+    ``preserve_acl`` is True.  Every part is copied with
+    ``x-amz-copy-source-if-match`` set to the source's ETag, so a
+    source that is overwritten during the copy fails it instead of
+    producing an object made of two versions.
+
+    If ``resume`` is True, an unfinished copy to the same key is picked
+    up and any of its parts that has the right size and was copied
+    after the source was last modified is kept.
+    """
+    DEFAULT_PART_SIZE = 64 * 1024 * 1024
+    # Errors S3 reports in the body of a 200 response to a copy.
+    RetryableCopyErrors = ('InternalError', 'ServiceUnavailable',
+                           'SlowDown')
+    # The content headers that a copy with the COPY directive keeps.
+    ContentHeaders = ('cache-control', 'content-disposition',
+                      'content-encoding', 'content-language',
+                      'content-type', 'expires', 'x-robots-tag')
+
+    def __init__(self, bucket, num_threads=10, part_size=None,
+                 num_retries=5):
+        """
+        :type bucket: :class:`boto.s3.bucket.Bucket`
+        :param bucket: The bucket to copy into.
+
+        :type num_threads: int
+        :param num_threads: The number of parts copied concurrently.
+
+        :type part_size: int
+        :param part_size: The preferred size, in bytes, of each part.
+            Defaults to 64MB.  Larger parts are used if the source
+            would otherwise need more than 10,000 parts.
+
+        :type num_retries: int
+        :param num_retries: The number of times each part is retried.
+        """
+        self.bucket = bucket
+        self.num_threads = num_threads
+        self.part_size = part_size or self.DEFAULT_PART_SIZE
+        self.num_retries = num_retries
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def copy(self, new_key_name, src_bucket_name, src_key_name,
+             metadata=None, src_version_id=None, storage_class='STANDARD',
+             preserve_acl=False, encrypt_key=False, headers=None,
+             resume=False, upload_id=None):
+        """
+        Copies ``src_key_name`` in ``src_bucket_name`` to
+        ``new_key_name``.  The arguments are those of
+        :meth:`boto.s3.bucket.Bucket.copy_key`, plus:
+
+        :type resume: bool
+        :param resume: If True, resume an unfinished copy to the key.
+
+        :type upload_id: string
+        :param upload_id: The ID of a particular upload to resume.
+
+        :rtype: :class:`boto.s3.key.Key` or subclass
+        :returns: An instance of the newly created key object
+        """
+        connection = self.bucket.connection
+        provider = connection.provider
+        if src_bucket_name == self.bucket.name:
+            src_bucket = self.bucket
+        else:
+            src_bucket = connection.get_bucket(src_bucket_name,
+                                               validate=False)
+        src_key = src_bucket.get_key(src_key_name, version_id=src_version_id)
+        if src_key is None:
+            raise provider.storage_response_error(404, 'Not Found')
+        part_size = self._choose_part_size(src_key.size)
+        if src_key.size <= part_size and not (resume or upload_id):
+            # A single part; a plain copy does the same in one request.
+            return self.bucket.copy_key(
+                new_key_name, src_bucket_name, src_key_name,
+                metadata=metadata, src_version_id=src_version_id,
+                storage_class=storage_class, preserve_acl=preserve_acl,
+                encrypt_key=encrypt_key, headers=headers)
+        if preserve_acl:
+            acl = src_bucket.get_xml_acl(src_key_name,
+                                         version_id=src_version_id)
+
+        init_headers = {}
+        if metadata is None:
+            metadata = src_key.metadata
+            for name in self.ContentHeaders:
+                value = getattr(src_key, name.replace('-', '_'), None)
+                if value:
+                    init_headers[name] = value
+        init_headers.update(headers or {})
+        if provider.storage_class_header and storage_class:
+            init_headers[provider.storage_class_header] = storage_class
+        part_headers = {
+            provider.header_prefix + 'copy-source-if-match': src_key.etag}
+
+        mp = None
+        existing = {}
+        if resume or upload_id:
+            mp = self._find_upload(new_key_name, upload_id)
+        if mp is None:
+            mp = self.bucket.initiate_multipart_upload(
+                new_key_name, init_headers, metadata=metadata,
+                encrypt_key=encrypt_key)
+        else:
+            copied_after = boto.utils.parse_ts(src_key.last_modified)
+            for part in mp:
+                if boto.utils.parse_ts(part.last_modified) >= copied_after:
+                    existing[part.part_number] = part
+
+        self._etags = {}
+        self._pool = pool = WorkerPool()
+        if src_key.size:
+            for part_num, start in enumerate(
+                    range(0, src_key.size, part_size)):
+                end = min(start + part_size, src_key.size) - 1
+                pool.put((part_num + 1, start, end))
+        else:
+            # S3 needs at least one part, and a range can't be empty.
+            pool.put((1, None, None))
+        try:
+            try:
+                pool.start(max(1, min(self.num_threads, pool.queue.qsize())),
+                           self._worker, mp, src_bucket_name, src_key_name,
+                           src_version_id, part_headers, existing)
+                pool.close()
+            except BaseException:
+                pool.stop()
+                raise
+            finally:
+                pool.join()
+            pool.check()
+        except BaseException:
+            if not (resume or upload_id):
+                boto.log.debug('Cancelling multipart copy %s to %s' %
+                               (mp.id, new_key_name))
+                mp.cancel_upload()
+            raise
+
+        completed = self._complete(new_key_name, mp)
+        if preserve_acl:
+            self.bucket.set_xml_acl(acl, new_key_name)
+        key = self.bucket.new_key(new_key_name)
+        key.etag = completed.etag
+        key.version_id = completed.version_id
+        key.size = src_key.size
+        return key
+
+    def _worker(self, mp, src_bucket_name, src_key_name, src_version_id,
+                part_headers, existing):
+        for work in self._pool.work():
+            try:
+                self._copy_part(mp, work, src_bucket_name, src_key_name,
+                                src_version_id, part_headers,
+                                existing.get(work[0]))
+            except Exception as e:
+                boto.log.debug('Failed to copy part %d to %s: %s' %
+                               (work[0], mp.key_name, e))
+                raise
+
+    def _copy_part(self, mp, work, src_bucket_name, src_key_name,
+                   src_version_id, part_headers, existing_part):
+        part_num, start, end = work
+        size = 0 if start is None else end - start + 1
+        if existing_part is not None and existing_part.size == size:
+            boto.log.debug('Part %d of %s already copied' %
+                           (part_num, mp.key_name))
+            etag = existing_part.etag
+        else:
+            policy = self.bucket.connection.retry_policy
+            delay = None
+            attempt = 0
+            while True:
+                try:
+                    key = mp.copy_part_from_key(
+                        src_bucket_name, src_key_name, part_num, start, end,
+                        src_version_id=src_version_id, headers=part_headers)
+                    etag = key.etag
+                    break
+                except S3ResponseError as e:
+                    if e.status < 500:
+                        raise
+                    err = e
+                except S3CopyError as e:
+                    # S3 can fail a copy after it has sent a 200.
+                    if e.status not in self.RetryableCopyErrors:
+                        raise
+                    err = e
+                except (http_client.HTTPException, socket.error) as e:
+                    err = e
+                if attempt >= self.num_retries or self._pool.stopped:
+                    raise err
+                attempt += 1
+                delay = policy.next_delay(delay)
+                boto.log.debug('Retrying part %d of %s in %.2fs: %s' %
+                               (part_num, mp.key_name, delay, err))
+                time.sleep(delay)
+        with self._lock:
+            self._etags[part_num] = etag
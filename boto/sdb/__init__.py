@@ -21,7 +21,7 @@
 #
 
 from boto.sdb.regioninfo import SDBRegionInfo
-from boto.regioninfo import get_regions
+from boto.regioninfo import get_regions, connect
 
 
 def regions():
@@ -49,7 +49,4 @@ def connect_to_region(region_name, **kw_params):
     :return: A connection to the given region, or None if an invalid region
              name is given
     """
-    for region in regions():
-        if region.name == region_name:
-            return region.connect(**kw_params)
-    return None
+    return connect('sdb', region_name, region_cls=SDBRegionInfo, **kw_params)
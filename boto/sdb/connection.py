@@ -18,7 +18,6 @@
 # WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 # IN THE SOFTWARE.
-import xml.sax
 import threading
 import boto
 from boto import handler
@@ -497,7 +496,7 @@ class SDBConnection(AWSQueryConnection):
             if item is None:
                 item = self.item_cls(domain, item_name)
             h = handler.XmlHandler(item, self)
-            xml.sax.parseString(body, h)
+            handler.parse_xml(body, h)
             return item
         else:
             raise SDBResponseError(response.status, response.reason, body)
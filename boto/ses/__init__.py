@@ -21,7 +21,7 @@
 # IN THE SOFTWARE.
 
 from boto.ses.connection import SESConnection
-from boto.regioninfo import RegionInfo, get_regions
+from boto.regioninfo import RegionInfo, get_regions, connect
 
 
 def regions():
@@ -46,7 +46,6 @@ def connect_to_region(region_name, **kw_params):
     :return: A connection to the given region, or None if an invalid region
              name is given
     """
-    for region in regions():
-        if region.name == region_name:
-            return region.connect(**kw_params)
-    return None
+    return connect('ses', region_name,
+                   connection_cls=SESConnection,
+                   **kw_params)
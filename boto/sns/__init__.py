@@ -23,7 +23,7 @@
 # this is here for backward compatibility
 # originally, the SNSConnection class was defined here
 from boto.sns.connection import SNSConnection
-from boto.regioninfo import RegionInfo, get_regions
+from boto.regioninfo import RegionInfo, get_regions, connect
 
 
 def regions():
@@ -48,7 +48,6 @@ def connect_to_region(region_name, **kw_params):
     :return: A connection to the given region, or None if an invalid region
              name is given
     """
-    for region in regions():
-        if region.name == region_name:
-            return region.connect(**kw_params)
-    return None
+    return connect('sns', region_name,
+                   connection_cls=SNSConnection,
+                   **kw_params)
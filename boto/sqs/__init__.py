@@ -21,7 +21,7 @@
 #
 
 from boto.sqs.regioninfo import SQSRegionInfo
-from boto.regioninfo import get_regions
+from boto.regioninfo import get_regions, connect
 
 
 def regions():
@@ -40,7 +40,8 @@ def regions():
 
 
 def connect_to_region(region_name, **kw_params):
-    for region in regions():
-        if region.name == region_name:
-            return region.connect(**kw_params)
-    return None
+    from boto.sqs.connection import SQSConnection
+    return connect('sqs', region_name,
+                   region_cls=SQSRegionInfo,
+                   connection_cls=SQSConnection,
+                   **kw_params)
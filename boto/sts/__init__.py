@@ -21,7 +21,7 @@
 # IN THE SOFTWARE.
 
 from boto.sts.connection import STSConnection
-from boto.regioninfo import RegionInfo, get_regions
+from boto.regioninfo import RegionInfo, get_regions, connect
 
 
 def regions():
@@ -46,7 +46,6 @@ def connect_to_region(region_name, **kw_params):
     :return: A connection to the given region, or None if an invalid region
              name is given
     """
-    for region in regions():
-        if region.name == region_name:
-            return region.connect(**kw_params)
-    return None
+    return connect('sts', region_name,
+                   connection_cls=STSConnection,
+                   **kw_params)
@@ -20,7 +20,7 @@
 # IN THE SOFTWARE.
 #
 
-from boto.regioninfo import RegionInfo, get_regions
+from boto.regioninfo import RegionInfo, get_regions, connect
 
 
 def regions():
@@ -35,7 +35,7 @@ def regions():
 
 
 def connect_to_region(region_name, **kw_params):
-    for region in regions():
-        if region.name == region_name:
-            return region.connect(**kw_params)
-    return None
+    from boto.support.layer1 import SupportConnection
+    return connect('support', region_name,
+                   connection_cls=SupportConnection,
+                   **kw_params)
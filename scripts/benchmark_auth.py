@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+Measure how long the request signers take to sign a typical request.
+
+    python scripts/benchmark_auth.py [-n ITERATIONS]
+
+Each handler signs a fresh copy of the same request, so the numbers
+include header and query-string canonicalization as well as the HMACs.
+"""
+import copy
+import optparse
+import timeit
+
+from boto.auth import HmacAuthV4Handler
+from boto.auth import QuerySignatureV2AuthHandler
+from boto.auth import S3HmacAuthV4Handler
+from boto.connection import HTTPRequest
+from boto.provider import Provider
+
+
+def make_request(method, host, path, params, headers):
+    return HTTPRequest(method, 'https', host, 443, path, None, params,
+                       headers, '')
+
+
+def v2_case(provider):
+    params = {'Action': 'DescribeInstances', 'Version': '2014-10-01',
+              'InstanceId.1': 'i-12345678', 'Filter.1.Name': 'tag:Name',
+              'Filter.1.Value.1': 'web server'}
+    handler = QuerySignatureV2AuthHandler('ec2.us-east-1.amazonaws.com',
+                                          None, provider)
+    request = make_request('POST', 'ec2.us-east-1.amazonaws.com', '/',
+                           params, {})
+    return handler, request
+
+
+def v4_case(provider):
+    headers = {'X-Amz-Target': 'DynamoDB_20120810.GetItem',
+               'Content-Type': 'application/x-amz-json-1.0'}
+    handler = HmacAuthV4Handler('dynamodb.us-east-1.amazonaws.com', None,
+                                provider)
+    request = make_request('POST', 'dynamodb.us-east-1.amazonaws.com', '/',
+                           {}, headers)
+    request.body = '{"TableName": "users", "Key": {"id": {"S": "1234"}}}'
+    return handler, request
+
+
+def s3v4_case(provider):
+    handler = S3HmacAuthV4Handler('s3.us-west-2.amazonaws.com', None,
+                                  provider)
+    request = make_request('GET', 's3.us-west-2.amazonaws.com',
+                           '/mybucket/', {'prefix': 'logs/2015/',
+                                          'delimiter': '/',
+                                          'max-keys': '1000'}, {})
+    return handler, request
+
+
+CASES = [('sigv2', v2_case), ('sigv4', v4_case), ('s3-sigv4', s3v4_case)]
+
+
+def bench(handler, request, iterations):
+    def sign():
+        handler.add_auth(copy.copy(request))
+    sign()
+    return min(timeit.repeat(sign, number=iterations, repeat=3))
+
+
+def main():
+    parser = optparse.OptionParser(usage='%prog [-n ITERATIONS]')
+    parser.add_option('-n', '--iterations', type='int', default=5000)
+    options, args = parser.parse_args()
+
+    provider = Provider('aws', access_key='AKIDEXAMPLE',
+                        secret_key='wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY')
+    for name, case in CASES:
+        handler, request = case(provider)
+        elapsed = bench(handler, request, options.iterations)
+        print('%-10s %8.1f us/request' % (
+            name, elapsed / options.iterations * 1e6))
+
+
+if __name__ == '__main__':
+    main()
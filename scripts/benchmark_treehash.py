@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+"""
+Measure how long boto takes to compute Glacier hashes.
+
+    python scripts/benchmark_treehash.py [-s SIZE_MB] [-t THREADS]
+
+Hashes a temporary file of SIZE_MB megabytes with one thread and with
+THREADS threads, and combines the chunk hashes of a 40 GB archive into
+a tree hash.
+"""
+import hashlib
+import optparse
+import os
+import tempfile
+import time
+
+from boto.glacier.utils import compute_hashes_from_fileobj, tree_hash
+
+
+def time_file_hash(filename, num_threads):
+    with open(filename, 'rb') as f:
+        start = time.time()
+        compute_hashes_from_fileobj(f, num_threads=num_threads)
+        return time.time() - start
+
+
+def main():
+    parser = optparse.OptionParser(usage='%prog [-s SIZE_MB] [-t THREADS]')
+    parser.add_option('-s', '--size', type='int', default=256)
+    parser.add_option('-t', '--threads', type='int', default=4)
+    options, args = parser.parse_args()
+
+    fd, filename = tempfile.mkstemp()
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            block = os.urandom(1024 * 1024)
+            for i in range(options.size):
+                f.write(block)
+        for num_threads in (1, options.threads):
+            elapsed = min(time_file_hash(filename, num_threads)
+                          for i in range(3))
+            print('hash %d MB, %2d thread(s)  %8.1f MB/s' % (
+                options.size, num_threads, options.size / elapsed))
+    finally:
+        os.unlink(filename)
+
+    hashes = [hashlib.sha256(b'%d' % i).digest() for i in range(40 * 1024)]
+    start = time.time()
+    tree_hash(hashes)
+    print('tree of %d chunk hashes    %8.1f ms' % (
+        len(hashes), (time.time() - start) * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+Measure how long boto takes to parse typical XML responses.
+
+    python scripts/benchmark_xml.py [-n ITERATIONS]
+
+The cases are a 1000-key ``ListBucketResult`` page and an SQS
+``ReceiveMessage`` response carrying a 256 KB base64 body.
+"""
+import base64
+import optparse
+import os
+import timeit
+
+from boto.handler import XmlHandler, parse_xml
+from boto.s3.bucket import Bucket
+from boto.s3.key import Key
+from boto.resultset import ResultSet
+from boto.sqs.message import Message
+
+
+KEY_TEMPLATE = """<Contents>
+    <Key>logs/2015/03/%(i)06d.gz</Key>
+    <LastModified>2015-03-01T12:00:00.000Z</LastModified>
+    <ETag>&quot;d41d8cd98f00b204e9800998ecf8427e&quot;</ETag>
+    <Size>%(i)d</Size>
+    <Owner>
+      <ID>75aa57f09aa0c8caeab4f8c24e99d10f8e7faeebf76c078efc7c6caea54ba06a</ID>
+      <DisplayName>owner</DisplayName>
+    </Owner>
+    <StorageClass>STANDARD</StorageClass>
+  </Contents>"""
+
+
+def listing_case():
+    body = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+            '<Name>mybucket</Name><Prefix>logs/</Prefix>'
+            '<MaxKeys>1000</MaxKeys><IsTruncated>false</IsTruncated>' +
+            ''.join(KEY_TEMPLATE % {'i': i} for i in range(1000)) +
+            '</ListBucketResult>').encode('utf-8')
+    bucket = Bucket(None, 'mybucket')
+
+    def parse():
+        rs = ResultSet([('Contents', Key)])
+        parse_xml(body, XmlHandler(rs, bucket))
+    return parse
+
+
+def message_case():
+    payload = base64.b64encode(os.urandom(192 * 1024)).decode('ascii')
+    body = ('<ReceiveMessageResponse><ReceiveMessageResult><Message>'
+            '<MessageId>5fea7756-0ea4-451a-a703-a558b933e274</MessageId>'
+            '<ReceiptHandle>handle</ReceiptHandle>'
+            '<MD5OfBody>fafb00f5732ab283681e124bf8747ed1</MD5OfBody>'
+            '<Body>%s</Body>'
+            '</Message></ReceiveMessageResult></ReceiveMessageResponse>'
+            % payload).encode('utf-8')
+
+    def parse():
+        rs = ResultSet([('Message', Message)])
+        parse_xml(body, XmlHandler(rs, None))
+    return parse
+
+
+CASES = [('list-1000-keys', listing_case),
+         ('sqs-256k-body', message_case)]
+
+
+def main():
+    parser = optparse.OptionParser(usage='%prog [-n ITERATIONS]')
+    parser.add_option('-n', '--iterations', type='int', default=20)
+    options, args = parser.parse_args()
+
+    for name, case in CASES:
+        parse = case()
+        parse()
+        elapsed = min(timeit.repeat(parse, number=options.iterations,
+                                    repeat=3))
+        print('%-16s %8.2f ms/response' % (
+            name, elapsed / options.iterations * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -27,9 +27,11 @@ from __future__ import print_function
 
 try:
     from setuptools import setup
+    from setuptools.command.build_py import build_py
     extra = dict(test_suite="tests.test.suite", include_package_data=True)
 except ImportError:
     from distutils.core import setup
+    from distutils.command.build_py import build_py
     extra = {}
 
 import sys
@@ -41,6 +43,19 @@ if sys.version_info <= (2, 5):
     print(error, file=sys.stderr)
     sys.exit(1)
 
+# Modules written with syntax that needs Python 3.5 or later.  They are
+# left out when installing on older versions, which can't compile them.
+PY35_MODULES = ["boto.async_connection"]
+
+class BuildPy(build_py):
+    def find_package_modules(self, package, package_dir):
+        modules = build_py.find_package_modules(self, package, package_dir)
+        if sys.version_info < (3, 5):
+            modules = [(pkg, module, filename)
+                       for pkg, module, filename in modules
+                       if "%s.%s" % (pkg, module) not in PY35_MODULES]
+        return modules
+
 def readme():
     with open("README.rst") as f:
         return f.read()
@@ -86,6 +101,7 @@ setup(name = "boto",
           "boto.cacerts": ["cacerts.txt"],
           "boto": ["endpoints.json"],
       },
+      cmdclass = {"build_py": BuildPy},
       license = "MIT",
       platforms = "Posix; MacOS X; Windows",
       classifiers = ["Development Status :: 5 - Production/Stable",
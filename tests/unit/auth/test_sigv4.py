@@ -20,6 +20,7 @@
 # IN THE SOFTWARE.
 #
 import copy
+import hashlib
 import pickle
 import os
 from tests.compat import unittest, mock
@@ -262,6 +263,54 @@ class TestSigV4Handler(unittest.TestCase):
 
         self.assertIn('f00', canonical)
 
+    def test_signing_key_is_cached(self):
+        auth = HmacAuthV4Handler('glacier.us-east-1.amazonaws.com',
+                                 mock.Mock(), self.provider)
+        self.request.headers['X-Amz-Date'] = '20121121T000000Z'
+        auth.credential_scope(self.request)
+        expected = auth.signature(self.request, 'string to sign')
+        with mock.patch.object(auth, '_sign', wraps=auth._sign) as sign:
+            self.assertEqual(auth.signature(self.request, 'string to sign'),
+                             expected)
+        # Only the final signature; the derived key was reused.
+        self.assertEqual(sign.call_count, 1)
+
+    def test_signing_key_follows_rotated_credentials(self):
+        auth = HmacAuthV4Handler('glacier.us-east-1.amazonaws.com',
+                                 mock.Mock(), self.provider)
+        self.request.headers['X-Amz-Date'] = '20121121T000000Z'
+        auth.credential_scope(self.request)
+        old_key = auth.signing_key(self.request)
+        self.provider.secret_key = 'rotated_secret_key'
+        new_key = auth.signing_key(self.request)
+        self.assertNotEqual(old_key, new_key)
+
+        fresh = HmacAuthV4Handler('glacier.us-east-1.amazonaws.com',
+                                  mock.Mock(), self.provider)
+        self.assertEqual(fresh.signing_key(self.request), new_key)
+
+    def test_canonical_query_string_escaping(self):
+        auth = HmacAuthV4Handler('glacier.us-east-1.amazonaws.com',
+                                 mock.Mock(), self.provider)
+        request = HTTPRequest(
+            'GET', 'https', 'glacier.us-east-1.amazonaws.com', 443,
+            '/-/vaults/foo/archives', None,
+            {'Plain-Name_1.~': 'plain-value', 'with space': 'a/b+c\n',
+             'Unicode': u'\u00e9'}, {}, '')
+        self.assertEqual(auth.canonical_query_string(request),
+                         'Plain-Name_1.~=plain-value&'
+                         'Unicode=%C3%A9&'
+                         'with%20space=a%2Fb%2Bc%0A')
+
+    def test_payload_of_buffers_and_precomputed_hashes(self):
+        auth = HmacAuthV4Handler('glacier.us-east-1.amazonaws.com',
+                                 mock.Mock(), self.provider)
+        self.request.body = memoryview(b'part data')
+        self.assertEqual(auth.payload(self.request),
+                         hashlib.sha256(b'part data').hexdigest())
+        self.request.headers['x-amz-content-sha256'] = 'precomputed'
+        self.assertEqual(auth.payload(self.request), 'precomputed')
+
 
 class TestS3HmacAuthV4Handler(unittest.TestCase):
     def setUp(self):
@@ -5,12 +5,15 @@ from boto.cloudsearch2.layer1 import CloudSearchConnection
 from tests.unit import unittest, AWSMockServiceTestCase
 from httpretty import HTTPretty
 from mock import MagicMock
+from tests.compat import mock
 
 import json
 
-from boto.cloudsearch2.document import DocumentServiceConnection
 from boto.cloudsearch2.document import CommitMismatchError, EncodingError, \
-        ContentTooLongError, DocumentServiceConnection
+        ContentTooLongError, DocumentServiceConnection, MultiCommitResponse, \
+        encode_sdf_batches, DocumentBatcher
+from boto.cloudsearch2.search import SearchConnection
+from boto.cloudsearch2.sessions import clear_sessions, get_session
 
 import boto
 from tests.unit.cloudsearch2 import DEMO_DOMAIN_DATA
@@ -44,6 +47,8 @@ class CloudSearchDocumentTest(unittest.TestCase):
 
     def tearDown(self):
         HTTPretty.disable()
+        # Don't let pooled connections outlive the fake responses.
+        clear_sessions()
 
 
 class CloudSearchDocumentSingleTest(CloudSearchDocumentTest):
@@ -344,3 +349,142 @@ class CloudSearchDocumentErrorMismatch(CloudSearchDocumentTest):
             self.assertTrue(hasattr(e, 'errors'))
             self.assertIsInstance(e.errors, list)
             self.assertEquals(e.errors[0], self.response['errors'][0].get('message'))
+
+
+class CloudSearchSDFBatchesTest(unittest.TestCase):
+    def setUp(self):
+        self.documents = [{'type': 'add', 'id': str(i),
+                           'fields': {'title': 'Title %d' % i}}
+                          for i in range(10)]
+
+    def test_batches_match_json_dumps(self):
+        batches = list(encode_sdf_batches(self.documents, max_size=200))
+        self.assertTrue(len(batches) > 1)
+        for sdf, documents in batches:
+            self.assertTrue(len(sdf) <= 200)
+            self.assertEqual(sdf, json.dumps(documents))
+        self.assertEqual(sum([d for s, d in batches], []), self.documents)
+
+    def test_no_documents(self):
+        self.assertEqual(list(encode_sdf_batches([])), [('[]', [])])
+
+    def test_document_too_big(self):
+        with self.assertRaises(ContentTooLongError):
+            list(encode_sdf_batches(self.documents, max_size=20))
+
+
+class FakeCommitResponse(object):
+    status_code = 200
+
+    def __init__(self, sdf):
+        documents = json.loads(sdf)
+        self.content = json.dumps({
+            'status': 'success',
+            'adds': len([d for d in documents if d['type'] == 'add']),
+            'deletes': len([d for d in documents if d['type'] == 'delete']),
+        }).encode('utf-8')
+
+
+class CloudSearchFakeSessionTest(unittest.TestCase):
+    endpoint = "doc-demo-userdomain.us-east-1.cloudsearch.amazonaws.com"
+
+    def setUp(self):
+        self.batches = []
+        self.session = mock.Mock()
+        self.session.post.side_effect = self.post
+
+    def tearDown(self):
+        clear_sessions()
+
+    def post(self, url, data, headers):
+        self.batches.append(json.loads(data))
+        return FakeCommitResponse(data)
+
+
+class CloudSearchDocumentSplitCommitTest(CloudSearchFakeSessionTest):
+    def test_commit_splits_large_batches(self):
+        document = DocumentServiceConnection(endpoint=self.endpoint)
+        document.MaxBatchSize = 300
+        for i in range(20):
+            document.add(str(i), {'title': 'Title %d' % i})
+        document.delete('old')
+        with mock.patch('boto.cloudsearch2.document.get_session',
+                        return_value=self.session):
+            result = document.commit(num_threads=2)
+        self.assertIsInstance(result, MultiCommitResponse)
+        self.assertEqual((result.status, result.adds, result.deletes),
+                         ('success', 20, 1))
+        self.assertTrue(len(self.batches) > 1)
+        expected = [d for sdf, d in
+                    encode_sdf_batches(document.documents_batch, 300)]
+        self.assertEqual([r.documents for r in result.responses], expected)
+        ids = sorted(d['id'] for b in self.batches for d in b)
+        self.assertEqual(ids, sorted([str(i) for i in range(20)] + ['old']))
+
+    def test_small_commits_are_sent_whole(self):
+        document = DocumentServiceConnection(endpoint=self.endpoint)
+        document.add('1', {'title': 'Title'})
+        with mock.patch('boto.cloudsearch2.document.get_session',
+                        return_value=self.session):
+            result = document.commit(num_threads=2)
+        self.assertEqual(result.adds, 1)
+        self.assertEqual(self.batches, [document.documents_batch])
+
+    def test_sessions_are_shared_per_endpoint(self):
+        self.assertIs(get_session(self.endpoint), get_session(self.endpoint))
+        search = SearchConnection(endpoint=self.endpoint)
+        self.assertIs(search.session, SearchConnection(
+            endpoint=self.endpoint).session)
+        bigger = SearchConnection(endpoint=self.endpoint, pool_maxsize=100)
+        self.assertIsNot(bigger.session, search.session)
+
+
+class CloudSearchDocumentBatcherTest(CloudSearchFakeSessionTest):
+    def setUp(self):
+        super(CloudSearchDocumentBatcherTest, self).setUp()
+        self.document = DocumentServiceConnection(endpoint=self.endpoint)
+        patcher = mock.patch('boto.cloudsearch2.document.get_session',
+                             return_value=self.session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_batches_are_sent_as_they_fill(self):
+        callback = mock.Mock()
+        batcher = DocumentBatcher(self.document, max_size=300, num_threads=2,
+                                  batch_callback=callback)
+        for i in range(50):
+            batcher.add(str(i), {'title': 'Title %d' % i})
+            if i == 10:
+                # Full batches have been handed over already.
+                self.assertTrue(len(batcher._batch.documents) < 11)
+        batcher.delete('old')
+        result = batcher.close()
+        self.assertEqual((result.status, result.adds, result.deletes),
+                         ('success', 50, 1))
+        self.assertEqual(result.responses, [])
+        self.assertEqual(callback.call_count, len(self.batches))
+        for batch in self.batches:
+            self.assertTrue(len(json.dumps(batch)) <= 300)
+        ids = sorted(d['id'] for b in self.batches for d in b)
+        self.assertEqual(ids, sorted([str(i) for i in range(50)] + ['old']))
+
+    def test_context_manager(self):
+        with DocumentBatcher(self.document) as batcher:
+            batcher.add('1', {'title': 'Title'})
+        self.assertEqual(self.batches, [[{'type': 'add', 'id': '1',
+                                          'fields': {'title': 'Title'}}]])
+        self.assertEqual(batcher.result.adds, 1)
+
+    def test_upload_errors_are_raised(self):
+        self.session.post.side_effect = None
+        self.session.post.return_value = mock.Mock(
+            status_code=200, content=json.dumps({
+                'status': 'error', 'adds': 0, 'deletes': 0,
+                'errors': [{'message': 'Something went wrong'}]
+            }).encode('utf-8'))
+        batcher = DocumentBatcher(self.document, max_size=300)
+        for i in range(5):
+            batcher.add(str(i), {'title': 'Title %d' % i})
+        with self.assertRaises(CommitMismatchError):
+            batcher.close()
+
@@ -8,6 +8,7 @@ from httpretty import HTTPretty
 import json
 
 from boto.cloudsearch2.search import SearchConnection, SearchServiceException
+from boto.cloudsearch2.sessions import clear_sessions
 from boto.compat import six, map
 from tests.unit import AWSMockServiceTestCase
 from tests.unit.cloudsearch2 import DEMO_DOMAIN_DATA
@@ -94,6 +95,8 @@ class CloudSearchSearchBaseTest(unittest.TestCase):
 
     def tearDown(self):
         HTTPretty.disable()
+        # Don't let pooled connections outlive the fake responses.
+        clear_sessions()
 
 
 class CloudSearchSearchTest(CloudSearchSearchBaseTest):
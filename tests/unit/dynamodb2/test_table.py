@@ -1,3 +1,6 @@
+import json
+from decimal import Decimal
+
 from tests.compat import mock, unittest
 from boto.dynamodb2 import exceptions
 from boto.dynamodb2.fields import (HashKey, RangeKey,
@@ -6,8 +9,9 @@ from boto.dynamodb2.fields import (HashKey, RangeKey,
                                    GlobalIncludeIndex)
 from boto.dynamodb2.items import Item
 from boto.dynamodb2.layer1 import DynamoDBConnection
-from boto.dynamodb2.results import ResultSet, BatchGetResultSet
-from boto.dynamodb2.table import Table
+from boto.dynamodb2.results import ResultSet, BatchGetResultSet, \
+    ParallelScanResultSet
+from boto.dynamodb2.table import Table, ConcurrentBatchTable
 from boto.dynamodb2.types import (STRING, NUMBER, BINARY,
                                   FILTER_OPERATORS, QUERY_OPERATORS)
 from boto.exception import JSONResponseError
@@ -1146,6 +1150,95 @@ class BatchGetResultSetTestCase(unittest.TestCase):
         self.assertRaises(StopIteration, self.results.next)
 
 
+def fake_segment_results(segment, total_segments, limit=None,
+                         exclusive_start_key=None, **kwargs):
+    # Each segment has two pages of two items.
+    page = 0
+
+    if exclusive_start_key:
+        page = int(exclusive_start_key['id'])
+
+    return {
+        'results': ['segment %d item %d' % (segment, page * 2 + i)
+                    for i in range(2)],
+        'last_key': {'id': Decimal(page + 1)} if page == 0 else None,
+        'consumed_capacity': 1,
+    }
+
+
+class ParallelScanResultSetTestCase(unittest.TestCase):
+    def setUp(self):
+        super(ParallelScanResultSetTestCase, self).setUp()
+        self.results = ParallelScanResultSet(3, workers=2)
+        self.results.to_call(fake_segment_results)
+
+    def test_iteration(self):
+        self.assertEqual(sorted(self.results), sorted(
+            'segment %d item %d' % (segment, i)
+            for segment in range(3) for i in range(4)))
+        self.assertEqual(self.results.checkpoint(),
+                         {'0': None, '1': None, '2': None})
+
+    def test_error_is_raised(self):
+        self.results.to_call(mock.Mock(side_effect=ValueError('boom')))
+        self.assertRaises(ValueError, list, self.results)
+
+    def test_checkpoint_tracks_consumed_pages(self):
+        results = ParallelScanResultSet(1)
+        results.to_call(fake_segment_results)
+        self.assertEqual(next(results), 'segment 0 item 0')
+        self.assertEqual(next(results), 'segment 0 item 1')
+        # The first page is only done once the next item is asked for.
+        self.assertEqual(results.checkpoint(), {})
+        self.assertEqual(next(results), 'segment 0 item 2')
+        self.assertEqual(results.checkpoint(), {'0': {'id': {'N': '1'}}})
+        results.close()
+
+    def test_resume_from_checkpoint(self):
+        result_function = mock.Mock(side_effect=fake_segment_results)
+        results = ParallelScanResultSet(
+            3, checkpoint={0: None, 1: {'id': Decimal(1)}})
+        results.to_call(result_function)
+        self.assertEqual(sorted(results), [
+            'segment 1 item 2', 'segment 1 item 3',
+            'segment 2 item 0', 'segment 2 item 1',
+            'segment 2 item 2', 'segment 2 item 3',
+        ])
+        self.assertEqual(result_function.call_count, 3)
+
+    def test_checkpoint_round_trips_through_json(self):
+        results = ParallelScanResultSet(2)
+        results.to_call(fake_segment_results)
+        consumed = [next(results) for i in range(3)]
+        saved = json.loads(json.dumps(results.checkpoint()))
+        results.close()
+
+        result_function = mock.Mock(side_effect=fake_segment_results)
+        resumed = ParallelScanResultSet(2, checkpoint=saved)
+        resumed.to_call(result_function)
+        rest = list(resumed)
+
+        # Only the page being consumed may be read twice.
+        self.assertEqual(sorted(set(consumed + rest)), sorted(
+            'segment %d item %d' % (segment, i)
+            for segment in range(2) for i in range(4)))
+        self.assertEqual(len(consumed + rest), 8 + 1)
+        for call in result_function.call_args_list:
+            start_key = call[1].get('exclusive_start_key')
+            if start_key is not None:
+                self.assertEqual(start_key, {'id': Decimal(1)})
+
+    def test_throttle(self):
+        results = ParallelScanResultSet(3, max_read_capacity=2)
+        results.to_call(fake_segment_results)
+
+        with mock.patch('time.sleep') as sleep:
+            self.assertEqual(len(list(results)), 12)
+
+        # Six units consumed against a two unit burst.
+        self.assertTrue(sleep.called)
+
+
 class TableTestCase(unittest.TestCase):
     def setUp(self):
         super(TableTestCase, self).setUp()
@@ -2082,6 +2175,122 @@ class TableTestCase(unittest.TestCase):
             # Post-exit, this should be emptied.
             self.assertEqual(len(batch._unprocessed), 0)
 
+    def test_batch_write_concurrent(self):
+        sent = []
+
+        def batch_write_item(request_items):
+            sent.append(len(request_items['users']))
+            return {}
+
+        with mock.patch.object(
+                self.users.connection,
+                'batch_write_item',
+                side_effect=batch_write_item):
+            with self.users.batch_write(workers=3) as batch:
+                self.assertTrue(isinstance(batch, ConcurrentBatchTable))
+
+                for i in range(60):
+                    batch.put_item(data={
+                        'username': 'user%s' % i,
+                        'date_joined': 12342547
+                    })
+
+        self.assertEqual(sorted(sent), [10, 25, 25])
+        self.assertEqual(batch.stats()['items_written'], 60)
+        self.assertEqual(batch.stats()['batches'], 3)
+
+    def test_batch_write_concurrent_unprocessed_items(self):
+        unprocessed = {
+            'PutRequest': {
+                'Item': {'username': {'S': 'jane'}},
+            },
+        }
+        responses = [
+            {'UnprocessedItems': {'users': [unprocessed]}},
+            {},
+        ]
+        sent = []
+
+        def batch_write_item(request_items):
+            sent.append(request_items['users'])
+            return responses.pop(0)
+
+        self.users.connection._truncated_exponential_time.return_value = 0.1
+
+        with mock.patch.object(
+                self.users.connection,
+                'batch_write_item',
+                side_effect=batch_write_item):
+            with mock.patch('time.sleep') as sleep:
+                with self.users.batch_write(workers=2) as batch:
+                    batch.put_item(data={
+                        'username': 'jane',
+                        'date_joined': 12342547
+                    })
+                    batch.delete_item(username='johndoe')
+
+        # The unprocessed item is sent again, on its own, after a backoff.
+        self.assertEqual(len(sent), 2)
+        self.assertEqual(sent[1], [unprocessed])
+        self.assertTrue(sleep.called)
+        stats = batch.stats()
+        self.assertEqual(stats['items_written'], 2)
+        self.assertEqual(stats['throttled'], 1)
+        self.assertEqual(stats['unprocessed'], 0)
+
+    def test_batch_write_concurrent_throttling_reduces_concurrency(self):
+        self.users.connection._truncated_exponential_time.return_value = 0
+        error = exceptions.ProvisionedThroughputExceededException(
+            400, 'Bad Request', {})
+
+        with mock.patch.object(
+                self.users.connection,
+                'batch_write_item',
+                side_effect=[error, {}]):
+            batch = self.users.batch_write(workers=4)
+
+            with batch:
+                batch.put_item(data={
+                    'username': 'jane',
+                    'date_joined': 12342547
+                })
+                batch.flush()
+                batch._wait()
+                self.assertEqual(batch.concurrency, 2)
+                self.assertEqual(len(batch._unprocessed), 1)
+
+        self.assertEqual(batch.stats()['items_written'], 1)
+        self.assertEqual(batch.concurrency, 3)
+
+    def test_batch_write_concurrent_error_keeps_items(self):
+        error = JSONResponseError(400, 'Bad Request', {})
+
+        with mock.patch.object(
+                self.users.connection,
+                'batch_write_item',
+                side_effect=error) as batch_write_item:
+            batch = self.users.batch_write(workers=2)
+
+            with self.assertRaises(JSONResponseError) as cm:
+                with batch:
+                    for i in range(30):
+                        batch.put_item(data={
+                            'username': 'user%s' % i,
+                            'date_joined': 12342547
+                        })
+
+        # The first error is raised, the workers stop & every item that
+        # wasn't written can still be sent again.
+        self.assertIs(cm.exception, error)
+        self.assertTrue(1 <= batch_write_item.call_count <= 2)
+        self.assertEqual(batch.stats()['items_written'], 0)
+        usernames = sorted(
+            request['PutRequest']['Item']['username']['S']
+            for request in batch.unprocessed_requests()
+        )
+        self.assertEqual(usernames,
+                         sorted('user%s' % i for i in range(30)))
+
     def test__build_filters(self):
         filters = self.users._build_filters({
             'username__eq': 'johndoe',
@@ -2506,6 +2715,29 @@ class TableTestCase(unittest.TestCase):
 
         self.assertEqual(mock_query.call_count, 1)
 
+    def test_parallel_scan(self):
+        with mock.patch.object(self.users, '_scan',
+                               side_effect=fake_segment_results) as mock_scan:
+            results = self.users.parallel_scan(
+                total_segments=2,
+                workers=2,
+                max_page_size=2,
+                max_read_capacity=100,
+                username__beginswith='j'
+            )
+            self.assertTrue(isinstance(results, ParallelScanResultSet))
+            self.assertEqual(len(list(results)), 8)
+
+        mock_scan.assert_any_call(
+            segment=1,
+            total_segments=2,
+            limit=2,
+            attributes=None,
+            conditional_operator=None,
+            return_consumed_capacity='TOTAL',
+            username__beginswith='j'
+        )
+
     def test_scan(self):
         items_1 = {
             'results': [
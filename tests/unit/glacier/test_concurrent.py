@@ -20,15 +20,22 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 # IN THE SOFTWARE.
 #
+import os
+import shutil
 import tempfile
+import threading
+from hashlib import sha256
+
 from boto.compat import Queue
 
 from tests.compat import mock, unittest
 from tests.unit import AWSMockServiceTestCase
 
 from boto.glacier.concurrent import ConcurrentUploader, ConcurrentDownloader
-from boto.glacier.concurrent import UploadWorkerThread
-from boto.glacier.concurrent import _END_SENTINEL
+from boto.glacier.concurrent import UploadWorkerThread, read_upload_state
+from boto.glacier.concurrent import _END_SENTINEL, _AdaptiveLimit
+from boto.glacier.exceptions import UploadArchiveError
+from boto.glacier.utils import compute_hashes_from_fileobj
 
 
 class FakeThreadedConcurrentUploader(ConcurrentUploader):
@@ -169,5 +176,122 @@ class TestUploaderThread(unittest.TestCase):
         self.assertEqual(api.upload_part.call_count, 3)
 
 
+class FakeGlacierAPI(object):
+    """
+    Records the parts uploaded to it, failing those starting at the
+    offsets in ``fail_offsets``.
+    """
+    def __init__(self):
+        self.parts = {}
+        self.fail_offsets = set()
+        self.lock = threading.Lock()
+        self.initiate_multipart_upload = mock.Mock(
+            return_value={'UploadId': 'upload-id'})
+        self.complete_multipart_upload = mock.Mock(
+            return_value={'ArchiveId': 'archive-id'})
+        self.abort_multipart_upload = mock.Mock()
+
+    def upload_part(self, vault_name, upload_id, linear_hash, tree_hash,
+                    byte_range, part_data):
+        if byte_range[0] in self.fail_offsets:
+            raise Exception('Throttled')
+        if sha256(part_data).hexdigest() != linear_hash:
+            raise Exception('Bad linear hash')
+        with self.lock:
+            self.parts[byte_range[0]] = bytes(part_data)
+        return mock.Mock()
+
+
+class TestConcurrentUploaderParts(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.filename = os.path.join(self.tmpdir, 'archive')
+        self.state_file = os.path.join(self.tmpdir, 'state')
+        self.part_size = 4 * 1024 * 1024
+        self.data = os.urandom(self.part_size) * 2 + b'tail'
+        with open(self.filename, 'wb') as f:
+            f.write(self.data)
+        self.api = FakeGlacierAPI()
+        sleep_patch = mock.patch('boto.glacier.concurrent.time.sleep')
+        self.addCleanup(sleep_patch.stop)
+        sleep_patch.start()
+
+    def expected_tree_hash(self):
+        with open(self.filename, 'rb') as f:
+            return compute_hashes_from_fileobj(f)[1]
+
+    def test_upload_from_mapped_file(self):
+        uploader = ConcurrentUploader(self.api, 'vault_name', num_threads=2)
+        self.assertEqual(uploader.upload(self.filename), 'archive-id')
+        self.assertEqual(sorted(self.api.parts), [0, self.part_size,
+                                                  2 * self.part_size])
+        self.assertEqual(b''.join(self.api.parts[i] for i in
+                                  sorted(self.api.parts)), self.data)
+        self.api.complete_multipart_upload.assert_called_with(
+            'vault_name', 'upload-id', self.expected_tree_hash(),
+            len(self.data))
+
+    def test_failed_upload_is_resumed_from_state_file(self):
+        self.api.fail_offsets.add(self.part_size)
+        uploader = ConcurrentUploader(self.api, 'vault_name', num_threads=2,
+                                      state_file=self.state_file)
+        with self.assertRaises(UploadArchiveError):
+            uploader.upload(self.filename)
+        self.assertFalse(self.api.abort_multipart_upload.called)
+        state = read_upload_state(self.state_file)
+        self.assertEqual((state['upload_id'], state['part_size'],
+                          state['archive_size']),
+                         ('upload-id', self.part_size, len(self.data)))
+        self.assertIn(0, state['part_hash_map'])
+        self.assertNotIn(1, state['part_hash_map'])
+
+        # A new process picks the upload up from the state file.
+        self.api.fail_offsets.clear()
+        self.api.parts.clear()
+        self.api.initiate_multipart_upload.reset_mock()
+        uploader = ConcurrentUploader(self.api, 'vault_name', num_threads=2,
+                                      state_file=self.state_file)
+        self.assertEqual(uploader.upload(self.filename), 'archive-id')
+        self.assertFalse(self.api.initiate_multipart_upload.called)
+        self.assertIn(self.part_size, self.api.parts)
+        self.assertNotIn(0, self.api.parts)
+        self.api.complete_multipart_upload.assert_called_with(
+            'vault_name', 'upload-id', self.expected_tree_hash(),
+            len(self.data))
+        self.assertFalse(os.path.exists(self.state_file))
+
+    def test_memory_budget_limits_parts_in_flight(self):
+        uploader = ConcurrentUploader(self.api, 'vault_name', num_threads=4,
+                                      max_memory=self.part_size)
+        with mock.patch('boto.glacier.concurrent._AdaptiveLimit',
+                        wraps=_AdaptiveLimit) as limit:
+            uploader.upload(self.filename)
+        limit.assert_called_with(1)
+
+
+class TestAdaptiveLimit(unittest.TestCase):
+    def test_limit_backs_off_and_recovers(self):
+        thread = mock.Mock(should_continue=True)
+        limit = _AdaptiveLimit(8)
+        self.assertTrue(limit.acquire(thread))
+        limit.release(False)
+        self.assertEqual(limit.limit, 4)
+        limit.acquire(thread)
+        limit.release(False)
+        self.assertEqual(limit.limit, 2)
+        for i in range(2):
+            limit.acquire(thread)
+            limit.release(True)
+        self.assertEqual(limit.limit, 3)
+
+    def test_waiting_thread_can_be_stopped(self):
+        thread = mock.Mock(should_continue=True)
+        limit = _AdaptiveLimit(1)
+        limit.acquire(thread)
+        thread.should_continue = False
+        self.assertFalse(limit.acquire(thread))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -28,7 +28,7 @@ from tests.unit import unittest
 
 from boto.compat import BytesIO, six, StringIO
 from boto.glacier.utils import minimum_part_size, chunk_hashes, tree_hash, \
-        bytes_to_hex, compute_hashes_from_fileobj
+        bytes_to_hex, compute_hashes_from_fileobj, compute_hashes_from_buffer
 
 
 class TestPartSizeCalculations(unittest.TestCase):
@@ -81,6 +81,16 @@ class TestChunking(unittest.TestCase):
         self.assertEqual(len(chunks), 1)
         self.assertEqual(chunks[0], sha256(b'aaaa').digest())
 
+    def test_chunk_hashes_in_threads(self):
+        bytestring = os.urandom(10 * 1000 + 7)
+        expected = chunk_hashes(bytestring, chunk_size=1000)
+        self.assertEqual(len(expected), 11)
+        for num_threads in (2, 3, 20):
+            self.assertEqual(chunk_hashes(bytestring, chunk_size=1000,
+                                          num_threads=num_threads),
+                             expected)
+        self.assertEqual(chunk_hashes(bytearray(bytestring), 1000), expected)
+
 
 class TestTreeHash(unittest.TestCase):
     # For these tests, a set of reference tree hashes were computed.
@@ -118,6 +128,18 @@ class TestTreeHash(unittest.TestCase):
             self.calculate_tree_hash(''),
             b'e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855')
 
+    def test_uneven_levels_carry_the_last_hash_up(self):
+        hashes = [sha256(six.int2byte(i)).digest() for i in range(5)]
+
+        def combine(a, b):
+            return sha256(a + b).digest()
+        expected = combine(
+            combine(combine(hashes[0], hashes[1]),
+                    combine(hashes[2], hashes[3])),
+            hashes[4])
+        self.assertEqual(tree_hash(hashes), expected)
+        self.assertEqual(tree_hash(iter(hashes[:1])), hashes[0])
+
 
 class TestFileHash(unittest.TestCase):
     def _gen_data(self):
@@ -163,3 +185,25 @@ class TestFileHash(unittest.TestCase):
         # Compute a hash from a file-like BytesIO object.
         f = BytesIO(self._gen_data())
         compute_hashes_from_fileobj(f, chunk_size=512)
+
+    def test_compute_hash_buffer(self):
+        data = self._gen_data()
+        expected = compute_hashes_from_fileobj(BytesIO(data), chunk_size=512)
+        self.assertEqual(expected[0], sha256(data).hexdigest())
+        self.assertEqual(compute_hashes_from_buffer(data, chunk_size=512),
+                         expected)
+        self.assertEqual(compute_hashes_from_buffer(memoryview(data), 512, 4),
+                         expected)
+        self.assertEqual(compute_hashes_from_buffer(b''),
+                         compute_hashes_from_fileobj(BytesIO(b'')))
+
+    def test_compute_hash_file_in_threads(self):
+        data = self._gen_data()
+        with tempfile.TemporaryFile() as f:
+            f.write(b'skipped' + data)
+            f.seek(7)
+            hashes = compute_hashes_from_fileobj(f, chunk_size=512,
+                                                 num_threads=4)
+            self.assertEqual(f.tell(), 7 + len(data))
+        self.assertEqual(hashes, compute_hashes_from_fileobj(
+            BytesIO(data), chunk_size=512))
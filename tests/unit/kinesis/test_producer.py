@@ -0,0 +1,207 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+import base64
+import threading
+import time
+
+from tests.compat import unittest
+
+from boto.kinesis.exceptions import ResourceNotFoundException
+from boto.kinesis.producer import KinesisProducer
+from boto.retry import RetryPolicy
+
+HALF = 2 ** 127
+
+
+class FakeKinesis(object):
+    """
+    A two-shard stream that fails the records listed in ``fail_keys`` the
+    given number of times.
+    """
+    def __init__(self):
+        self.retry_policy = RetryPolicy(base_delay=0.001, max_delay=0.001)
+        self.requests = []
+        self.fail_keys = {}
+        self.error = None
+        self.lock = threading.Lock()
+        self.shards = [
+            self.shard('shardId-0', 0, HALF - 1),
+            self.shard('shardId-1', HALF, 2 ** 128 - 1),
+            self.shard('shardId-old', 0, 2 ** 128 - 1, closed=True),
+        ]
+
+    def shard(self, shard_id, start, end, closed=False):
+        sequence_range = {'StartingSequenceNumber': '1'}
+        if closed:
+            sequence_range['EndingSequenceNumber'] = '2'
+        return {'ShardId': shard_id,
+                'HashKeyRange': {'StartingHashKey': str(start),
+                                 'EndingHashKey': str(end)},
+                'SequenceNumberRange': sequence_range}
+
+    def describe_stream(self, stream_name, limit=None,
+                        exclusive_start_shard_id=None):
+        # One shard per page.
+        ids = [s['ShardId'] for s in self.shards]
+        index = 0
+        if exclusive_start_shard_id is not None:
+            index = ids.index(exclusive_start_shard_id) + 1
+        return {'StreamDescription': {
+            'Shards': self.shards[index:index + 1],
+            'HasMoreShards': index + 1 < len(self.shards)}}
+
+    def shard_for(self, record):
+        hash_key = int(record['ExplicitHashKey'])
+        for shard in self.shards:
+            hash_range = shard['HashKeyRange']
+            if 'EndingSequenceNumber' not in shard['SequenceNumberRange'] \
+                    and int(hash_range['StartingHashKey']) <= hash_key \
+                    <= int(hash_range['EndingHashKey']):
+                return shard['ShardId']
+
+    def put_records(self, records, stream_name, b64_encode=True):
+        if self.error is not None:
+            raise self.error
+        results = []
+        with self.lock:
+            self.requests.append(records)
+            for record in records:
+                key = record['PartitionKey']
+                if self.fail_keys.get(key):
+                    self.fail_keys[key] -= 1
+                    results.append({
+                        'ErrorCode': 'ProvisionedThroughputExceededException',
+                        'ErrorMessage': 'Slow down'})
+                    continue
+                results.append({'ShardId': self.shard_for(record),
+                                'SequenceNumber': '1'})
+        return {'FailedRecordCount': 0, 'Records': results}
+
+
+class TestKinesisProducer(unittest.TestCase):
+    def setUp(self):
+        self.kinesis = FakeKinesis()
+
+    def producer(self, **kwargs):
+        kwargs.setdefault('linger', 10)
+        return KinesisProducer(self.kinesis, 'stream', **kwargs)
+
+    def sent(self):
+        return [(r['PartitionKey'], base64.b64decode(r['Data']))
+                for request in self.kinesis.requests for r in request]
+
+    def test_shard_map(self):
+        producer = self.producer()
+        self.assertEqual(producer.predict_shard('a', 1), 'shardId-0')
+        self.assertEqual(producer.predict_shard('a', HALF), 'shardId-1')
+        self.assertEqual(producer.predict_shard('a', str(HALF - 1)),
+                         'shardId-0')
+
+    def test_records_are_batched(self):
+        with self.producer(num_threads=2) as producer:
+            for i in range(1200):
+                producer.put(b'data %d' % i, 'key-%d' % i, i)
+        self.assertEqual(sorted(self.sent()),
+                         sorted(('key-%d' % i, b'data %d' % i)
+                                for i in range(1200)))
+        self.assertTrue(all(len(r) <= 500 for r in self.kinesis.requests))
+        self.assertEqual(len(self.kinesis.requests), 3)
+        stats = producer.stats()
+        self.assertEqual((stats['records_put'], stats['requests'],
+                          stats['buffered']), (1200, 3, 0))
+
+    def test_full_requests_hold_one_shard(self):
+        producer = self.producer()
+        producer.MaxRecords = 3
+        for i in range(3):
+            producer.put('low', 'low-%d' % i, i)
+            producer.put('high', 'high-%d' % i, HALF + i)
+        deadline = time.time() + 5
+        while len(self.kinesis.requests) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        producer.close()
+        shards = sorted(sorted(set(r['PartitionKey'].split('-')[0]
+                                   for r in request))
+                        for request in self.kinesis.requests)
+        self.assertEqual(shards, [['high'], ['low']])
+
+    def test_linger(self):
+        producer = self.producer(linger=0.01)
+        producer.put('data', 'key', 1)
+        deadline = time.time() + 5
+        while not self.kinesis.requests and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.sent(), [('key', b'data')])
+        producer.close()
+
+    def test_only_failed_records_are_retried(self):
+        self.kinesis.fail_keys = {'key-3': 2}
+        with self.producer() as producer:
+            for i in range(5):
+                producer.put('data', 'key-%d' % i, i)
+        self.assertEqual([len(r) for r in self.kinesis.requests], [5, 1, 1])
+        self.assertEqual(self.kinesis.requests[1][0]['PartitionKey'],
+                         'key-3')
+        stats = producer.stats()
+        self.assertEqual((stats['records_put'], stats['records_retried'],
+                          stats['throttled']), (5, 2, 2))
+
+    def test_records_are_given_up_on(self):
+        self.kinesis.fail_keys = {'key': 5}
+        failures = []
+        producer = self.producer(
+            num_retries=2, failure_callback=lambda *a: failures.append(a))
+        producer.put('data', 'key', 1)
+        producer.close()
+        self.assertEqual(failures, [('key',
+                                     'ProvisionedThroughputExceededException',
+                                     'Slow down')])
+        self.assertEqual(len(self.kinesis.requests), 3)
+        self.assertEqual(producer.stats()['records_failed'], 1)
+
+    def test_shard_map_is_refreshed_after_resharding(self):
+        producer = self.producer()
+        producer.ShardRefreshInterval = 0
+        self.kinesis.shards[0] = self.kinesis.shard('shardId-2', 0, HALF - 1)
+        self.kinesis.shards[1] = self.kinesis.shard('shardId-3', HALF,
+                                                    2 ** 128 - 1)
+        producer.put('data', 'key', 1)
+        producer.close()
+        self.assertEqual(producer.predict_shard('key', 1), 'shardId-2')
+
+    def test_fatal_errors_are_raised(self):
+        self.kinesis.error = ResourceNotFoundException(400, 'Bad Request')
+        producer = self.producer()
+        producer.put('data', 'key', 1)
+        with self.assertRaises(ResourceNotFoundException):
+            producer.close()
+        with self.assertRaises(ResourceNotFoundException):
+            producer.put('data', 'key', 1)
+
+    def test_records_must_fit(self):
+        producer = self.producer()
+        with self.assertRaises(ValueError):
+            producer.put(b'x' * producer.MaxRecordBytes, 'key')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -21,14 +21,19 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 # IN THE SOFTWARE.
 #
+import hashlib
+import socket
+import tempfile
+
 from tests.compat import mock, unittest
 from tests.unit import AWSMockServiceTestCase
 
-from boto.compat import StringIO
-from boto.exception import BotoServerError
+from boto.compat import BytesIO, StringIO
+from boto.exception import BotoServerError, S3DataError
 from boto.s3.connection import S3Connection
 from boto.s3.bucket import Bucket
-from boto.s3.key import Key
+from boto.s3.key import Key, _UploadBody
+from boto.utils import compute_hash
 
 
 class TestS3Key(AWSMockServiceTestCase):
@@ -222,6 +227,291 @@ class TestS3KeyRetries(AWSMockServiceTestCase):
         self.assertTrue(k.should_retry.count, 1)
 
 
+class CountingBytesIO(BytesIO):
+    bytes_read = 0
+
+    def read(self, *args):
+        data = BytesIO.read(self, *args)
+        self.bytes_read += len(data)
+        return data
+
+
+class TestS3KeySinglePass(AWSMockServiceTestCase):
+    connection_class = S3Connection
+
+    def setUp(self):
+        super(TestS3KeySinglePass, self).setUp()
+        self.data = b'single pass upload' * 100
+        self.etag = '"%s"' % hashlib.md5(self.data).hexdigest()
+        self.key = Bucket(self.service_connection, 'mybucket').new_key('k')
+
+    def test_data_is_read_once(self):
+        self.set_http_response(status_code=200, header=[('etag', self.etag)])
+        fp = CountingBytesIO(self.data)
+        self.key.set_contents_from_file(fp, single_pass=True)
+        self.assertEqual(fp.bytes_read, len(self.data))
+        self.assertNotIn('Content-MD5', self.actual_request.headers)
+        self.assertEqual(self.actual_request.headers['Content-Length'],
+                         str(len(self.data)))
+        self.assertEqual('"%s"' % self.key.md5.decode('utf-8'), self.etag)
+
+    def test_etag_mismatch_is_detected(self):
+        self.set_http_response(status_code=200,
+                               header=[('etag', '"0123456789abcdef"')])
+        with self.assertRaises(S3DataError):
+            self.key.set_contents_from_file(BytesIO(self.data),
+                                            single_pass=True)
+
+    def test_payload_is_unsigned_only_for_single_pass(self):
+        self.set_http_response(status_code=200, header=[('etag', self.etag)])
+        capability = ['hmac-v4-s3']
+        with mock.patch.object(self.service_connection,
+                               '_required_auth_capability',
+                               return_value=capability):
+            with mock.patch('boto.s3.key.compute_hash',
+                            wraps=compute_hash) as hasher:
+                self.key.set_contents_from_file(BytesIO(self.data),
+                                                single_pass=True)
+                self.assertFalse(hasher.called)
+
+                # Without single_pass, send_file doesn't assume the
+                # data will only be read once, even with no MD5 set.
+                self.key.md5 = None
+                self.key.send_file(BytesIO(self.data))
+                self.assertTrue(hasher.called)
+
+    def test_single_pass_over_http_with_sigv4_reads_twice(self):
+        self.set_http_response(status_code=200, header=[('etag', self.etag)])
+        self.service_connection.is_secure = False
+        fp = CountingBytesIO(self.data)
+        with mock.patch.object(self.service_connection,
+                               '_required_auth_capability',
+                               return_value=['hmac-v4-s3']):
+            with mock.patch('boto.log.warning') as warning:
+                self.key.set_contents_from_file(fp, single_pass=True)
+        # Once to sign the SHA256, once to send.
+        self.assertEqual(fp.bytes_read, 2 * len(self.data))
+        self.assertNotEqual(self.actual_request.headers.get('_sha256'),
+                            'UNSIGNED-PAYLOAD')
+        self.assertTrue(warning.called)
+
+
+class TestS3KeyUploadBody(AWSMockServiceTestCase):
+    connection_class = S3Connection
+
+    def setUp(self):
+        super(TestS3KeyUploadBody, self).setUp()
+        self.data = b'0123456789' * 1000
+        self.etag = '"%s"' % hashlib.md5(self.data).hexdigest()
+        self.key = Bucket(self.service_connection, 'mybucket').new_key('k')
+        self.key.BufferSize = 100
+        self.key.SendBufferSize = 3000
+
+    def upload(self, fp, **kwargs):
+        self.set_http_response(status_code=200, header=[('etag', self.etag)])
+        self.https_connection.send.reset_mock()
+        cb = mock.Mock()
+        self.key.set_contents_from_file(fp, cb=cb, num_cb=7, **kwargs)
+        sent = [bytes(c[0][0])
+                for c in self.https_connection.send.call_args_list]
+        return sent, [c[0] for c in cb.call_args_list]
+
+    def test_callbacks_match_piecewise_reads(self):
+        sent, calls = self.upload(BytesIO(self.data))
+        expected_sent, expected_calls = self.upload(CountingBytesIO(self.data))
+        self.assertEqual(calls, expected_calls)
+        self.assertEqual(b''.join(sent), self.data)
+        self.assertEqual(b''.join(expected_sent), self.data)
+        # Blocks rather than BufferSize pieces are sent.
+        self.assertTrue(len(sent) < len(expected_sent))
+        self.assertTrue(max(len(s) for s in sent) > self.key.BufferSize)
+
+    def test_size_limits_reads_from_files(self):
+        with tempfile.TemporaryFile() as fp:
+            fp.write(self.data)
+            fp.seek(0)
+            self.etag = '"%s"' % hashlib.md5(self.data[:2500]).hexdigest()
+            sent, calls = self.upload(
+                fp, size=2500, headers={'Content-Type': 'text/plain'})
+            self.assertEqual(b''.join(sent), self.data[:2500])
+            self.assertEqual(fp.tell(), 2500)
+            self.assertEqual(calls[-1], (2500, 2500))
+
+
+class FakeSocketConnection(object):
+    def __init__(self, sock):
+        self.sock = sock
+
+    def send(self, data):
+        self.sock.sendall(data)
+
+
+class TestUploadBody(unittest.TestCase):
+    def setUp(self):
+        self.sock, self.peer = socket.socketpair()
+        self.peer.settimeout(5)
+        self.data = b'0123456789' * 100
+
+    def tearDown(self):
+        self.sock.close()
+        self.peer.close()
+
+    def received(self):
+        self.sock.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = self.peer.recv(65536)
+            if not chunk:
+                return b''.join(chunks)
+            chunks.append(chunk)
+
+    def send_all(self, body, piece_size=100):
+        total = 0
+        try:
+            while True:
+                n = body.advance(piece_size)
+                if not n:
+                    break
+                total += n
+            body.finish()
+        finally:
+            body.close()
+        return total
+
+    def test_chunks_are_framed_per_block(self):
+        digester = hashlib.md5()
+        body = _UploadBody(BytesIO(self.data), FakeSocketConnection(self.sock),
+                           {'md5': digester}, True, None, 600, True)
+        self.assertEqual(self.send_all(body), 1000)
+        self.assertEqual(self.received(),
+                         b'258;\r\n' + self.data[:600] + b'\r\n' +
+                         b'190;\r\n' + self.data[600:] + b'\r\n0\r\n\r\n')
+        self.assertEqual(digester.digest(), hashlib.md5(self.data).digest())
+
+    @unittest.skipUnless(hasattr(socket.socket, 'sendfile'),
+                         'socket.sendfile is not available')
+    def test_plain_files_are_sent_with_sendfile(self):
+        with tempfile.TemporaryFile() as fp:
+            fp.write(self.data)
+            fp.seek(100)
+            with mock.patch.object(socket.socket, 'sendfile', autospec=True,
+                                   side_effect=socket.socket.sendfile) as sf:
+                body = _UploadBody(fp, FakeSocketConnection(self.sock), {},
+                                   False, 500, 300, True)
+                self.assertEqual(self.send_all(body), 500)
+            self.assertEqual(self.received(), self.data[100:600])
+            self.assertEqual([c[0][2:] for c in sf.call_args_list],
+                             [(100, 300), (400, 200)])
+            self.assertEqual(fp.tell(), 600)
+
+    def test_hashed_files_are_read_into_a_buffer(self):
+        with tempfile.TemporaryFile() as fp:
+            fp.write(self.data)
+            fp.seek(0)
+            digester = hashlib.md5()
+            body = _UploadBody(fp, FakeSocketConnection(self.sock),
+                               {'md5': digester}, False, None, 300, True)
+            self.assertEqual(self.send_all(body), 1000)
+            self.assertEqual(self.received(), self.data)
+            self.assertEqual(digester.digest(),
+                             hashlib.md5(self.data).digest())
+
+    def test_bytesio_without_getbuffer_is_read_into_a_buffer(self):
+        # As on Python 2, where BytesIO has no getbuffer method.
+        fp = BytesIO(self.data)
+        with mock.patch.object(_UploadBody, '_memory_view',
+                               return_value=None):
+            body = _UploadBody(fp, FakeSocketConnection(self.sock), {},
+                               False, None, 300, True)
+        self.assertFalse(body._ranged)
+        self.assertEqual(self.send_all(body), 1000)
+        self.assertEqual(self.received(), self.data)
+        self.assertEqual(fp.tell(), 1000)
+
+
+class ReadIntoResponse(object):
+    """
+    A response body that hands out at most ``max_read`` bytes per read.
+    """
+    def __init__(self, data, max_read=None):
+        self.fp = BytesIO(data)
+        self.max_read = max_read
+        self.sizes = []
+
+    def readinto(self, b):
+        if self.max_read is not None:
+            b = memoryview(b)[:self.max_read]
+        n = self.fp.readinto(b)
+        self.sizes.append(len(b))
+        return n
+
+    def read(self, size=None):
+        return self.fp.read(size)
+
+
+class TestS3KeyReadInto(unittest.TestCase):
+    def setUp(self):
+        self.bucket = Bucket(S3Connection('access_key', 'secret_key'),
+                             'mybucket')
+        self.key = self.bucket.new_key('k')
+        self.data = b'0123456789' * 1000
+        self.key.MinReadIntoBufferSize = 1000
+        self.key.MaxReadIntoBufferSize = 4000
+
+    def get_file(self, response, fp=None, **kwargs):
+        self.key.resp = response
+        fp = fp or BytesIO()
+        self.key.get_file(fp, **kwargs)
+        return fp
+
+    def test_download_is_hashed_in_place(self):
+        response = ReadIntoResponse(self.data)
+        fp = self.get_file(response)
+        self.assertEqual(fp.getvalue(), self.data)
+        self.assertEqual(self.key.local_hashes['md5'],
+                         hashlib.md5(self.data).digest())
+        # The buffer doubles as long as reads fill it.
+        self.assertEqual(response.sizes[:4], [1000, 2000, 4000, 4000])
+        self.assertIsNone(self.key.resp)
+
+    def test_buffer_stays_small_for_short_reads(self):
+        response = ReadIntoResponse(self.data, max_read=500)
+        self.get_file(response)
+        self.assertEqual(set(response.sizes), set([500]))
+
+    def test_buffer_is_no_bigger_than_the_key(self):
+        self.key.size = 10
+        response = ReadIntoResponse(self.data[:10])
+        self.assertEqual(self.get_file(response).getvalue(), self.data[:10])
+        self.assertEqual(response.sizes, [10, 10])
+
+    def test_callbacks_are_spaced_by_bytes(self):
+        self.key.size = len(self.data)
+        cb = mock.Mock()
+        self.get_file(ReadIntoResponse(self.data, max_read=100), cb=cb,
+                      num_cb=3)
+        self.assertEqual([c[0] for c in cb.call_args_list],
+                         [(0, 10000), (5000, 10000), (10000, 10000)])
+
+    def test_writes_to_objects_without_buffer_support(self):
+        class Sink(object):
+            def __init__(self):
+                self.chunks = []
+
+            def write(self, data):
+                self.chunks.append(data)
+
+        sink = self.get_file(ReadIntoResponse(self.data), fp=Sink())
+        self.assertEqual(b''.join(sink.chunks), self.data)
+        self.assertTrue(all(isinstance(c, bytes) for c in sink.chunks))
+
+    def test_readinto(self):
+        self.key.resp = ReadIntoResponse(self.data)
+        buf = bytearray(4)
+        self.assertEqual(self.key.readinto(buf), 4)
+        self.assertEqual(buf, bytearray(b'0123'))
+
+
 class TestFileError(unittest.TestCase):
     def test_file_error(self):
         key = Key()
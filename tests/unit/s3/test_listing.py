@@ -0,0 +1,335 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+import socket
+import threading
+
+from tests.compat import mock, unittest
+
+from boto.compat import BytesIO, http_client, parse_qs
+from boto.exception import S3ResponseError
+from boto.s3.bucket import Bucket
+from boto.s3.connection import S3Connection
+from boto.s3.key import Key
+from boto.s3.listing import KeyRecord
+from boto.s3.prefix import Prefix
+
+
+def listing_xml(names, prefixes=(), truncated=False, next_marker=None):
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>\n'
+             '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+             '<Name>mybucket</Name>'
+             '<IsTruncated>%s</IsTruncated>' % ('true' if truncated
+                                                else 'false')]
+    if next_marker:
+        parts.append('<NextMarker>%s</NextMarker>' % next_marker)
+    for i, name in enumerate(names):
+        parts.append('<Contents><Key>%s</Key>'
+                     '<LastModified>2015-03-01T12:00:00.000Z</LastModified>'
+                     '<ETag>&quot;etag%d&quot;</ETag><Size>%d</Size>'
+                     '<Owner><ID>id</ID><DisplayName>me</DisplayName></Owner>'
+                     '<StorageClass>STANDARD</StorageClass></Contents>'
+                     % (name, i, i))
+    for prefix in prefixes:
+        parts.append('<CommonPrefixes><Prefix>%s</Prefix></CommonPrefixes>'
+                     % prefix)
+    parts.append('</ListBucketResult>')
+    return ''.join(parts).encode('utf-8')
+
+
+class FakeResponse(object):
+    def __init__(self, body, status=200):
+        self.status = status
+        self.reason = ''
+        self.fp = BytesIO(body)
+        self.reads = 0
+        self.closed = False
+
+    def read(self, size=None):
+        self.reads += 1
+        return self.fp.read(size)
+
+    def close(self):
+        self.closed = True
+
+
+class TestStreamingListing(unittest.TestCase):
+    def setUp(self):
+        self.connection = S3Connection('access_key', 'secret_key')
+        self.connection.make_request = mock.Mock()
+        self.bucket = Bucket(self.connection, 'mybucket')
+
+    def respond(self, *bodies):
+        self.responses = [FakeResponse(body) for body in bodies]
+        self.connection.make_request.side_effect = self.responses
+
+    def test_entries_are_parsed_like_get_all_keys(self):
+        self.respond(listing_xml(['a', 'b'], prefixes=['c/']))
+        listing = self.bucket.iter_all_keys(delimiter='/')
+        entries = list(listing)
+        self.assertEqual([type(e) for e in entries], [Key, Key, Prefix])
+        self.assertEqual([e.name for e in entries], ['a', 'b', 'c/'])
+        self.assertEqual(entries[1].size, 1)
+        self.assertEqual(entries[1].etag, '"etag1"')
+        self.assertEqual(entries[1].owner.display_name, 'me')
+        self.assertFalse(listing.is_truncated)
+        query_args = self.connection.make_request.call_args[1]['query_args']
+        self.assertEqual(query_args, 'delimiter=/')
+
+    def test_entries_are_yielded_before_the_page_is_read(self):
+        self.respond(listing_xml(['key%04d' % i for i in range(500)]))
+        listing = self.bucket.iter_all_keys()
+        listing.ChunkSize = 1024
+        entries = iter(listing)
+        self.assertEqual(next(entries).name, 'key0000')
+        self.assertEqual(self.responses[0].reads, 1)
+        self.assertEqual(len(list(entries)), 499)
+
+    def test_stopping_early_closes_the_response(self):
+        self.respond(listing_xml(['key%04d' % i for i in range(500)]))
+        listing = self.bucket.iter_all_keys()
+        listing.ChunkSize = 1024
+        entries = iter(listing)
+        next(entries)
+        entries.close()
+        self.assertTrue(self.responses[0].closed)
+
+    def test_key_records(self):
+        self.respond(listing_xml(['a']))
+        record, = self.bucket.iter_all_keys(key_class=KeyRecord)
+        self.assertIsInstance(record, KeyRecord)
+        self.assertEqual((record.name, record.size, record.etag,
+                          record.last_modified, record.storage_class),
+                         ('a', 0, '"etag0"', '2015-03-01T12:00:00.000Z',
+                          'STANDARD'))
+
+    def test_key_records_are_compact(self):
+        record = KeyRecord(self.bucket, 'a')
+        self.assertFalse(hasattr(record, '__dict__'))
+        with self.assertRaises(AttributeError):
+            record.something_new = 1
+
+    def test_key_records_do_not_promote_implicitly(self):
+        record = KeyRecord(self.bucket, 'a')
+        with self.assertRaises(AttributeError):
+            record.content_type
+        with self.assertRaises(AttributeError):
+            record.get_contents_as_string
+        self.assertIsNone(record._key)
+
+    def test_key_record_listing_fields(self):
+        body = listing_xml(['a']).replace(
+            b'<StorageClass>', b'<VersionId>v1</VersionId>'
+            b'<IsLatest>true</IsLatest><StorageClass>')
+        self.respond(body)
+        record, = self.bucket.list(key_class=KeyRecord)
+        self.assertEqual((record.version_id, record.is_latest),
+                         ('v1', True))
+        self.assertEqual((record.owner.id, record.owner.display_name),
+                         ('id', 'me'))
+        self.assertIsNone(record._key)
+        key = record.to_key()
+        self.assertEqual((key.version_id, key.is_latest, key.owner.id),
+                         ('v1', True, 'id'))
+
+    def test_key_record_promotes_to_key(self):
+        self.respond(listing_xml(['a', 'b']))
+        records = list(self.bucket.list(key_class=KeyRecord))
+        self.assertEqual([type(r) for r in records], [KeyRecord, KeyRecord])
+        record = records[1]
+        self.assertIsNone(record._key)
+
+        key = record.to_key()
+        self.assertIsInstance(key, Key)
+        self.assertIs(key.bucket, self.bucket)
+        self.assertEqual((key.name, key.size, key.etag, key.storage_class),
+                         ('b', 1, '"etag1"', 'STANDARD'))
+        self.assertIs(record.to_key(), key)
+        self.assertEqual(record.version_id, None)
+
+    def test_error_is_raised_before_iteration(self):
+        self.connection.make_request.return_value = FakeResponse(
+            b'<Error><Code>NoSuchBucket</Code></Error>', status=404)
+        with self.assertRaises(S3ResponseError):
+            self.bucket.iter_all_keys()
+
+    def test_list_pages_through_streaming_listings(self):
+        self.respond(listing_xml(['a', 'b'], truncated=True),
+                     listing_xml(['c'], truncated=True, next_marker='m'),
+                     listing_xml(['n']))
+        names = [k.name for k in self.bucket.list(stream=True)]
+        self.assertEqual(names, ['a', 'b', 'c', 'n'])
+        markers = [c[1]['query_args']
+                   for c in self.connection.make_request.call_args_list]
+        self.assertEqual(markers, ['', 'marker=b', 'marker=m'])
+
+    def broken_response(self, body, cut_before):
+        # A response whose connection fails just before ``cut_before``.
+        broken = FakeResponse(body)
+        cut = body.index(cut_before)
+
+        def read(size=None):
+            if broken.fp.tell() >= cut:
+                raise http_client.IncompleteRead(b'')
+            return broken.fp.read(min(size, cut - broken.fp.tell()))
+
+        broken.read = read
+        return broken
+
+    def test_list_does_not_stream_by_default(self):
+        self.respond(listing_xml(['a', 'b']))
+        with mock.patch.object(Bucket, 'iter_all_keys') as iter_all_keys:
+            names = [k.name for k in self.bucket.list(key_class=KeyRecord)]
+        self.assertEqual(names, ['a', 'b'])
+        self.assertFalse(iter_all_keys.called)
+
+    def test_list_resumes_after_connection_error(self):
+        body = listing_xml(['a', 'b', 'c'], truncated=True)
+        self.connection.make_request.side_effect = [
+            self.broken_response(body, b'<Contents><Key>c'),
+            FakeResponse(listing_xml(['c', 'd']))]
+        names = [k.name for k in self.bucket.list(stream=True)]
+        self.assertEqual(names, ['a', 'b', 'c', 'd'])
+        markers = [c[1]['query_args']
+                   for c in self.connection.make_request.call_args_list]
+        self.assertEqual(markers, ['', 'marker=b'])
+
+    def test_list_gives_up_after_num_retries(self):
+        self.connection.num_retries = 1
+        response = mock.Mock(status=200)
+        response.read.side_effect = socket.error('reset')
+        self.connection.make_request.return_value = response
+        with self.assertRaises(socket.error):
+            list(self.bucket.list(stream=True))
+        self.assertEqual(self.connection.make_request.call_count, 2)
+
+    def test_delimited_list_resumes_after_mid_page_error(self):
+        body = listing_xml(['a', 'c'], ['b/', 'd/'], truncated=True,
+                           next_marker='d/')
+        self.connection.make_request.side_effect = [
+            self.broken_response(body, b'<CommonPrefixes><Prefix>d/'),
+            FakeResponse(body),
+            FakeResponse(listing_xml(['e']))]
+        entries = list(self.bucket.list(delimiter='/', stream=True))
+        # Resuming after 'b/' or 'c' would have lost or repeated entries.
+        self.assertEqual([entry.name for entry in entries],
+                         ['a', 'c', 'b/', 'd/', 'e'])
+        self.assertIsInstance(entries[2], Prefix)
+        markers = [parse_qs(c[1]['query_args']).get('marker')
+                   for c in self.connection.make_request.call_args_list]
+        self.assertEqual(markers, [None, None, ['d/']])
+
+
+class FakeListingS3(object):
+    """
+    Answers List Objects requests from a sorted list of key names, a few
+    keys per page.
+    """
+    PageSize = 3
+
+    def __init__(self, names):
+        self.names = sorted(names)
+        self.requests = []
+        self.fail_prefix = None
+        self.lock = threading.Lock()
+
+    def make_request(self, method, bucket, key=None, headers=None,
+                     query_args=None):
+        params = dict((k, v[0]) for k, v in
+                      parse_qs(query_args or '').items())
+        prefix = params.get('prefix', '')
+        delimiter = params.get('delimiter')
+        marker = params.get('marker', '')
+        with self.lock:
+            self.requests.append(params)
+        if self.fail_prefix is not None and prefix == self.fail_prefix:
+            return FakeResponse(b'<Error><Code>InternalError</Code></Error>',
+                                status=500)
+        names, prefixes = [], []
+        last = None
+        for name in self.names:
+            if not name.startswith(prefix) or name <= marker:
+                continue
+            if len(names) + len(prefixes) == self.PageSize:
+                return FakeResponse(listing_xml(names, prefixes, True, last))
+            rest = name[len(prefix):]
+            if delimiter and delimiter in rest:
+                common = prefix + rest.split(delimiter)[0] + delimiter
+                if prefixes and prefixes[-1] == common:
+                    continue
+                if common <= marker:
+                    continue
+                prefixes.append(common)
+                # Skip everything else under this prefix.
+                marker = common + u'\uffff'
+                last = common
+            else:
+                names.append(name)
+                last = name
+        return FakeResponse(listing_xml(names, prefixes))
+
+
+class TestParallelLister(unittest.TestCase):
+    def setUp(self):
+        self.names = (['a.txt', 'b/1', 'b/2', 'b/3', 'b/4', 'c', 'd/1',
+                       'd/x/2', 'e/1', 'f'] +
+                      ['g/%02d' % i for i in range(10)])
+        self.s3 = FakeListingS3(self.names)
+        connection = S3Connection('access_key', 'secret_key')
+        connection.make_request = self.s3.make_request
+        self.bucket = Bucket(connection, 'mybucket')
+
+    def test_ordered_listing_matches_list(self):
+        self.assertEqual([k.name for k in self.bucket.list()], self.names)
+        lister = self.bucket.list_parallel(num_threads=3)
+        self.assertEqual([k.name for k in lister], self.names)
+        shard_prefixes = set(r.get('prefix') for r in self.s3.requests
+                             if 'delimiter' not in r)
+        self.assertTrue(set(['b/', 'd/', 'e/', 'g/']) <= shard_prefixes)
+
+    def test_unordered_listing(self):
+        lister = self.bucket.list_parallel(num_threads=3, ordered=False)
+        self.assertEqual(sorted(k.name for k in lister), self.names)
+
+    def test_prefix_and_key_class(self):
+        lister = self.bucket.list_parallel(prefix='d/', key_class=KeyRecord)
+        records = list(lister)
+        self.assertEqual([r.name for r in records], ['d/1', 'd/x/2'])
+        self.assertIsInstance(records[0], KeyRecord)
+
+    def test_shard_errors_are_raised(self):
+        self.s3.fail_prefix = 'g/'
+        for ordered in (True, False):
+            lister = self.bucket.list_parallel(num_threads=2,
+                                               ordered=ordered)
+            with self.assertRaises(S3ResponseError):
+                list(lister)
+
+    def test_stopping_early(self):
+        lister = self.bucket.list_parallel(num_threads=2)
+        lister.max_buffered = 1
+        entries = iter(lister)
+        self.assertEqual(next(entries).name, 'a.txt')
+        entries.close()
+        self.assertTrue(lister._pool.stopped)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+import re
+import threading
+import xml.sax.saxutils
+
+from tests.compat import mock, unittest
+
+from boto.exception import S3ResponseError
+from boto.s3.bucket import Bucket
+from boto.s3.connection import S3Connection
+from boto.s3.multidelete import MultiDeleter, build_delete_xml
+from boto.s3.prefix import Prefix
+
+
+class FakeResponse(object):
+    def __init__(self, status, body):
+        self.status = status
+        self.reason = ''
+        self.body = body
+
+    def read(self):
+        return self.body
+
+
+class FakeMultiDeleteS3(object):
+    """
+    Answers Multi-Object Delete requests, failing keys listed in
+    ``fail_keys`` with the given code the given number of times.
+    """
+    def __init__(self):
+        self.requests = []
+        self.fail_keys = {}
+        self.fail_requests = 0
+        self.lock = threading.Lock()
+
+    def make_request(self, method, bucket, headers=None, query_args=None,
+                     data=None):
+        names = [xml.sax.saxutils.unescape(n) for n in
+                 re.findall(r'<Key>(.*?)</Key>', data.decode('utf-8'))]
+        quiet = b'<Quiet>true</Quiet>' in data
+        with self.lock:
+            self.requests.append(names)
+            if self.fail_requests:
+                self.fail_requests -= 1
+                return FakeResponse(503, b'<Error><Code>SlowDown</Code>'
+                                         b'</Error>')
+            parts = ['<DeleteResult>']
+            for name in names:
+                code, times = self.fail_keys.get(name, (None, 0))
+                if times:
+                    self.fail_keys[name] = (code, times - 1)
+                    parts.append('<Error><Key>%s</Key><Code>%s</Code>'
+                                 '<Message>failed</Message></Error>' %
+                                 (xml.sax.saxutils.escape(name), code))
+                elif not quiet:
+                    parts.append('<Deleted><Key>%s</Key></Deleted>' %
+                                 xml.sax.saxutils.escape(name))
+            parts.append('</DeleteResult>')
+        return FakeResponse(200, ''.join(parts).encode('utf-8'))
+
+
+class TestDeleteKeys(unittest.TestCase):
+    def setUp(self):
+        self.s3 = FakeMultiDeleteS3()
+        connection = S3Connection('access_key', 'secret_key')
+        connection.make_request = self.s3.make_request
+        self.bucket = Bucket(connection, 'mybucket')
+        self.names = ['key-%05d' % i for i in range(2500)]
+
+    def test_build_delete_xml(self):
+        data = build_delete_xml([('a&b', None), ('c', 'v1')], quiet=True)
+        self.assertEqual(data, b'<?xml version="1.0" encoding="UTF-8"?>'
+                               b'<Delete><Quiet>true</Quiet>'
+                               b'<Object><Key>a&amp;b</Key></Object>'
+                               b'<Object><Key>c</Key>'
+                               b'<VersionId>v1</VersionId></Object>'
+                               b'</Delete>')
+
+    def test_serial_delete_batches_requests(self):
+        result = self.bucket.delete_keys(iter(self.names + [Prefix(
+            self.bucket, 'dir/')]))
+        self.assertEqual([len(r) for r in self.s3.requests],
+                         [1000, 1000, 500])
+        self.assertEqual(len(result.deleted), 2500)
+        self.assertEqual([(e.key, e.code) for e in result.errors],
+                         [('dir/', 'PrefixSkipped')])
+
+    def test_parallel_delete(self):
+        progress = mock.Mock()
+        result = self.bucket.delete_keys(self.names, num_threads=3,
+                                         progress_callback=progress)
+        self.assertEqual(sorted(len(r) for r in self.s3.requests),
+                         [500, 1000, 1000])
+        self.assertEqual(sorted(d.key for d in result.deleted), self.names)
+        stats = progress.call_args[0][0]
+        self.assertEqual(stats['keys_deleted'], 2500)
+        self.assertEqual(stats['requests'], 3)
+
+    def test_transient_key_errors_are_retried(self):
+        self.s3.fail_keys['key-00010'] = ('InternalError', 2)
+        self.s3.fail_keys['key-00020'] = ('AccessDenied', 1)
+        batches = []
+        with mock.patch('time.sleep'):
+            result = self.bucket.delete_keys(self.names, quiet=True,
+                                             num_threads=2,
+                                             batch_callback=batches.append)
+        self.assertEqual(result.deleted, [])
+        self.assertEqual(result.errors, [])
+        errors = [e.key for b in batches for e in b.errors]
+        self.assertEqual(errors, ['key-00020'])
+        self.assertIn(['key-00010'], self.s3.requests)
+
+    def test_server_errors_are_retried(self):
+        self.s3.fail_requests = 2
+        with mock.patch('time.sleep'):
+            result = self.bucket.delete_keys(self.names[:10], num_threads=2)
+        self.assertEqual(len(result.deleted), 10)
+        self.assertEqual(len(self.s3.requests), 3)
+
+    def test_persistent_failure_is_raised(self):
+        self.s3.fail_requests = 100
+        with mock.patch('time.sleep'):
+            with self.assertRaises(S3ResponseError):
+                self.bucket.delete_keys(self.names, num_threads=2)
+
+    def test_workers_stop_after_a_failure(self):
+        self.s3.fail_requests = 100
+        deleter = MultiDeleter(self.bucket, num_threads=1, num_retries=1)
+        with mock.patch('time.sleep'):
+            with self.assertRaises(S3ResponseError):
+                deleter.delete(self.names)
+        # Only the failed batch was sent; the queued ones were dropped.
+        self.assertEqual([r[0] for r in self.s3.requests],
+                         ['key-00000', 'key-00000'])
+
+    def test_callbacks_may_read_stats(self):
+        seen = []
+        deleter = MultiDeleter(
+            self.bucket, num_threads=2,
+            batch_callback=lambda r: seen.append(deleter.stats()),
+            progress_callback=lambda stats: seen.append(deleter.stats()))
+        deleter.delete(self.names)
+        self.assertEqual(len(seen), 6)
+        self.assertEqual(seen[-1]['keys_deleted'], 2500)
+
+
+if __name__ == '__main__':
+    unittest.main()
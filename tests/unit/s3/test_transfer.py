@@ -0,0 +1,402 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+
+from tests.compat import mock, unittest
+
+from boto.compat import BytesIO
+from boto.exception import S3CopyError, S3ResponseError
+from boto.s3.bucket import Bucket
+from boto.s3.connection import S3Connection
+from boto.s3.key import Key
+from boto.s3.multipart import MultiPartUpload, Part
+from boto.s3.transfer import MultipartCopier, MultipartUploader, \
+    ParallelDownloader
+
+
+class FakeRangeResponse(object):
+    def __init__(self, status, data=b'', truncate_at=None):
+        self.status = status
+        self.reason = ''
+        if truncate_at is not None:
+            data = data[:truncate_at]
+        self.fp = BytesIO(data)
+
+    def read(self, size=None):
+        return self.fp.read(size)
+
+    def close(self):
+        pass
+
+
+class FakeReadIntoResponse(FakeRangeResponse):
+    def readinto(self, b):
+        return self.fp.readinto(b)
+
+
+class FakeS3(object):
+    """
+    Serves Range GETs of ``data``, recording every range requested.
+    """
+    response_class = FakeRangeResponse
+
+    def __init__(self, data, etag):
+        self.data = data
+        self.etag = etag
+        self.requests = []
+        self.truncate = {}
+        self.lock = threading.Lock()
+
+    def make_request(self, method, bucket, key, headers, query_args=None):
+        start, end = [int(n) for n in
+                      re.match(r'bytes=(\d+)-(\d+)',
+                               headers['Range']).groups()]
+        with self.lock:
+            self.requests.append((start, end))
+            truncate_at = self.truncate.pop(start, None)
+        if headers.get('If-Match') != self.etag:
+            return self.response_class(412)
+        return self.response_class(206, self.data[start:end + 1], truncate_at)
+
+
+class TestParallelDownloader(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'download')
+        self.tracker = os.path.join(self.tmpdir, 'tracker')
+        self.data = os.urandom(1000)
+        self.etag = '"%s"' % hashlib.md5(self.data).hexdigest()
+        self.s3 = FakeS3(self.data, self.etag)
+        connection = S3Connection('access_key', 'secret_key')
+        connection.make_request = self.s3.make_request
+        self.key = Key(Bucket(connection, 'mybucket'), 'mykey')
+        self.key.size = len(self.data)
+        self.key.etag = self.etag
+        self.key.BufferSize = 64
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def read_file(self):
+        with open(self.filename, 'rb') as f:
+            return f.read()
+
+    def test_download_in_ranges(self):
+        downloader = ParallelDownloader(self.key, num_threads=4,
+                                        part_size=300, verify_etag=True)
+        downloader.download(self.filename)
+        self.assertEqual(self.read_file(), self.data)
+        self.assertEqual(sorted(self.s3.requests),
+                         [(0, 299), (300, 599), (600, 899), (900, 999)])
+
+    def test_download_with_readinto(self):
+        self.s3.response_class = FakeReadIntoResponse
+        self.s3.truncate[300] = 100
+        self.key.MinReadIntoBufferSize = 64
+        downloader = ParallelDownloader(self.key, num_threads=4,
+                                        part_size=300, verify_etag=True)
+        downloader.download(self.filename)
+        self.assertEqual(self.read_file(), self.data)
+        self.assertIn((400, 599), self.s3.requests)
+
+    def test_truncated_range_is_retried_from_last_byte(self):
+        self.s3.truncate[300] = 100
+        downloader = ParallelDownloader(self.key, num_threads=2,
+                                        part_size=300)
+        with mock.patch('time.sleep'):
+            downloader.download(self.filename)
+        self.assertEqual(self.read_file(), self.data)
+        self.assertIn((400, 599), self.s3.requests)
+
+    def test_changed_object_fails(self):
+        self.s3.etag = '"other"'
+        downloader = ParallelDownloader(self.key, num_threads=2,
+                                        part_size=300)
+        with self.assertRaises(S3ResponseError) as cm:
+            downloader.download(self.filename)
+        self.assertEqual(cm.exception.status, 412)
+
+    def test_resume_from_tracker_file(self):
+        self.s3.truncate[300] = 100
+        downloader = ParallelDownloader(self.key, num_threads=1,
+                                        part_size=300, num_retries=0,
+                                        tracker_file_name=self.tracker)
+        with self.assertRaises(Exception):
+            downloader.download(self.filename)
+        self.assertTrue(os.path.exists(self.tracker))
+
+        self.s3.requests = []
+        downloader = ParallelDownloader(self.key, num_threads=2,
+                                        part_size=300,
+                                        tracker_file_name=self.tracker)
+        downloader.download(self.filename)
+        self.assertEqual(self.read_file(), self.data)
+        self.assertEqual(downloader.resumed_bytes, 400)
+        self.assertEqual(sorted(self.s3.requests),
+                         [(400, 599), (600, 899), (900, 999)])
+        self.assertFalse(os.path.exists(self.tracker))
+
+    def test_get_contents_to_filename_with_threads(self):
+        cb = mock.Mock()
+        self.key.get_contents_to_filename(self.filename, cb=cb,
+                                          num_threads=3, part_size=256)
+        self.assertEqual(self.read_file(), self.data)
+        self.assertEqual(len(self.s3.requests), 4)
+        cb.assert_called_with(1000, 1000)
+
+
+class FakeMultiPartUpload(MultiPartUpload):
+    def __init__(self, bucket, key_name, fail_parts=None):
+        super(FakeMultiPartUpload, self).__init__(bucket)
+        self.key_name = key_name
+        self.id = 'upload-id'
+        self.uploaded = {}
+        self.parts = []
+        self.fail_parts = fail_parts or {}
+        self.lock = threading.Lock()
+
+    def __iter__(self):
+        return iter(self.parts)
+
+    def upload_part_from_file(self, fp, part_num, md5=None, size=None,
+                              **kwargs):
+        with self.lock:
+            if self.fail_parts.get(part_num):
+                self.fail_parts[part_num] -= 1
+                raise IOError('connection reset')
+        data = fp.read(size)
+        self.uploaded[part_num] = data
+        key = Key(self.bucket, self.key_name)
+        key.etag = '"%s"' % hashlib.md5(data).hexdigest()
+        return key
+
+
+class TestMultipartUploader(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'upload')
+        self.data = os.urandom(2500)
+        with open(self.filename, 'wb') as f:
+            f.write(self.data)
+        connection = S3Connection('access_key', 'secret_key')
+        self.bucket = Bucket(connection, 'mybucket')
+        self.mp = FakeMultiPartUpload(self.bucket, 'mykey')
+        self.bucket.initiate_multipart_upload = mock.Mock(
+            return_value=self.mp)
+        self.bucket.complete_multipart_upload = mock.Mock()
+        self.bucket.get_all_multipart_uploads = mock.Mock(return_value=[])
+        self.mp.cancel_upload = mock.Mock()
+        self.uploader = MultipartUploader(self.bucket, num_threads=3,
+                                          part_size=1000)
+        self.uploader.MIN_PART_SIZE = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def assert_uploaded(self):
+        self.assertEqual(sorted(self.mp.uploaded), [1, 2, 3])
+        self.assertEqual(b''.join(self.mp.uploaded[i] for i in (1, 2, 3)),
+                         self.data)
+        key_name, upload_id, xml = \
+            self.bucket.complete_multipart_upload.call_args[0]
+        self.assertEqual((key_name, upload_id), ('mykey', 'upload-id'))
+        self.assertEqual(xml.count('<Part>'), 3)
+        self.assertIn('<PartNumber>3</PartNumber><ETag>"%s"</ETag>' %
+                      hashlib.md5(self.data[2000:]).hexdigest(), xml)
+
+    def test_upload_filename(self):
+        self.uploader.upload('mykey', self.filename)
+        self.assert_uploaded()
+
+    def test_upload_stream(self):
+        with open(self.filename, 'rb') as f:
+            self.uploader.upload('mykey', f)
+        self.assert_uploaded()
+
+    def test_upload_memoryview(self):
+        self.uploader.upload('mykey', memoryview(self.data))
+        self.assert_uploaded()
+
+    def test_part_size_grows_to_fit_part_limit(self):
+        self.uploader.MAX_PARTS = 2
+        self.uploader.upload('mykey', self.data)
+        self.assertEqual(sorted(self.mp.uploaded), [1, 2])
+
+    def test_failed_part_is_retried(self):
+        self.mp.fail_parts[2] = 2
+        with mock.patch('time.sleep'):
+            self.uploader.upload('mykey', self.data)
+        self.assert_uploaded()
+
+    def test_failure_cancels_upload(self):
+        self.mp.fail_parts[2] = 10
+        with mock.patch('time.sleep'):
+            with self.assertRaises(IOError):
+                self.uploader.upload('mykey', self.data)
+        self.assertTrue(self.mp.cancel_upload.called)
+        self.assertFalse(self.bucket.complete_multipart_upload.called)
+
+    def test_resume_skips_uploaded_parts(self):
+        part = Part(self.bucket)
+        part.part_number = 1
+        part.size = 1000
+        part.etag = '"%s"' % hashlib.md5(self.data[:1000]).hexdigest()
+        self.mp.parts = [part]
+        self.bucket.get_all_multipart_uploads.return_value = [self.mp]
+        self.uploader.upload('mykey', self.filename, resume=True)
+        self.assertFalse(self.bucket.initiate_multipart_upload.called)
+        self.assertEqual(sorted(self.mp.uploaded), [2, 3])
+        self.assertEqual(
+            self.bucket.complete_multipart_upload.call_args[0][2].count(
+                '<Part>'), 3)
+
+
+class FakeCopyUpload(FakeMultiPartUpload):
+    def copy_part_from_key(self, src_bucket_name, src_key_name, part_num,
+                           start=None, end=None, src_version_id=None,
+                           headers=None):
+        with self.lock:
+            self.copies.append((part_num, start, end, headers))
+            error, times = self.fail_parts.get(part_num, (None, 0))
+            if times:
+                self.fail_parts[part_num] = (error, times - 1)
+                raise error
+        key = Key(self.bucket, self.key_name)
+        key.etag = '"part%d"' % part_num
+        return key
+
+
+class TestMultipartCopier(unittest.TestCase):
+    def setUp(self):
+        connection = S3Connection('access_key', 'secret_key')
+        self.bucket = Bucket(connection, 'mybucket')
+        self.src_key = Key(self.bucket, 'src')
+        self.src_key.size = 2500
+        self.src_key.etag = '"srcetag"'
+        self.src_key.last_modified = 'Sun, 01 Mar 2015 12:00:00 GMT'
+        self.src_key.metadata = {'colour': 'blue'}
+        self.src_key.content_type = 'text/plain'
+        self.bucket.get_key = mock.Mock(return_value=self.src_key)
+        self.mp = FakeCopyUpload(self.bucket, 'dst')
+        self.mp.copies = []
+        self.bucket.initiate_multipart_upload = mock.Mock(
+            return_value=self.mp)
+        completed = mock.Mock(etag='"done-3"', version_id=None)
+        self.bucket.complete_multipart_upload = mock.Mock(
+            return_value=completed)
+        self.bucket.get_all_multipart_uploads = mock.Mock(return_value=[])
+        self.bucket.get_xml_acl = mock.Mock(return_value='<acl/>')
+        self.bucket.set_xml_acl = mock.Mock()
+        self.mp.cancel_upload = mock.Mock()
+        self.copier = MultipartCopier(self.bucket, num_threads=3,
+                                      part_size=1000)
+        self.copier.MIN_PART_SIZE = 0
+
+    def assert_copied(self):
+        self.assertEqual(sorted(set(c[:3] for c in self.mp.copies)),
+                         [(1, 0, 999), (2, 1000, 1999), (3, 2000, 2499)])
+        for copy in self.mp.copies:
+            self.assertEqual(copy[3],
+                             {'x-amz-copy-source-if-match': '"srcetag"'})
+        key_name, upload_id, xml = \
+            self.bucket.complete_multipart_upload.call_args[0]
+        self.assertEqual((key_name, upload_id), ('dst', 'upload-id'))
+        self.assertEqual(xml.count('<Part>'), 3)
+        self.assertIn('<PartNumber>3</PartNumber><ETag>"part3"</ETag>', xml)
+
+    def test_copy_keeps_metadata_and_acl(self):
+        key = self.copier.copy('dst', 'mybucket', 'src', preserve_acl=True)
+        self.assert_copied()
+        args, kwargs = self.bucket.initiate_multipart_upload.call_args
+        self.assertEqual(args[1], {'content-type': 'text/plain',
+                                   'x-amz-storage-class': 'STANDARD'})
+        self.assertEqual(kwargs['metadata'], {'colour': 'blue'})
+        self.bucket.set_xml_acl.assert_called_with('<acl/>', 'dst')
+        self.assertEqual((key.name, key.etag, key.size),
+                         ('dst', '"done-3"', 2500))
+
+    def test_new_metadata_replaces_source_headers(self):
+        self.copier.copy('dst', 'mybucket', 'src', metadata={'a': 'b'},
+                         headers={'Cache-Control': 'no-cache'})
+        args, kwargs = self.bucket.initiate_multipart_upload.call_args
+        self.assertEqual(args[1], {'Cache-Control': 'no-cache',
+                                   'x-amz-storage-class': 'STANDARD'})
+        self.assertEqual(kwargs['metadata'], {'a': 'b'})
+        self.assertFalse(self.bucket.set_xml_acl.called)
+
+    def test_small_source_uses_a_single_copy(self):
+        self.src_key.size = 10
+        self.bucket.copy_key = mock.Mock()
+        self.copier.copy('dst', 'mybucket', 'src')
+        self.assertEqual(self.bucket.copy_key.call_args[0],
+                         ('dst', 'mybucket', 'src'))
+        self.assertFalse(self.bucket.initiate_multipart_upload.called)
+
+    def test_failed_parts_are_retried(self):
+        self.mp.fail_parts[2] = (S3ResponseError(503, 'Slow Down'), 1)
+        self.mp.fail_parts[3] = (S3CopyError('InternalError', 'failed'), 1)
+        with mock.patch('time.sleep'):
+            self.copier.copy('dst', 'mybucket', 'src')
+        self.assertEqual(len(self.mp.copies), 5)
+        self.assert_copied()
+
+    def test_failure_cancels_copy(self):
+        self.mp.fail_parts[2] = (S3ResponseError(412, 'Precondition '
+                                                      'Failed'), 1)
+        with self.assertRaises(S3ResponseError):
+            self.copier.copy('dst', 'mybucket', 'src')
+        self.assertTrue(self.mp.cancel_upload.called)
+        self.assertFalse(self.bucket.complete_multipart_upload.called)
+
+    def test_resume_skips_copied_parts(self):
+        for part_num, last_modified in ((1, '2015-03-02T00:00:00.000Z'),
+                                        (2, '2015-02-01T00:00:00.000Z')):
+            part = Part(self.bucket)
+            part.part_number = part_num
+            part.size = 1000
+            part.etag = '"old%d"' % part_num
+            part.last_modified = last_modified
+            self.mp.parts.append(part)
+        self.bucket.get_all_multipart_uploads.return_value = [self.mp]
+        self.copier.copy('dst', 'mybucket', 'src', resume=True)
+        self.assertFalse(self.bucket.initiate_multipart_upload.called)
+        # Part 2 predates the source, so it is copied again.
+        self.assertEqual(sorted(c[0] for c in self.mp.copies), [2, 3])
+        xml = self.bucket.complete_multipart_upload.call_args[0][2]
+        self.assertIn('<PartNumber>1</PartNumber><ETag>"old1"</ETag>', xml)
+        self.assertIn('<PartNumber>2</PartNumber><ETag>"part2"</ETag>', xml)
+
+    def test_copy_key_with_threads(self):
+        self.src_key.size = 12 * 1024 * 1024
+        key = self.bucket.copy_key('dst', 'mybucket', 'src', num_threads=3,
+                                   part_size=5 * 1024 * 1024)
+        self.assertEqual(sorted(c[0] for c in self.mp.copies), [1, 2, 3])
+        self.assertEqual(key.etag, '"done-3"')
+
+
+if __name__ == '__main__':
+    unittest.main()
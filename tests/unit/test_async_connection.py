@@ -0,0 +1,199 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+import socket
+import sys
+
+from tests.compat import mock, unittest
+
+from boto.connection import AWSQueryConnection
+from boto.retry import CircuitBreaker, RetryPolicy
+
+if sys.version_info >= (3, 5):
+    import asyncio
+    from boto.async_connection import AsyncTransport
+
+
+class CannedHTTPProtocol(object):
+    """
+    Answers each request on a connection with the next canned response.
+    """
+    def __init__(self, server):
+        self.server = server
+        self.buffer = b''
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.server.connections += 1
+
+    def data_received(self, data):
+        self.buffer += data
+        while b'\r\n\r\n' in self.buffer:
+            head, self.buffer = self.buffer.split(b'\r\n\r\n', 1)
+            length = 0
+            for line in head.split(b'\r\n')[1:]:
+                name, value = line.split(b':', 1)
+                if name.strip().lower() == b'content-length':
+                    length = int(value)
+            body, self.buffer = self.buffer[:length], self.buffer[length:]
+            self.server.requests.append((head, body))
+            self.transport.write(self.server.responses.pop(0))
+
+    def connection_lost(self, exc):
+        pass
+
+    def eof_received(self):
+        pass
+
+
+@unittest.skipIf(sys.version_info < (3, 5), 'requires asyncio')
+class TestAsyncTransport(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.requests = []
+        self.responses = []
+        self.connections = 0
+        self.server = self.loop.run_until_complete(
+            self.loop.create_server(lambda: CannedHTTPProtocol(self),
+                                    '127.0.0.1', 0))
+        port = self.server.sockets[0].getsockname()[1]
+        self.connection = AWSQueryConnection(
+            aws_access_key_id='access_key',
+            aws_secret_access_key='secret',
+            is_secure=False, host='127.0.0.1', port=port)
+        self.connection.APIVersion = '2012-01-01'
+        self.connection._required_auth_capability = lambda: ['sign-v2']
+        self.transport = AsyncTransport(self.connection)
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.close()
+        self.loop.run_until_complete(self.server.wait_closed())
+        self.loop.close()
+
+    def make_request(self, *args):
+        return self.loop.run_until_complete(
+            self.transport.make_request(*args))
+
+    def test_make_request_builds_request_like_connection(self):
+        self.responses.append(b'HTTP/1.1 200 OK\r\n'
+                              b'Content-Length: 2\r\n\r\nok')
+        response = self.make_request('DescribeThings', {'Foo': 'bar'},
+                                     '/', 'POST')
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.read(), b'ok')
+        head, body = self.requests[0]
+        request_line = head.split(b'\r\n')[0]
+        self.assertTrue(request_line.startswith(b'POST /?'))
+        self.assertIn(b'Action=DescribeThings', request_line)
+        self.assertIn(b'Signature=', request_line)
+        self.assertIn(b'\r\nHost: 127.0.0.1', head)
+
+    def test_connections_are_reused(self):
+        for i in range(2):
+            self.responses.append(b'HTTP/1.1 200 OK\r\n'
+                                  b'Content-Length: 0\r\n\r\n')
+            self.make_request('DescribeThings', {}, '/', 'POST')
+        self.assertEqual(self.connections, 1)
+
+    def test_chunked_response(self):
+        self.responses.append(b'HTTP/1.1 200 OK\r\n'
+                              b'Transfer-Encoding: chunked\r\n\r\n'
+                              b'3\r\nfoo\r\n3\r\nbar\r\n0\r\n\r\n')
+        response = self.make_request('DescribeThings', {}, '/', 'POST')
+        self.assertEqual(response.read(), b'foobar')
+
+    def test_server_errors_are_retried(self):
+        self.responses.append(b'HTTP/1.1 503 Slow Down\r\n'
+                              b'Content-Length: 0\r\n\r\n')
+        self.responses.append(b'HTTP/1.1 200 OK\r\n'
+                              b'Content-Length: 0\r\n\r\n')
+        with mock.patch('random.uniform', return_value=0):
+            response = self.make_request('DescribeThings', {}, '/', 'POST')
+        self.assertEqual(response.status, 200)
+        self.assertEqual(len(self.requests), 2)
+
+    def test_failed_trial_request_reopens_circuit(self):
+        breaker = CircuitBreaker(1, timeout=0)
+        breaker.record_failure()
+        self.connection.retry_policy = RetryPolicy(breaker=breaker)
+        with mock.patch.object(self.transport, '_send',
+                               side_effect=KeyError('boom')):
+            with self.assertRaises(KeyError):
+                self.make_request('DescribeThings', {}, '/', 'POST')
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+    def test_unretryable_exceptions_are_raised(self):
+        class Unretryable(socket.error):
+            pass
+
+        self.connection.http_unretryable_exceptions.append(Unretryable)
+        with mock.patch.object(self.transport, '_send',
+                               side_effect=Unretryable('bad cert')) as send:
+            with self.assertRaises(Unretryable):
+                self.make_request('DescribeThings', {}, '/', 'POST')
+        self.assertEqual(send.call_count, 1)
+
+    def test_connection_errors_are_retried(self):
+        self.responses.append(b'HTTP/1.1 200 OK\r\n'
+                              b'Content-Length: 0\r\n\r\n')
+        send = self.transport._send
+        attempts = []
+
+        def flaky_send(request, is_secure):
+            attempts.append(request)
+            if len(attempts) == 1:
+                raise socket.error('reset')
+            return send(request, is_secure)
+
+        self.transport._send = flaky_send
+        with mock.patch('random.uniform', return_value=0):
+            response = self.make_request('DescribeThings', {}, '/', 'POST')
+        self.assertEqual(response.status, 200)
+        self.assertEqual(len(attempts), 2)
+
+    def open_tunnel(self, host, port):
+        proxy_port = self.server.sockets[0].getsockname()[1]
+        connection = AWSQueryConnection(
+            aws_access_key_id='access_key',
+            aws_secret_access_key='secret',
+            proxy='127.0.0.1', proxy_port=proxy_port)
+        transport = AsyncTransport(connection)
+        return self.loop.run_until_complete(
+            self.loop.run_in_executor(None, transport._open_tunnel,
+                                      host, port))
+
+    def test_https_through_proxy_is_tunnelled(self):
+        self.responses.append(b'HTTP/1.0 200 Connection established\r\n'
+                              b'\r\n')
+        sock = self.open_tunnel('example.com', 443)
+        sock.close()
+        head, body = self.requests[0]
+        self.assertTrue(head.startswith(b'CONNECT example.com:443 HTTP/1.0'))
+
+    def test_proxy_refusing_tunnel_is_a_socket_error(self):
+        self.responses.append(b'HTTP/1.0 403 Forbidden\r\n\r\n')
+        with self.assertRaises(socket.error):
+            self.open_tunnel('example.com', 443)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -28,8 +28,11 @@ from httpretty import HTTPretty
 from boto import UserAgent
 from boto.compat import json, parse_qs
 from boto.connection import AWSQueryConnection, AWSAuthConnection, HTTPRequest
-from boto.exception import BotoServerError
+from boto.connection import ConnectionPool, ConnectionReaper
+from boto.exception import BotoServerError, ConnectionPoolTimeoutError
 from boto.regioninfo import RegionInfo
+from boto.https_connection import InvalidCertificateException
+from boto.retry import CircuitBreaker, RetryBudget, RetryPolicy
 
 
 class TestListParamsSerialization(unittest.TestCase):
@@ -178,6 +181,51 @@ class TestAWSAuthConnection(unittest.TestCase):
         # Attempt to call proxy_ssl and make sure it works
         conn.proxy_ssl('mockservice.cc-zone-1.amazonaws.com', 80)
 
+    def test_prewarm(self):
+        conn = AWSAuthConnection(
+            'mockservice.cc-zone-1.amazonaws.com',
+            aws_access_key_id='access_key',
+            aws_secret_access_key='secret')
+        connections = [mock.Mock(sock=None) for i in range(3)]
+        connections[2].connect.side_effect = socket.error('refused')
+        with mock.patch.object(conn, 'new_http_connection',
+                               side_effect=connections):
+            self.assertEqual(conn.prewarm(3), 2)
+        for connection in connections:
+            self.assertTrue(connection.connect.called)
+        self.assertTrue(connections[2].close.called)
+        self.assertEqual(conn._pool.size(), 2)
+        pooled = conn._pool.host_to_pool[
+            ('mockservice.cc-zone-1.amazonaws.com', 443, True)]
+        self.assertEqual(pooled.size(), 2)
+
+    def test_prewarm_skips_connect_for_tunnelled_connections(self):
+        conn = AWSAuthConnection(
+            'mockservice.cc-zone-1.amazonaws.com',
+            aws_access_key_id='access_key',
+            aws_secret_access_key='secret')
+        tunnelled = mock.Mock()
+        with mock.patch.object(conn, 'new_http_connection',
+                               return_value=tunnelled):
+            self.assertEqual(conn.prewarm(1), 1)
+        self.assertFalse(tunnelled.connect.called)
+
+    def test_prewarm_hosts(self):
+        conn = AWSAuthConnection(
+            'mockservice.cc-zone-1.amazonaws.com',
+            aws_access_key_id='access_key',
+            aws_secret_access_key='secret')
+        hosts = ['bucket1.mockservice.cc-zone-1.amazonaws.com',
+                 'bucket2.mockservice.cc-zone-1.amazonaws.com']
+        with mock.patch.object(conn, 'new_http_connection',
+                               side_effect=lambda *args: mock.Mock(sock=None)):
+            self.assertEqual(conn.prewarm(2, hosts=hosts), 4)
+        for host in hosts:
+            pooled = conn._pool.host_to_pool[(host, 443, True)]
+            self.assertEqual(pooled.size(), 2)
+        self.assertNotIn(('mockservice.cc-zone-1.amazonaws.com', 443, True),
+                         conn._pool.host_to_pool)
+
     # this tests the proper setting of the host_header in v4 signing
     def test_host_header_with_nonstandard_port(self):
         # test standard port first
@@ -387,6 +435,36 @@ class TestAWSQueryConnectionSimple(TestAWSQueryConnection):
                                  'POST')
         self.assertEqual(resp.read(), b"{'test': 'success'}")
 
+    @mock.patch('time.sleep')
+    def test_retry_budget_fails_fast(self, sleep_mock):
+        HTTPretty.register_uri(HTTPretty.POST,
+                               'https://%s/temp_fail/' % self.region.endpoint,
+                               body="{'test': 'fail'}", status=500)
+
+        conn = self.region.connect(aws_access_key_id='access_key',
+                                   aws_secret_access_key='secret')
+        conn.retry_policy = RetryPolicy(
+            num_retries=6, budget=RetryBudget(10, retry_cost=5))
+        with self.assertRaises(BotoServerError):
+            conn.make_request('myCmd1', {}, '/temp_fail/', 'POST')
+        # The first attempt plus the two retries the budget pays for.
+        self.assertEqual(sleep_mock.call_count, 2)
+
+    def test_failed_trial_request_reopens_circuit(self):
+        conn = self.region.connect(aws_access_key_id='access_key',
+                                   aws_secret_access_key='secret')
+        breaker = CircuitBreaker(1, timeout=0)
+        breaker.record_failure()
+        conn.retry_policy = RetryPolicy(breaker=breaker)
+
+        def sender(*args):
+            raise InvalidCertificateException('host', {}, 'bad')
+
+        request = conn.build_base_http_request('POST', '/', None)
+        with self.assertRaises(InvalidCertificateException):
+            conn._mexe(request, sender=sender)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
     def test_unhandled_exception(self):
         HTTPretty.register_uri(HTTPretty.POST,
                                'https://%s/temp_exception/' % self.region.endpoint,
@@ -502,6 +580,106 @@ class TestAWSQueryStatus(TestAWSQueryConnection):
                                    'status')
 
 
+class FakeHTTPConnection(object):
+    def __init__(self, busy=False):
+        self.closed = False
+        self.busy = busy
+
+    @property
+    def _HTTPConnection__response(self):
+        if self.busy:
+            return mock.Mock(isclosed=mock.Mock(return_value=False))
+        return None
+
+    def close(self):
+        self.closed = True
+
+
+class TestConnectionPool(unittest.TestCase):
+    key = ('example.com', 443, True)
+
+    def test_get_is_lifo(self):
+        pool = ConnectionPool()
+        first, second = FakeHTTPConnection(), FakeHTTPConnection()
+        pool.put_http_connection(*(self.key + (first,)))
+        pool.put_http_connection(*(self.key + (second,)))
+        self.assertIs(pool.get_http_connection(*self.key), second)
+        self.assertIs(pool.get_http_connection(*self.key), first)
+        self.assertIsNone(pool.get_http_connection(*self.key))
+        stats = pool.stats()
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_busy_connection_is_skipped(self):
+        pool = ConnectionPool()
+        idle, busy = FakeHTTPConnection(), FakeHTTPConnection(busy=True)
+        pool.put_http_connection(*(self.key + (idle,)))
+        pool.put_http_connection(*(self.key + (busy,)))
+        self.assertIs(pool.get_http_connection(*self.key), idle)
+        self.assertIsNone(pool.get_http_connection(*self.key))
+        busy.busy = False
+        self.assertIs(pool.get_http_connection(*self.key), busy)
+
+    def test_maxsize_evicts_oldest(self):
+        pool = ConnectionPool(maxsize=2)
+        conns = [FakeHTTPConnection() for i in range(3)]
+        for conn in conns:
+            pool.put_http_connection(*(self.key + (conn,)))
+        self.assertEqual(pool.size(), 2)
+        self.assertTrue(conns[0].closed)
+        self.assertFalse(conns[2].closed)
+        self.assertEqual(pool.stats()['evictions'], 1)
+
+    def test_blocking_pool_times_out(self):
+        pool = ConnectionPool(maxsize=1, block=True, timeout=0.01)
+        self.assertIsNone(pool.get_http_connection(*self.key))
+        with self.assertRaises(ConnectionPoolTimeoutError):
+            pool.get_http_connection(*self.key)
+        self.assertTrue(pool.stats()['wait_time'] > 0)
+
+    def test_blocking_pool_reuses_returned_connection(self):
+        pool = ConnectionPool(maxsize=1, block=True, timeout=0.01)
+        self.assertIsNone(pool.get_http_connection(*self.key))
+        conn = FakeHTTPConnection()
+        pool.put_http_connection(*(self.key + (conn,)))
+        self.assertIs(pool.get_http_connection(*self.key), conn)
+        pool.release_http_connection(*(self.key + (conn,)))
+        self.assertTrue(conn.closed)
+        self.assertIsNone(pool.get_http_connection(*self.key))
+
+    def test_clean_closes_stale_connections(self):
+        pool = ConnectionPool()
+        idle, busy = FakeHTTPConnection(), FakeHTTPConnection(busy=True)
+        pool.put_http_connection(*(self.key + (idle,)))
+        pool.put_http_connection(*(self.key + (busy,)))
+        with mock.patch.object(ConnectionPool, 'STALE_DURATION', -1):
+            pool.clean(force=True)
+        self.assertTrue(idle.closed)
+        # Somebody may still be reading from a busy connection.
+        self.assertFalse(busy.closed)
+        self.assertEqual(pool.size(), 0)
+        self.assertEqual(pool.host_to_pool, {})
+        self.assertEqual(pool.stats()['evictions'], 2)
+
+    def test_reaper_cleans_registered_pools(self):
+        reaper = ConnectionReaper(60)
+        pool = ConnectionPool(reaper=False)
+        conn = FakeHTTPConnection()
+        pool.put_http_connection(*(self.key + (conn,)))
+        with mock.patch('threading.Thread'):
+            reaper.register(pool)
+        with mock.patch.object(ConnectionPool, 'STALE_DURATION', -1):
+            reaper.reap()
+        self.assertTrue(conn.closed)
+
+    def test_reaper_pool_skips_inline_clean(self):
+        with mock.patch('boto.connection.get_connection_reaper'):
+            pool = ConnectionPool(reaper=True)
+        with mock.patch.object(pool, 'clean') as clean:
+            pool.get_http_connection(*self.key)
+        self.assertFalse(clean.called)
+
+
 class TestHTTPRequest(unittest.TestCase):
     def test_user_agent_not_url_encoded(self):
         headers = {'Some-Header': u'should be url encoded',
@@ -0,0 +1,100 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+import threading
+
+from tests.compat import unittest
+
+from boto import handler
+from boto.handler import XmlHandler, parse_xml
+
+
+class Recorder(object):
+    def __init__(self):
+        self.values = []
+
+    def startElement(self, name, attrs, connection):
+        return None
+
+    def endElement(self, name, value, connection):
+        self.values.append((name, value))
+
+
+class TestXmlHandler(unittest.TestCase):
+    def test_text_fragments_are_joined(self):
+        recorder = Recorder()
+        h = XmlHandler(recorder, None)
+        h.startElement('Body', {})
+        for fragment in ('abc', 'def', 'ghi'):
+            h.characters(fragment)
+        self.assertEqual(h.current_text, 'abcdefghi')
+        h.endElement('Body')
+        self.assertEqual(recorder.values, [('Body', 'abcdefghi')])
+        self.assertEqual(h.current_text, '')
+
+    def test_large_text_node(self):
+        body = 'x' * (256 * 1024)
+        recorder = Recorder()
+        parse_xml(('<Message><Body>%s</Body></Message>' % body).encode(
+            'utf-8'), XmlHandler(recorder, None))
+        self.assertEqual(recorder.values[0], ('Body', body))
+
+    def test_parser_is_reused_per_thread(self):
+        parse_xml(b'<a/>', XmlHandler(Recorder(), None))
+        parser = handler._local.parser
+        recorder = Recorder()
+        parse_xml(b'<r><Name>foo</Name></r>', XmlHandler(recorder, None))
+        self.assertIs(handler._local.parser, parser)
+        self.assertEqual(recorder.values, [('Name', 'foo'), ('r', '')])
+
+        parsers = []
+
+        def other_thread():
+            parse_xml(b'<a/>', XmlHandler(Recorder(), None))
+            parsers.append(handler._local.parser)
+        t = threading.Thread(target=other_thread)
+        t.start()
+        t.join()
+        self.assertIsNot(parsers[0], parser)
+
+    def test_nested_parse_gets_its_own_parser(self):
+        inner = Recorder()
+
+        class Outer(Recorder):
+            def endElement(self, name, value, connection):
+                parse_xml(b'<inner>text</inner>', XmlHandler(inner, None))
+                Recorder.endElement(self, name, value, connection)
+
+        outer = Outer()
+        parse_xml(b'<outer>value</outer>', XmlHandler(outer, None))
+        self.assertEqual(outer.values, [('outer', 'value')])
+        self.assertEqual(inner.values, [('inner', 'text')])
+
+    def test_parse_errors_leave_parser_usable(self):
+        with self.assertRaises(Exception):
+            parse_xml(b'<a><b></a>', XmlHandler(Recorder(), None))
+        recorder = Recorder()
+        parse_xml(b'<a>ok</a>', XmlHandler(recorder, None))
+        self.assertEqual(recorder.values, [('a', 'ok')])
+
+
+if __name__ == '__main__':
+    unittest.main()
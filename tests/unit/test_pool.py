@@ -0,0 +1,101 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+import threading
+
+from tests.compat import unittest
+
+from boto.compat import Queue
+from boto.pool import END, WorkerPool
+
+
+class TestWorkerPool(unittest.TestCase):
+    def test_workers_take_all_the_work(self):
+        pool = WorkerPool(2)
+        done = []
+        lock = threading.Lock()
+
+        def worker():
+            for item in pool.work():
+                with lock:
+                    done.append(item)
+
+        pool.start(3, worker)
+        for i in range(20):
+            self.assertTrue(pool.put(i))
+        pool.close()
+        pool.join()
+        pool.check()
+        self.assertEqual(sorted(done), list(range(20)))
+
+    def test_first_error_stops_the_pool(self):
+        pool = WorkerPool(1)
+        taken = []
+
+        def worker():
+            for item in pool.work():
+                taken.append(item)
+                raise ValueError(item)
+
+        pool.start(1, worker)
+        pool.put(1)
+        pool.join()
+        # The queue stays full, but put returns once the pool stops.
+        self.assertTrue(pool.stopped)
+        self.assertFalse(pool.put(2))
+        self.assertRaises(ValueError, pool.check)
+        self.assertEqual(taken, [1])
+
+    def test_queued_work_is_dropped_once_stopped(self):
+        pool = WorkerPool()
+        for i in range(5):
+            pool.put(i)
+        pool.stop()
+        taken = []
+        pool.start(1, lambda: taken.extend(pool.work()))
+        pool.join()
+        self.assertEqual(taken, [])
+        # Dropped, but not lost.
+        self.assertEqual(sorted(pool.unfinished()), list(range(5)))
+        self.assertEqual(pool.unfinished(), [])
+
+    def test_get_raises_worker_errors(self):
+        pool = WorkerPool()
+        output = Queue()
+
+        def worker():
+            pool.put('result', output)
+            raise ValueError('boom')
+
+        pool.start(1, worker)
+        pool.join()
+        self.assertEqual(pool.get(output), 'result')
+        self.assertRaises(ValueError, pool.get, output)
+
+    def test_get_returns_end(self):
+        pool = WorkerPool()
+        output = Queue()
+        pool.put(END, output)
+        self.assertIs(pool.get(output), END)
+
+
+if __name__ == '__main__':
+    unittest.main()
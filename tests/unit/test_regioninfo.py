@@ -19,12 +19,18 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 # IN THE SOFTWARE.
 #
+import json
 import os
+import shutil
+import tempfile
+from tests.compat import mock
 from tests.unit import unittest
 
 import boto
 from boto.regioninfo import RegionInfo, load_endpoint_json, merge_endpoints
-from boto.regioninfo import load_regions, get_regions
+from boto.regioninfo import load_regions, get_regions, get_endpoint
+from boto.regioninfo import compile_endpoints, load_endpoint_file, connect
+from boto.exception import BotoClientError
 
 
 class TestRegionInfo(object):
@@ -101,6 +107,72 @@ class TestEndpointLoading(unittest.TestCase):
         self.assertTrue('test-1' in endpoints['ec2'])
         self.assertEqual(endpoints['ec2']['test-1'], 'ec2.test-1.amazonaws.com')
 
+    def test_load_regions_is_cached(self):
+        load_regions()
+        with mock.patch('boto.regioninfo.load_endpoint_file') as load:
+            endpoints = load_regions()
+            self.assertEqual(get_endpoint('ec2', 'us-west-2'),
+                             'ec2.us-west-2.amazonaws.com')
+        self.assertFalse(load.called)
+        # Callers get their own copy of the data.
+        endpoints['ec2']['test-1'] = 'ec2.test-1.amazonaws.com'
+        self.assertFalse('test-1' in load_regions()['ec2'])
+
+    def test_override_file_changes_are_picked_up(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'endpoints.json')
+        with open(path, 'w') as f:
+            json.dump({'ec2': {'test-1': 'ec2.test-1.amazonaws.com'}}, f)
+        os.environ['BOTO_ENDPOINTS'] = path
+        self.addCleanup(os.environ.pop, 'BOTO_ENDPOINTS')
+        self.assertEqual(get_endpoint('ec2', 'test-1'),
+                         'ec2.test-1.amazonaws.com')
+
+        with open(path, 'w') as f:
+            json.dump({'ec2': {'test-2': 'ec2.test-2.amazonaws.com'}}, f)
+        mtime = os.stat(path).st_mtime + 10
+        os.utime(path, (mtime, mtime))
+        self.assertEqual(get_endpoint('ec2', 'test-1'), None)
+        self.assertEqual(get_endpoint('ec2', 'test-2'),
+                         'ec2.test-2.amazonaws.com')
+
+    def test_compiled_endpoints(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        compiled = compile_endpoints(
+            os.path.join(os.path.dirname(__file__), 'test_endpoints.json'),
+            os.path.join(tmpdir, 'endpoints.marshal'))
+        self.assertEqual(load_endpoint_file(compiled)['ec2']['test-1'],
+                         'ec2.test-1.amazonaws.com')
+        os.environ['BOTO_ENDPOINTS'] = compiled
+        self.addCleanup(os.environ.pop, 'BOTO_ENDPOINTS')
+        self.assertEqual(get_endpoint('ec2', 'test-1'),
+                         'ec2.test-1.amazonaws.com')
+
+    def test_compiled_endpoints_must_be_plain_data(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'endpoints.marshal')
+        with open(path, 'wb') as f:
+            f.write(b'not marshal data')
+        self.assertRaises(BotoClientError, load_endpoint_file, path)
+
+    def test_connect(self):
+        conn = mock.Mock()
+        connection_cls = mock.Mock(return_value=conn)
+        self.assertIs(connect('ec2', 'us-west-2',
+                              connection_cls=connection_cls, debug=2),
+                      conn)
+        region = connection_cls.call_args[1]['region']
+        self.assertIsInstance(region, RegionInfo)
+        self.assertEqual(region.endpoint, 'ec2.us-west-2.amazonaws.com')
+        self.assertEqual(connection_cls.call_args[1]['debug'], 2)
+        self.assertEqual(connect('ec2', 'nowhere-1',
+                                 connection_cls=connection_cls), None)
+        self.assertRaises(BotoClientError, connect, 'nothing', 'us-west-2',
+                          connection_cls=connection_cls)
+
     def test_get_regions(self):
         # With defaults.
         ec2_regions = get_regions('ec2')
@@ -0,0 +1,94 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+from tests.compat import mock, unittest
+
+from boto.exception import CircuitOpenError
+from boto.retry import CircuitBreaker, RetryBudget, RetryPolicy
+
+
+class TestRetryBudget(unittest.TestCase):
+    def test_budget_is_exhausted_and_refilled(self):
+        budget = RetryBudget(10, retry_cost=5, success_credit=5)
+        self.assertTrue(budget.acquire())
+        self.assertTrue(budget.acquire())
+        self.assertFalse(budget.acquire())
+        budget.record_success()
+        self.assertTrue(budget.acquire())
+
+    def test_refill_is_capped(self):
+        budget = RetryBudget(10)
+        budget.record_success()
+        self.assertEqual(budget.tokens, 10)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker(2, timeout=30)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow_request())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow_request())
+
+    @mock.patch('time.time')
+    def test_half_open_trial(self, time_mock):
+        time_mock.return_value = 100
+        breaker = CircuitBreaker(1, timeout=30)
+        breaker.record_failure()
+        self.assertFalse(breaker.allow_request())
+        time_mock.return_value = 131
+        # Only one trial request is let through.
+        self.assertTrue(breaker.allow_request())
+        self.assertFalse(breaker.allow_request())
+        breaker.record_success()
+        self.assertTrue(breaker.allow_request())
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_next_delay_is_bounded(self):
+        policy = RetryPolicy(base_delay=1, max_delay=5)
+        delay = None
+        for i in range(20):
+            delay = policy.next_delay(delay)
+            self.assertTrue(1 <= delay <= 5)
+
+    def test_next_delay_grows_from_previous(self):
+        policy = RetryPolicy(base_delay=1, max_delay=60)
+        with mock.patch('random.uniform', return_value=2) as uniform:
+            policy.next_delay(4)
+        uniform.assert_called_with(1, 12)
+
+    def test_open_circuit_fails_fast(self):
+        policy = RetryPolicy(breaker=CircuitBreaker(1))
+        policy.before_request()
+        policy.record_failure()
+        self.assertFalse(policy.allow_retry())
+        with self.assertRaises(CircuitOpenError):
+            policy.before_request()
+
+    def test_budget_limits_retries(self):
+        policy = RetryPolicy(budget=RetryBudget(5, retry_cost=5))
+        self.assertTrue(policy.allow_retry())
+        self.assertFalse(policy.allow_retry())
+
+
+if __name__ == '__main__':
+    unittest.main()